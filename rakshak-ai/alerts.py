@@ -1,28 +1,102 @@
+import base64
+import http.client
 import os
+import threading
+from urllib.parse import urlencode, urlsplit
+
 from playsound import playsound
 
+# Twilio REST endpoint; point it at a local stub server to test alerting
+TWILIO_API_BASE = os.getenv('TWILIO_API_BASE', 'https://api.twilio.com')
+
+# Seconds before an SMS request is abandoned
+SMS_TIMEOUT = 10.0
+
+
+class AlertError(Exception):
+    """An alert could not be delivered; retryable is False for permanent failures."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
 class Alerts:
-    def __init__(self):
+    def __init__(self, api_base=None, timeout=SMS_TIMEOUT):
         self.twilio_sid = os.getenv('TWILIO_SID')
         self.twilio_token = os.getenv('TWILIO_TOKEN')
         self.twilio_from = os.getenv('TWILIO_FROM')
         self.twilio_to = os.getenv('TWILIO_TO')
+        self.timeout = timeout
+
+        url = urlsplit(api_base or TWILIO_API_BASE)
+        self._scheme = url.scheme or 'https'
+        self._netloc = url.netloc
+        self._prefix = url.path.rstrip('/')
+        # one keep-alive connection per sending thread, reused across messages
+        self._local = threading.local()
+        self.connections_opened = 0
 
-    def send_sms(self):
-        if not all([self.twilio_sid, self.twilio_token, self.twilio_from, self.twilio_to]):
+    @property
+    def sms_configured(self):
+        return all([self.twilio_sid, self.twilio_token, self.twilio_from, self.twilio_to])
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self._scheme == 'https' else http.client.HTTPConnection
+            conn = self._local.conn = cls(self._netloc, timeout=self.timeout)
+            self.connections_opened += 1
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _post(self, path, fields):
+        credentials = base64.b64encode(f"{self.twilio_sid}:{self.twilio_token}".encode()).decode()
+        headers = {
+            'Authorization': f'Basic {credentials}',
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'Accept': 'application/json',
+        }
+        body = urlencode(fields)
+        while True:
+            reused = getattr(self._local, 'conn', None) is not None
+            try:
+                conn = self._connection()
+                conn.request('POST', self._prefix + path, body, headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, OSError) as e:
+                self._drop_connection()
+                # the server closed an idle keep-alive connection: reconnect once
+                stale = isinstance(e, (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError))
+                if not (reused and stale):
+                    raise AlertError(f"SMS request failed: {e}")
+
+    def send_sms(self, body="Accident detected by Rakshak AI!"):
+        """
+        Send an SMS through the Twilio REST API on a reused connection.
+
+        Returns:
+            str: Response body on success, or None when Twilio is not configured
+
+        Raises:
+            AlertError: Delivery failed; retryable for network errors, 429 and 5xx
+        """
+        if not self.sms_configured:
             print("Twilio credentials not set, skipping SMS")
-            return
-        try:
-            from twilio.rest import Client
-            client = Client(self.twilio_sid, self.twilio_token)
-            message = client.messages.create(
-                body="Accident detected by Rakshak AI!",
-                from_=self.twilio_from,
-                to=self.twilio_to
-            )
-            print(f"SMS sent: {message.sid}")
-        except Exception as e:
-            print(f"Failed to send SMS: {e}")
+            return None
+        status, data = self._post(f'/2010-04-01/Accounts/{self.twilio_sid}/Messages.json',
+                                  {'From': self.twilio_from, 'To': self.twilio_to, 'Body': body})
+        if status >= 300:
+            raise AlertError(f"SMS rejected with HTTP {status}: {data[:200]!r}",
+                             retryable=status == 429 or status >= 500)
+        print(f"SMS sent ({status})")
+        return data.decode('utf-8', 'replace')
 
     def play_siren(self):
         try:
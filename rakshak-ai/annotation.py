@@ -0,0 +1,51 @@
+"""
+Rakshak AI - Frame Annotation
+=============================
+Drawing of detection overlays, kept separate from inference so headless
+pipelines (RTSP analysis, check_accident-only callers) never pay for it.
+
+Functions:
+- draw_detections(image, boxes, vehicle_count): Draw boxes and the vehicle count
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+from collision import VEHICLE_CLASSES
+
+VEHICLE_COLOR = (0, 255, 0)
+OTHER_COLOR = (255, 128, 0)
+
+
+def draw_detections(image, boxes, vehicle_count, label="Vehicles Detected", class_names=None, copy=True):
+    """
+    Draw detection boxes and the vehicle count on a frame.
+
+    Args:
+        image: numpy array (BGR format from OpenCV)
+        boxes: List of (x1, y1, x2, y2, class_id) tuples
+        vehicle_count: Count shown in the top-left corner
+        label: Text shown before the count
+        class_names: Optional mapping of class_id -> name (e.g. model.names)
+        copy: Draw on a copy so the caller's frame is left untouched
+
+    Returns:
+        The annotated image
+    """
+    annotated = image.copy() if copy else image
+
+    for x1, y1, x2, y2, cls in boxes:
+        cls = int(cls)
+        color = VEHICLE_COLOR if cls in VEHICLE_CLASSES else OTHER_COLOR
+        p1 = (int(x1), int(y1))
+        cv2.rectangle(annotated, p1, (int(x2), int(y2)), color, 2)
+        name = class_names.get(cls, str(cls)) if class_names else str(cls)
+        cv2.putText(annotated, name, (p1[0], max(p1[1] - 5, 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+    cv2.putText(annotated, f"{label}: {vehicle_count}", (50, 50),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    return annotated
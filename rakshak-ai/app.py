@@ -7,14 +7,24 @@ This is the original Flask version of the app.
 For Streamlit Cloud deployment, use streamlit_app.py instead.
 """
 
+import time
+_IMPORT_START = time.perf_counter()
+
 import sys
 import os
 sys.path.insert(0, os.path.dirname(__file__))
 
 from flask import Flask, render_template, Response, request, jsonify
+import engine
 from detector import CarDetector
 from alerts import Alerts
+from dispatcher import AlertDispatcher
+from incidents import CONFIRMED, ONGOING, RESOLVED, IncidentManager
 from database import Database
+from timeseries import TimeSeriesStore
+from hub import BroadcastHub, StreamEnd
+from encoder import AdaptiveQuality, EncodePool, TARGET_FPS, viewer_options
+from events import EventBus, KEEPALIVE_INTERVAL, format_sse
 
 # Safe import for OpenCV
 try:
@@ -22,8 +32,11 @@ try:
 except Exception:
     cv2 = None
 
+import importlib
+import json
+import math
 import threading
-import time
+from datetime import datetime, timezone
 import numpy as np
 from werkzeug.utils import secure_filename
 
@@ -36,69 +49,194 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Ensure the upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# Initialize components - only if cv2 is available
-if cv2 is not None:
-    detector = CarDetector()
-else:
-    detector = None
-    print("Warning: OpenCV not available - detection disabled")
+# The detector (torch, Ultralytics, YOLO weights) is initialized off the
+# request path so the app can answer health checks and /logs, /stats and
+# /accident_status immediately. 'background' starts loading at startup,
+# 'lazy' waits for the first /video_feed request.
+MODEL_INIT_MODE = os.environ.get('RAKSHAK_MODEL_INIT', 'background').lower()
+
+detector_ready = threading.Event()
+_detector_lock = threading.Lock()
+model_status = {'state': 'not_started', 'error': None}
+startup_timings = {}
+
+
+def _initialize_detector():
+    """
+    Import the ML stack, load the shared model and warm it up, recording how
+    long each step takes. The per-source CarDetectors built by the hub reuse
+    this model, so nothing here is kept besides the readiness state.
+    """
+    try:
+        start = time.perf_counter()
+        importlib.import_module('torch')
+        importlib.import_module('ultralytics')
+        startup_timings['ml_import_s'] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        if engine.load_model() is None:
+            raise RuntimeError(f"Failed to load YOLO model: {engine.get_loading_error()}")
+        startup_timings['weight_load_s'] = round(time.perf_counter() - start, 3)
+
+        # first inference pays for lazy allocations; do it before serving streams
+        start = time.perf_counter()
+        engine.warmup((480, 640, 3))
+        startup_timings['warmup_s'] = round(time.perf_counter() - start, 3)
+
+        model_status['state'] = 'ready'
+        startup_timings['ready_after_s'] = round(time.perf_counter() - _IMPORT_START, 3)
+        print("[startup] " + ", ".join(f"{k}={v}" for k, v in startup_timings.items()))
+    except Exception as e:
+        model_status['state'] = 'failed'
+        model_status['error'] = str(e)
+        print(f"[startup] Detector initialization failed: {e}")
+    finally:
+        detector_ready.set()
+
+
+def start_detector_init():
+    """Start loading the detector in the background (once)."""
+    with _detector_lock:
+        if model_status['state'] != 'not_started':
+            return
+        if cv2 is None:
+            model_status['state'] = 'disabled'
+            model_status['error'] = 'OpenCV not available'
+            detector_ready.set()
+            print("Warning: OpenCV not available - detection disabled")
+            return
+        model_status['state'] = 'loading'
+        threading.Thread(target=_initialize_detector, name='detector-init', daemon=True).start()
+
+
+def wait_for_model(timeout=None):
+    """Start loading if needed; True once the model is loaded and warmed up."""
+    start_detector_init()
+    detector_ready.wait(timeout)
+    return model_status['state'] == 'ready'
+
 
 alerts = Alerts()
 db = Database()
 
+# per-frame vehicle counts and boxes per camera; RAKSHAK_TIMESERIES=0 turns it off
+timeseries_store = TimeSeriesStore() if os.environ.get('RAKSHAK_TIMESERIES', '1') != '0' else None
+
+# siren and SMS, deduplicated per source and off the stream threads
+dispatcher = AlertDispatcher(alerts)
+
+# set while any camera has a confirmed incident
 accident_event = threading.Event()
-current_accident_status = {'accident': False, 'severity': 0}
+
+# accident events pushed to /events (SSE) and /events/poll subscribers
+event_bus = EventBus()
+
+startup_timings['app_import_s'] = round(time.perf_counter() - _IMPORT_START, 3)
+if MODEL_INIT_MODE != 'lazy':
+    start_detector_init()
 
 
-def generate_frames(source):
-    if detector is None:
+def _message_frame(text, color=(255, 255, 255)):
+    blank_frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    cv2.putText(blank_frame, text, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, color, 2)
+    ret, buffer = cv2.imencode('.jpg', blank_frame)
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+
+def _multipart(jpeg):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+
+
+def _on_stream_result(source, car_count, accident_flag, severity):
+    # runs once per processed frame of a source, however many viewers watch it;
+    # side effects happen in _on_incident_transition, once per incident
+    incidents.update(source, accident_flag, severity)
+
+
+def _on_incident_transition(incident, old_state, new_state, escalated):
+    source = incident.source
+    if new_state == CONFIRMED:
+        accident_event.set()
+        event_bus.publish('accident', severity=incident.severity, source=source, incident_id=incident.id)
+        # every incident is logged; the dispatcher cooldown only mutes repeat siren/SMS
+        db.log_accident(severity=incident.severity, description=f'Accident detected ({source})')
+        dispatcher.submit(source, incident.severity)
+    elif escalated:
+        event_bus.publish('accident', severity=incident.severity, source=source, incident_id=incident.id,
+                          escalated=True)
+        # already logged at confirmation; re-alert with the higher severity
+        dispatcher.submit(source, incident.severity)
+    elif new_state == RESOLVED:
+        event_bus.publish('clear', severity=0, source=source, incident_id=incident.id,
+                          duration=round(incident.resolved_at - incident.started, 1))
+        if not any(i['state'] in (CONFIRMED, ONGOING) for i in incidents.status().values()):
+            accident_event.clear()
+
+
+# per-camera incident lifecycle: candidate -> confirmed -> ongoing -> resolved
+incidents = IncidentManager(on_transition=_on_incident_transition)
+
+
+def accident_status_snapshot():
+    """
+    Accident status keyed by camera, plus the aggregate 'accident' and
+    'severity' fields the dashboard has always polled.
+    """
+    sources = incidents.status()
+    active = [i['severity'] for i in sources.values() if i['state'] in (CONFIRMED, ONGOING)]
+    return {'accident': bool(active), 'severity': max(active, default=0), 'sources': sources}
+
+
+# One capture/inference pipeline per source, fanned out to every
+# /video_feed viewer of that source. Each pipeline has its own CarDetector
+# (tracks, collision history) on top of the shared model; JPEG encoding
+# runs on the encode pool, once per frame and output level.
+encode_pool = EncodePool()
+hub = BroadcastHub(detector_factory=lambda: CarDetector(timeseries=timeseries_store),
+                   encoder=encode_pool, on_result=_on_stream_result)
+
+
+def generate_frames(source, max_width=None, target_fps=TARGET_FPS):
+    # keep the viewer informed while the model is still warming up
+    while not wait_for_model(timeout=1.0) and model_status['state'] == 'loading':
+        yield _message_frame("Model warming up...")
+    if model_status['state'] == 'failed':
+        yield _message_frame("Model failed to load", (0, 0, 255))
+        return
+
+    if model_status['state'] != 'ready':
         # Yield error frame
-        blank_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(blank_frame, "OpenCV Not Available", (100, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', blank_frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+        yield _message_frame("OpenCV Not Available", (0, 0, 255))
         return
-    
-    try:
-        if source not in ['webcam'] and not source.startswith('rtsp://'):
-            source = os.path.join(app.config['UPLOAD_FOLDER'], source)
-        for frame, car_count, accident_flag, severity in detector.process_video(source):
-            # If detector signals an accident, update status and trigger alerts/logging in background
-            if accident_flag:
-                current_accident_status['accident'] = True
-                current_accident_status['severity'] = severity
-                # start background handler thread so the stream isn't blocked
-                threading.Thread(target=handle_accident, args=(severity,), daemon=True).start()
-
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-    except Exception as e:
-        print(f"Error in generate_frames: {e}")
-        # Yield a blank frame or error message
-        blank_frame = np.zeros((480, 640, 3), dtype=np.uint8)
-        cv2.putText(blank_frame, "Video source error", (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
-        ret, buffer = cv2.imencode('.jpg', blank_frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
 
+    if source not in ['webcam'] and not source.startswith('rtsp://'):
+        source = os.path.join(app.config['UPLOAD_FOLDER'], source)
 
-def handle_accident(severity):
+    # per-viewer output level, stepped down when this client cannot keep up
+    quality = AdaptiveQuality(max_width=max_width, target_fps=target_fps)
+    subscription = hub.subscribe(source)
+    subscription.level = quality.level
     try:
-        alerts.play_siren()
-        alerts.send_sms()
-        db.log_accident(severity=severity)
-    except Exception as e:
-        print(f"Error in handle_accident: {e}")
-    # keep accident flag true for a short period so frontend can show alert
-    time.sleep(5)
-    current_accident_status['accident'] = False
-    current_accident_status['severity'] = 0
-    accident_event.clear()
+        while True:
+            ticket = subscription.get(timeout=1.0)
+            if ticket is None:
+                continue
+            if isinstance(ticket, StreamEnd):
+                if ticket.error:
+                    yield _message_frame("Video source error")
+                break
+            part = _multipart(ticket.jpeg(subscription.level))
+            # the server resumes the generator once the chunk is written, so
+            # the time spent in yield is the send time to this client
+            sent = time.perf_counter()
+            yield part
+            quality.record(len(part), time.perf_counter() - sent)
+            subscription.level = quality.level
+    finally:
+        # also runs when the client disconnects
+        subscription.close()
 
 
 @app.route('/')
@@ -109,7 +247,10 @@ def dashboard():
 @app.route('/video_feed')
 def video_feed():
     source = request.args.get('source', 'webcam')
-    return Response(generate_frames(source), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # optional ?width= cap for small screens and ?fps= target for the quality controller
+    max_width, target_fps = viewer_options(request.args.get('width'), request.args.get('fps'))
+    return Response(generate_frames(source, max_width, target_fps),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
 @app.route('/upload_video', methods=['POST'])
@@ -128,19 +269,224 @@ def upload_video():
 
 @app.route('/accident_status')
 def accident_status():
-    return jsonify(current_accident_status)
+    return jsonify(accident_status_snapshot())
+
+
+def _parse_event_id(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def generate_events(last_id):
+    # reconnecting browsers retry after 3s and send Last-Event-ID
+    yield 'retry: 3000\n\n'
+    # current state first, so a fresh client does not wait for the next event
+    yield f"event: status\ndata: {json.dumps(accident_status_snapshot())}\n\n"
+    cursor = event_bus.last_id if last_id is None else last_id
+    while True:
+        events, missed = event_bus.wait(cursor, KEEPALIVE_INTERVAL)
+        if missed:
+            # fell behind the replay buffer: the client should reload its state
+            yield f"event: reset\ndata: {json.dumps(accident_status_snapshot())}\n\n"
+        for event in events:
+            yield format_sse(event)
+        if events:
+            cursor = events[-1]['id']
+        else:
+            # after a server restart the client's id may be ahead of ours
+            cursor = min(cursor, event_bus.last_id)
+            if not missed:
+                yield ': keepalive\n\n'
+
+
+@app.route('/events')
+def events_stream():
+    """Server-Sent Events stream of accident events (replays missed ones on reconnect)."""
+    last_id = _parse_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_id'))
+    return Response(generate_events(last_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+# /events/poll wait: default and upper bound in seconds
+EVENTS_POLL_TIMEOUT = 25.0
+EVENTS_MAX_POLL_TIMEOUT = 60.0
+
+
+@app.route('/events/poll')
+def events_poll():
+    """
+    Long-poll fallback for clients without EventSource.
+
+    Query params:
+        after: Last event id seen; omit to wait for the next event
+        timeout: Seconds to wait for an event (default 25, max 60)
+    """
+    after = _parse_event_id(request.args.get('after'))
+    try:
+        timeout = min(max(float(request.args.get('timeout', EVENTS_POLL_TIMEOUT)), 0.0), EVENTS_MAX_POLL_TIMEOUT)
+    except ValueError:
+        return jsonify({'error': 'timeout must be a number'}), 400
+    events, missed = event_bus.wait(after, timeout)
+    last_id = events[-1]['id'] if events else event_bus.last_id
+    return jsonify({'events': events, 'last_id': last_id, 'missed': missed,
+                    'status': accident_status_snapshot()})
+
+
+# /logs page size: default and upper bound
+LOGS_PAGE_SIZE = 100
+LOGS_MAX_PAGE_SIZE = 1000
+
+
+def _parse_time(value):
+    """Unix seconds, or an ISO date/time in server local time."""
+    try:
+        seconds = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value)
+        try:
+            return parsed.timestamp()
+        except (OverflowError, ValueError):
+            # local time cannot be resolved at the ends of the calendar
+            # (e.g. 0001-01-01); UTC is at most a few hours off out there
+            return parsed.replace(tzinfo=timezone.utc).timestamp()
+    if not math.isfinite(seconds):
+        raise ValueError(f"time must be finite, got '{value}'")
+    return seconds
+
+
+def _parse_before(value):
+    """
+    The /logs 'before' value: a "<unix seconds>:<row id>" cursor from
+    X-Next-Before, or a bare time. ISO times contain colons too, so the tail
+    is a row id only when it is all digits and the head is a number.
+    """
+    ts, _, row_id = value.rpartition(':')
+    if row_id.isdigit():
+        try:
+            float(ts)
+        except ValueError:
+            pass
+        else:
+            return _parse_time(ts), int(row_id)
+    return _parse_time(value)
 
 
 @app.route('/logs')
 def get_logs():
-    logs = db.get_logs()
-    return jsonify(logs)
+    """
+    Newest-first accident log, one page at a time.
+
+    Query parameters:
+        limit: Rows per page (default 100, at most 1000)
+        before: Cursor from the X-Next-Before header of the previous page
+        since, until: Time range, Unix seconds or ISO date/time
+        severity, min_severity: Severity filters
+
+    The body stays a JSON list of rows; the X-Next-Before header carries the
+    cursor for the next page and is absent on the last one.
+    """
+    args = request.args
+    try:
+        limit = min(max(int(args.get('limit', LOGS_PAGE_SIZE)), 1), LOGS_MAX_PAGE_SIZE)
+        before = args.get('before')
+        if before:
+            before = _parse_before(before)
+        since = _parse_time(args['since']) if args.get('since') else None
+        until = _parse_time(args['until']) if args.get('until') else None
+        severity = int(args['severity']) if args.get('severity') else None
+        min_severity = int(args['min_severity']) if args.get('min_severity') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
+    logs = db.get_logs(before=before or None, limit=limit, since=since, until=until,
+                       severity=severity, min_severity=min_severity)
+    response = jsonify(logs)
+    # every row has a ts (Database backfills legacy rows), but a cursor that
+    # cannot be parsed back is worse than none
+    if len(logs) == limit and logs[-1][-1] is not None:
+        last = logs[-1]
+        response.headers['X-Next-Before'] = f"{float(last[-1])!r}:{last[0]}"
+    return response
 
 
 @app.route('/stats')
 def get_stats():
-    count = db.get_accident_count()
-    return jsonify({'accident_count': count})
+    # served from the rollup tables: constant cost however long the history
+    stats = db.get_stats()
+    return jsonify({
+        'accident_count': stats['total'],
+        'by_severity': stats['by_severity'],
+        'average_severity': stats['average_severity'],
+        'hourly': stats['hourly'],
+        'daily': stats['daily'],
+    })
+
+
+@app.route('/traffic')
+def traffic():
+    """
+    Downsampled traffic for one camera from the time-series store.
+
+    Query parameters:
+        camera: Source name (default: webcam)
+        resolution: Bucket size in seconds, 60 or 3600 (default 60)
+        since, until: Time range, Unix seconds or ISO date/time (default: last 24 hours)
+    """
+    if timeseries_store is None:
+        return jsonify({'error': 'Time-series recording is disabled'}), 404
+    args = request.args
+    try:
+        resolution = int(args.get('resolution', 60))
+        since = _parse_time(args['since']) if args.get('since') else time.time() - 86400
+        until = _parse_time(args['until']) if args.get('until') else None
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+
+    rollups = timeseries_store.read_rollups(args.get('camera', 'webcam'), resolution, since, until)
+    return jsonify([{
+        'bucket': int(r['bucket']),
+        'frames': int(r['frames']),
+        'mean_vehicles': float(r['count_sum']) / r['frames'] if r['frames'] else 0.0,
+        'max_vehicles': int(r['count_max']),
+        'accidents': int(r['accidents']),
+    } for r in rollups])
+
+
+@app.route('/alerts/stats')
+def alert_stats():
+    # alert delivery counters: queued, deduplicated, dropped, SMS sent/failed/retried
+    return jsonify(dispatcher.stats())
+
+
+@app.route('/streams')
+def streams():
+    # active pipelines with their viewer and dropped-frame counts
+    return jsonify(hub.stats())
+
+
+@app.route('/health')
+def health():
+    # liveness: the web server is up, whatever the model is doing
+    return jsonify({'status': 'ok'})
+
+
+@app.route('/ready')
+def ready():
+    # readiness: the detector can serve video streams
+    body = {
+        'ready': model_status['state'] == 'ready',
+        'state': model_status['state'],
+        'error': model_status['error'],
+        'backend': engine.get_backend(),
+    }
+    return jsonify(body), 200 if body['ready'] else 503
+
+
+@app.route('/startup')
+def startup_report():
+    return jsonify({'state': model_status['state'], 'timings': startup_timings})
 
 
 if __name__ == '__main__':
@@ -0,0 +1,227 @@
+"""
+Rakshak AI - ASGI Server
+========================
+asyncio serving mode for the Flask app's routes.
+
+Under the Flask development server or a threaded WSGI server every
+/video_feed viewer keeps a worker thread blocked in the frame generator
+for as long as it stays connected. Here the streaming endpoints are
+asyncio tasks instead: a viewer waiting for its next frame is an
+awaiting coroutine, woken by the hub's per-subscriber notify callback,
+so hundreds of idle or slow connections cost no threads. The blocking
+work stays off the event loop:
+
+- inference runs on the hub's per-source pipeline threads (hub.py)
+- JPEG encoding runs on the shared encode pool (encoder.py) and is
+  awaited through its futures
+- every other route (dashboard, uploads, /logs, /stats, health checks)
+  is the Flask app mounted through a WSGI adapter, which runs its views
+  in a thread pool
+
+All state (model status, hub, database, event bus, incidents) is the
+same objects app.py creates, so both modes behave identically.
+
+Requires the optional packages starlette and uvicorn (a2wsgi is used for
+the WSGI mount when installed, starlette's own adapter otherwise):
+
+    pip install starlette uvicorn
+    python rakshak-ai/asgi_app.py        # or: uvicorn asgi_app:app
+
+tests/test_asgi_app.py exercises both the native and the mounted routes
+through starlette.testclient (it is skipped when starlette or httpx is
+missing).
+
+Functions:
+- video_feed(request): MJPEG stream (async)
+- events_stream(request): Server-Sent Events (async)
+- events_poll(request): Long-poll for accident events (async)
+- accident_status(request): Current accident status
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+try:
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Mount, Route
+except ImportError as e:
+    raise ImportError("The ASGI server needs starlette and uvicorn: pip install starlette uvicorn") from e
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+import app as flask_app
+from encoder import AdaptiveQuality, viewer_options
+from events import KEEPALIVE_INTERVAL, format_sse
+from hub import StreamEnd
+
+
+def _waker():
+    """
+    asyncio.Event plus a thread-safe callback that sets it, for hub and
+    event-bus notifications coming from other threads.
+    """
+    loop = asyncio.get_running_loop()
+    event = asyncio.Event()
+
+    def wake():
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            # loop already closed (server shutting down)
+            pass
+
+    return event, wake
+
+
+async def _wait(event, timeout):
+    """Wait for event up to timeout seconds, then clear it. True if it was set."""
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        woken = True
+    except asyncio.TimeoutError:
+        woken = False
+    event.clear()
+    return woken
+
+
+async def _generate_frames(source, max_width, target_fps):
+    # keep the viewer informed while the model is still warming up
+    flask_app.start_detector_init()
+    while not flask_app.detector_ready.is_set() and flask_app.model_status['state'] == 'loading':
+        yield flask_app._message_frame("Model warming up...")
+        await asyncio.sleep(1.0)
+    if flask_app.model_status['state'] == 'failed':
+        yield flask_app._message_frame("Model failed to load", (0, 0, 255))
+        return
+    if flask_app.model_status['state'] != 'ready':
+        yield flask_app._message_frame("OpenCV Not Available", (0, 0, 255))
+        return
+
+    if source not in ['webcam'] and not source.startswith('rtsp://'):
+        source = os.path.join(flask_app.app.config['UPLOAD_FOLDER'], source)
+
+    quality = AdaptiveQuality(max_width=max_width, target_fps=target_fps)
+    wakeup, wake = _waker()
+    subscription = flask_app.hub.subscribe(source)
+    subscription.level = quality.level
+    subscription.notify = wake
+    try:
+        while True:
+            # non-blocking: an empty queue means await the next notify
+            ticket = subscription.get(timeout=0)
+            if ticket is None:
+                await _wait(wakeup, 1.0)
+                continue
+            if isinstance(ticket, StreamEnd):
+                if ticket.error:
+                    yield flask_app._message_frame("Video source error")
+                break
+            jpeg = await asyncio.wrap_future(ticket.future(subscription.level))
+            part = flask_app._multipart(jpeg)
+            # resumes once the server has handed the chunk to the client socket
+            sent = time.perf_counter()
+            yield part
+            quality.record(len(part), time.perf_counter() - sent)
+            subscription.level = quality.level
+    finally:
+        # also runs when the client disconnects and the task is cancelled
+        subscription.notify = None
+        subscription.close()
+
+
+async def video_feed(request):
+    args = request.query_params
+    source = args.get('source', 'webcam')
+    max_width, target_fps = viewer_options(args.get('width'), args.get('fps'))
+    return StreamingResponse(_generate_frames(source, max_width, target_fps),
+                             media_type='multipart/x-mixed-replace; boundary=frame')
+
+
+async def accident_status(request):
+    return JSONResponse(flask_app.accident_status_snapshot())
+
+
+async def _generate_events(last_id):
+    bus = flask_app.event_bus
+    wakeup, wake = _waker()
+    bus.add_listener(wake)
+    try:
+        yield 'retry: 3000\n\n'
+        yield f"event: status\ndata: {json.dumps(flask_app.accident_status_snapshot())}\n\n"
+        cursor = bus.last_id if last_id is None else last_id
+        while True:
+            events, missed = bus.since(cursor)
+            if missed:
+                yield f"event: reset\ndata: {json.dumps(flask_app.accident_status_snapshot())}\n\n"
+            for event in events:
+                yield format_sse(event)
+            if events:
+                cursor = events[-1]['id']
+                continue
+            cursor = min(cursor, bus.last_id)
+            if not await _wait(wakeup, KEEPALIVE_INTERVAL):
+                yield ': keepalive\n\n'
+    finally:
+        bus.remove_listener(wake)
+
+
+async def events_stream(request):
+    last_id = flask_app._parse_event_id(request.headers.get('last-event-id') or request.query_params.get('last_id'))
+    return StreamingResponse(_generate_events(last_id), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def events_poll(request):
+    bus = flask_app.event_bus
+    after = flask_app._parse_event_id(request.query_params.get('after'))
+    try:
+        timeout = min(max(float(request.query_params.get('timeout', flask_app.EVENTS_POLL_TIMEOUT)), 0.0),
+                      flask_app.EVENTS_MAX_POLL_TIMEOUT)
+    except ValueError:
+        return JSONResponse({'error': 'timeout must be a number'}, status_code=400)
+
+    wakeup, wake = _waker()
+    bus.add_listener(wake)
+    try:
+        cursor = bus.last_id if after is None else after
+        deadline = time.monotonic() + timeout
+        while True:
+            events, missed = bus.since(cursor)
+            remaining = deadline - time.monotonic()
+            if events or missed or remaining <= 0:
+                break
+            await _wait(wakeup, remaining)
+    finally:
+        bus.remove_listener(wake)
+    last_id = events[-1]['id'] if events else bus.last_id
+    return JSONResponse({'events': events, 'last_id': last_id, 'missed': missed,
+                         'status': flask_app.accident_status_snapshot()})
+
+
+# Only the streaming endpoints are native; every other route, current or
+# future, is the Flask app itself, mounted as the fallback
+app = Starlette(routes=[
+    Route('/video_feed', video_feed),
+    Route('/accident_status', accident_status),
+    Route('/events', events_stream),
+    Route('/events/poll', events_poll),
+    Mount('/', app=WSGIMiddleware(flask_app.app)),
+])
+
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("The ASGI server needs uvicorn: pip install starlette uvicorn")
+    port = int(os.environ.get("PORT", 5000))
+    uvicorn.run(app, host="0.0.0.0", port=port)
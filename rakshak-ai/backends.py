@@ -0,0 +1,321 @@
+"""
+Rakshak AI - Inference Backends
+===============================
+Selectable CPU inference backends for the YOLO model.
+
+- torch:    PyTorch weights through Ultralytics (default)
+- onnx:     ONNX export run through ONNX Runtime (pip install onnx onnxruntime)
+- openvino: OpenVINO IR export (pip install openvino)
+- auto:     openvino if installed, else onnx if installed, else torch
+
+Exports are produced once and cached next to the weights file, e.g.
+yolov8n.pt -> yolov8n.onnx / yolov8n_openvino_model/. An INT8 variant is
+available for both exported backends (yolov8n.int8.onnx via ONNX Runtime
+dynamic quantization, yolov8n_int8_openvino_model/ via OpenVINO/NNCF).
+Exports are rebuilt when the weights file is newer than the cached copy.
+
+Every backend is loaded as an Ultralytics YOLO object, so callers such as
+detect_vehicles() keep the same results and return contract.
+
+The backend can be chosen per call or with the RAKSHAK_BACKEND and
+RAKSHAK_INT8 environment variables.
+
+Usage (accuracy/speed comparison on the same clips):
+    python backends.py clip1.mp4 clip2.mp4 --backends torch onnx openvino --int8
+"""
+
+import importlib.util
+import os
+import shutil
+import time
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+DEFAULT_BACKEND = os.environ.get('RAKSHAK_BACKEND', 'torch').lower()
+DEFAULT_INT8 = os.environ.get('RAKSHAK_INT8', '').lower() in ('1', 'true', 'yes')
+
+# Calibration dataset used by Ultralytics for OpenVINO INT8 export
+INT8_CALIBRATION_DATA = os.environ.get('RAKSHAK_INT8_DATA', 'coco8.yaml')
+
+
+def _installed(module_name):
+    return importlib.util.find_spec(module_name) is not None
+
+
+def resolve_backend(backend=None):
+    """
+    Turn a backend name (or None/'auto') into one of BACKENDS.
+
+    Falls back to torch when the requested runtime is not installed.
+    """
+    backend = (backend or DEFAULT_BACKEND).lower()
+
+    if backend == 'auto':
+        if _installed('openvino'):
+            return 'openvino'
+        if _installed('onnxruntime'):
+            return 'onnx'
+        return 'torch'
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS + ('auto',)}")
+
+    if backend == 'onnx' and not _installed('onnxruntime'):
+        print("onnxruntime not installed, falling back to torch backend")
+        return 'torch'
+    if backend == 'openvino' and not _installed('openvino'):
+        print("openvino not installed, falling back to torch backend")
+        return 'torch'
+    return backend
+
+
+def export_path(weights_path, backend, int8=False):
+    """Return where the cached export for weights_path lives."""
+    stem, _ = os.path.splitext(weights_path)
+    if backend == 'onnx':
+        return f"{stem}.int8.onnx" if int8 else f"{stem}.onnx"
+    if backend == 'openvino':
+        return f"{stem}_int8_openvino_model" if int8 else f"{stem}_openvino_model"
+    return weights_path
+
+
+def _is_fresh(path, weights_path):
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(weights_path):
+        return True
+    return os.path.getmtime(path) >= os.path.getmtime(weights_path)
+
+
+def _move_into_place(produced, target):
+    produced = str(produced)
+    if os.path.abspath(produced) == os.path.abspath(target):
+        return target
+    if os.path.isdir(target):
+        shutil.rmtree(target)
+    elif os.path.exists(target):
+        os.remove(target)
+    shutil.move(produced, target)
+    return target
+
+
+def export_model(model_name="yolov8n.pt", backend='onnx', int8=False, imgsz=640):
+    """
+    Export the PyTorch weights for backend, reusing a cached export if present.
+
+    Args:
+        model_name: PyTorch weights (auto-downloaded by Ultralytics if missing)
+        backend: 'onnx' or 'openvino'
+        int8: Produce the INT8-quantized variant
+        imgsz: Export input size
+
+    Returns:
+        Path to the exported model file or directory
+    """
+    from ultralytics import YOLO
+
+    torch_model = None
+    weights_path = model_name
+    if not os.path.exists(weights_path):
+        # Let Ultralytics download the weights, then export next to them
+        torch_model = YOLO(model_name)
+        weights_path = str(getattr(torch_model, 'ckpt_path', None) or model_name)
+
+    target = export_path(weights_path, backend, int8)
+    if _is_fresh(target, weights_path):
+        return target
+
+    if torch_model is None:
+        torch_model = YOLO(weights_path)
+
+    print(f"Exporting {weights_path} to {backend}{' (INT8)' if int8 else ''}...")
+    start = time.perf_counter()
+
+    if backend == 'onnx':
+        # dynamic axes so batched inference keeps working
+        fp32_path = export_path(weights_path, 'onnx', False)
+        if not _is_fresh(fp32_path, weights_path):
+            produced = torch_model.export(format='onnx', imgsz=imgsz, dynamic=True)
+            _move_into_place(produced, fp32_path)
+        if int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(fp32_path, target, weight_type=QuantType.QUInt8)
+    elif backend == 'openvino':
+        kwargs = {'format': 'openvino', 'imgsz': imgsz, 'dynamic': True}
+        if int8:
+            kwargs.update(int8=True, data=INT8_CALIBRATION_DATA)
+        produced = torch_model.export(**kwargs)
+        _move_into_place(produced, target)
+    else:
+        raise ValueError(f"Backend '{backend}' has no export step")
+
+    print(f"Export finished in {time.perf_counter() - start:.1f}s: {target}")
+    return target
+
+
+def load_yolo(model_name="yolov8n.pt", backend=None, int8=None):
+    """
+    Load the YOLO model through the selected backend.
+
+    Args:
+        model_name: PyTorch weights name or path (default: yolov8n.pt)
+        backend: 'torch', 'onnx', 'openvino', 'auto' or None for RAKSHAK_BACKEND
+        int8: Use the INT8 variant (exported backends only); None for RAKSHAK_INT8
+
+    Returns:
+        tuple: (model, backend) where backend is the one actually used
+    """
+    from ultralytics import YOLO
+
+    backend = resolve_backend(backend)
+    int8 = DEFAULT_INT8 if int8 is None else int8
+
+    if backend == 'torch':
+        if int8:
+            print("INT8 is only available for onnx/openvino backends, using FP32 torch")
+        return YOLO(model_name), backend
+
+    try:
+        path = export_model(model_name, backend, int8)
+        return YOLO(path, task='detect'), backend
+    except Exception as e:
+        print(f"Failed to prepare {backend} backend ({e}), falling back to torch")
+        return YOLO(model_name), 'torch'
+
+
+def _read_clip(path, max_frames):
+    import cv2
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while cap.isOpened() and len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def _run(frames):
+    # the deployed path: per-stream Preprocessor buffers -> engine.detect()
+    import engine
+    from preprocess import Preprocessor
+
+    preprocessor = Preprocessor(engine.DEFAULT_IMGSZ)
+    # warm up so lazy initialisation is not counted
+    engine.warmup(frames[0].shape, preprocessor=preprocessor)
+    timings = []
+    detections = []
+    for frame in frames:
+        start = time.perf_counter()
+        (_, boxes), = engine.detect([frame], 1, preprocessor)
+        timings.append(time.perf_counter() - start)
+        detections.append(boxes)
+    return timings, detections
+
+
+def _match(reference, candidate, iou_threshold=0.5):
+    """Greedy same-class IoU matching; returns (matched, ref_total, cand_total)."""
+    from collision import cross_overlap
+
+    if not reference or not candidate:
+        return 0, len(reference), len(candidate)
+    _, iou = cross_overlap(reference, candidate)
+    same_class = [[r[4] == c[4] for c in candidate] for r in reference]
+    iou = iou * same_class
+    matched = 0
+    while iou.size and iou.max() >= iou_threshold:
+        r, c = divmod(int(iou.argmax()), iou.shape[1])
+        matched += 1
+        iou[r, :] = 0
+        iou[:, c] = 0
+    return matched, len(reference), len(candidate)
+
+
+def compare_backends(clips, backends=BACKENDS, int8=False, model_name="yolov8n.pt", max_frames=200):
+    """
+    Run the same clips through several backends and compare them against torch.
+
+    Accuracy parity is reported as precision/recall of each backend's boxes
+    against the torch boxes (same class, IoU >= 0.5) and as agreement of
+    check_accident() verdicts. Speed is mean per-frame latency and FPS of
+    engine.detect() with a Preprocessor, the path the stream detector runs.
+
+    Returns:
+        list of dicts, one per backend variant
+    """
+    import engine
+    from collision import find_collisions
+
+    frames = []
+    for clip in clips:
+        frames.extend(_read_clip(clip, max_frames))
+    if not frames:
+        raise ValueError("No frames could be read from the given clips")
+
+    variants = [('torch', False)]
+    for backend in backends:
+        if backend == 'torch':
+            continue
+        variants.append((backend, False))
+        if int8:
+            variants.append((backend, True))
+
+    report = []
+    reference = None
+    for backend, use_int8 in variants:
+        # each variant becomes the process-wide model, exactly as in the app
+        engine.unload_model()
+        if engine.load_model(model_name, backend, use_int8) is None or engine.get_backend() != backend:
+            print(f"Skipping {backend}: not available")
+            continue
+        timings, detections = _run(frames)
+        if reference is None:
+            reference = detections
+
+        matched = ref_total = cand_total = 0
+        verdict_agree = 0
+        for ref, cand in zip(reference, detections):
+            m, r, c = _match(ref, cand)
+            matched += m
+            ref_total += r
+            cand_total += c
+            verdict_agree += bool(find_collisions(ref)) == bool(find_collisions(cand))
+
+        mean_latency = sum(timings) / len(timings)
+        report.append({
+            'backend': backend + (' int8' if use_int8 else ''),
+            'frames': len(frames),
+            'mean_ms': mean_latency * 1000,
+            'fps': 1.0 / mean_latency if mean_latency > 0 else 0.0,
+            'precision': matched / cand_total if cand_total else 1.0,
+            'recall': matched / ref_total if ref_total else 1.0,
+            'accident_agreement': verdict_agree / len(frames),
+        })
+    engine.unload_model()
+
+    base_fps = report[0]['fps'] if report else 0.0
+    for row in report:
+        row['speedup'] = row['fps'] / base_fps if base_fps else 0.0
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare YOLO inference backends on video clips")
+    parser.add_argument('clips', nargs='+', help="Video files to run through every backend")
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--int8', action='store_true', help="Also benchmark INT8 variants")
+    parser.add_argument('--model', default="yolov8n.pt")
+    parser.add_argument('--max-frames', type=int, default=200, help="Frames per clip")
+    args = parser.parse_args()
+
+    rows = compare_backends(args.clips, args.backends, args.int8, args.model, args.max_frames)
+
+    print(f"{'backend':<14}{'frames':>8}{'ms/frame':>10}{'fps':>8}{'speedup':>9}"
+          f"{'precision':>11}{'recall':>8}{'accident':>10}")
+    for row in rows:
+        print(f"{row['backend']:<14}{row['frames']:>8}{row['mean_ms']:>10.1f}{row['fps']:>8.1f}"
+              f"{row['speedup']:>8.2f}x{row['precision']:>11.3f}{row['recall']:>8.3f}"
+              f"{row['accident_agreement']:>10.3f}")
@@ -0,0 +1,187 @@
+"""
+Rakshak AI - Threaded Frame Capture
+===================================
+Reads and decodes frames on a background thread so a slow model never
+stalls the capture device.
+
+Live sources (webcam, rtsp:// and other network streams) use a small
+drop-oldest queue: when inference falls behind, stale frames are thrown
+away and the consumer always gets the freshest one. Files use a lossless
+queue: the reader blocks until the consumer catches up, so every frame is
+analysed.
+
+Classes:
+- FrameGrabber(source): Background capture with a bounded queue and drop counters
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import threading
+from collections import deque
+
+LIVE_PREFIXES = ('rtsp://', 'rtmp://', 'http://', 'https://')
+
+# Frame rate assumed when the container does not report one
+DEFAULT_FPS = 25
+
+# Default queue sizes: live feeds keep only the freshest frames,
+# files buffer a little decode-ahead without ever dropping
+LIVE_QUEUE_SIZE = 2
+FILE_QUEUE_SIZE = 32
+
+
+def is_live_source(source):
+    """Return True for webcams and network streams, False for files."""
+    if isinstance(source, int) or source == 'webcam':
+        return True
+    return str(source).lower().startswith(LIVE_PREFIXES)
+
+
+def open_capture(source):
+    """Open a cv2.VideoCapture for 'webcam', a device index, a URL or a file."""
+    if source == 'webcam':
+        return cv2.VideoCapture(0)
+    return cv2.VideoCapture(source)
+
+
+class FrameGrabber:
+    def __init__(self, source, queue_size=None, drop_oldest=None):
+        """
+        Create a grabber for source. Call start() to begin reading.
+
+        Args:
+            source: 'webcam', a device index, an rtsp:// URL or a file path
+            queue_size: Maximum buffered frames (default depends on source type)
+            drop_oldest: Drop stale frames when the queue is full. Defaults to
+                         True for live sources and False (lossless) for files.
+        """
+        self.source = source
+        self.live = is_live_source(source)
+        self.drop_oldest = self.live if drop_oldest is None else drop_oldest
+        if queue_size is None:
+            queue_size = LIVE_QUEUE_SIZE if self.drop_oldest else FILE_QUEUE_SIZE
+        self.queue_size = max(1, int(queue_size))
+
+        self.cap = None
+        self.fps = None
+        self._frames = deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._finished = False
+
+        # counters exposed through stats()
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.frames_delivered = 0
+
+    def start(self):
+        """
+        Open the source and start the reader thread.
+
+        Returns:
+            True if the source was opened, False otherwise
+        """
+        self.cap = open_capture(self.source)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self._finished = True
+            return False
+        # read before the reader thread owns the capture
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+        self._thread = threading.Thread(target=self._reader, name=f"capture-{self.source}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _reader(self):
+        try:
+            while not self._stopped:
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+
+                with self._cond:
+                    if self._stopped:
+                        # stop() was called while the capture was blocked in read()
+                        break
+                    self.frames_read += 1
+                    if self.drop_oldest:
+                        if len(self._frames) >= self.queue_size:
+                            self._frames.popleft()
+                            self.frames_dropped += 1
+                    else:
+                        while len(self._frames) >= self.queue_size and not self._stopped:
+                            self._cond.wait()
+                    self._frames.append(frame)
+                    self._cond.notify_all()
+        except Exception as e:
+            print(f"[capture] Error reading {self.source}: {e}")
+        finally:
+            self.cap.release()
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def read(self, timeout=None):
+        """
+        Get the next frame to process.
+
+        Live sources return the freshest buffered frame and discard any
+        older ones (counted as dropped). Files return frames in order.
+
+        Args:
+            timeout: Seconds to wait for a frame (None waits indefinitely)
+
+        Returns:
+            tuple: (ret, frame) like cv2.VideoCapture.read(); ret is False
+                   once the source is exhausted or the grabber is stopped
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frames or self._finished or self._stopped, timeout):
+                return False, None
+            if not self._frames:
+                return False, None
+
+            if self.drop_oldest:
+                frame = self._frames.pop()
+                self.frames_dropped += len(self._frames)
+                self._frames.clear()
+            else:
+                frame = self._frames.popleft()
+            self.frames_delivered += 1
+            self._cond.notify_all()
+            return True, frame
+
+    def isOpened(self):
+        """Mirror cv2.VideoCapture.isOpened(): True while frames may still arrive."""
+        with self._cond:
+            return bool(self._frames) or not (self._finished or self._stopped)
+
+    def stop(self):
+        """Stop the reader thread and release the capture."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+
+    release = stop
+
+    def stats(self):
+        """Return a snapshot of the capture counters."""
+        with self._cond:
+            return {
+                'source': str(self.source),
+                'live': self.live,
+                'drop_oldest': self.drop_oldest,
+                'queue_size': self.queue_size,
+                'queued': len(self._frames),
+                'frames_read': self.frames_read,
+                'frames_dropped': self.frames_dropped,
+                'frames_delivered': self.frames_delivered,
+            }
@@ -1,53 +1,353 @@
+import atexit
+import json
+import os
+import queue
 import sqlite3
+import threading
+import time
+from collections import Counter
 from datetime import datetime
 import numpy as np
 
+# Applied to every connection. WAL lets the dashboard read while the writer
+# commits; synchronous=NORMAL is durable across application crashes in WAL
+# mode and only fsyncs at checkpoints.
+PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=5000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-8000',
+)
+
+# Rows grouped into one transaction by the background writer
+WRITE_BATCH_SIZE = 256
+# Attempts per batch before the writer sets it aside (e.g. disk full)
+WRITE_RETRIES = 3
+# Seconds between further attempts at rows set aside after failing
+PENDING_RETRY_INTERVAL = 5.0
+
+INSERT_SQL = ('INSERT INTO accidents (timestamp, latitude, longitude, severity, description, ts) '
+              'VALUES (?, ?, ?, ?, ?, ?)')
+
+# Rollup periods: bucket key format (local time) per period. 'total' has a single '' bucket.
+ROLLUP_BUCKETS = {
+    'hour': '%Y-%m-%d %H:00',
+    'day': '%Y-%m-%d',
+}
+
+ROLLUP_UPSERT_SQL = ('INSERT INTO accident_rollups (period, bucket, severity, count) VALUES (?, ?, ?, ?) '
+                     'ON CONFLICT (period, bucket, severity) DO UPDATE SET count = count + excluded.count')
+
+# Columns returned by get_logs(), in the original table order
+LOG_COLUMNS = 'id, timestamp, latitude, longitude, severity, description'
+
+_STOP = object()
+
+
 class Database:
-    def __init__(self, db_name='accidents.db'):
+    def __init__(self, db_name='accidents.db', batch_size=WRITE_BATCH_SIZE):
         self.db_name = db_name
+        self.batch_size = batch_size
+
+        # one long-lived connection for the writer thread, one for readers
+        self._write_conn = self._connect()
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
         self.create_table()
 
+        # log_accident() only enqueues; the writer commits rows in batches
+        self._queue = queue.Queue()
+        self._closed = False
+        self._state_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._write_loop, name='db-writer', daemon=True)
+        self._writer.start()
+        self._load_spill()
+        atexit.register(self.close)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
     def create_table(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS accidents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                latitude REAL,
-                longitude REAL,
-                severity INTEGER,
-                description TEXT
-            )
-        ''')
-        conn.commit()
-        conn.close()
+        with self._write_conn:
+            # one write transaction for the whole schema setup, so a second
+            # process opening the same file cannot see the rollups table
+            # between its creation and the backfill (and backfill it twice)
+            self._write_conn.execute('BEGIN IMMEDIATE')
+            self._write_conn.execute('''
+                CREATE TABLE IF NOT EXISTS accidents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT,
+                    latitude REAL,
+                    longitude REAL,
+                    severity INTEGER,
+                    description TEXT,
+                    ts REAL
+                )
+            ''')
+            # databases created before the numeric ts column: add and backfill it
+            # from the local-time text timestamp
+            columns = [row[1] for row in self._write_conn.execute('PRAGMA table_info(accidents)')]
+            if 'ts' not in columns:
+                self._write_conn.execute('ALTER TABLE accidents ADD COLUMN ts REAL')
+                self._write_conn.execute(
+                    "UPDATE accidents SET ts = CAST(strftime('%s', timestamp, 'utc') AS REAL) WHERE ts IS NULL")
+            # (ts, id) serves newest-first paging and time ranges; severity filters use the second
+            self._write_conn.execute('CREATE INDEX IF NOT EXISTS idx_accidents_ts ON accidents (ts, id)')
+            self._write_conn.execute('CREATE INDEX IF NOT EXISTS idx_accidents_severity_ts ON accidents (severity, ts, id)')
+            # rows whose text timestamp could not be parsed take the latest ts
+            # of the rows before them (0 if none), so (ts, id) order still
+            # follows insertion order and every row can be paged past
+            self._write_conn.execute(
+                'UPDATE accidents SET ts = COALESCE((SELECT MAX(prev.ts) FROM accidents AS prev '
+                'WHERE prev.id < accidents.id AND prev.ts IS NOT NULL), 0) WHERE ts IS NULL')
+
+            # counts per (period, bucket, severity), kept in step with accidents by
+            # _insert_rows() so statistics never scan the accidents table
+            exists = self._write_conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'accident_rollups'").fetchone()
+            self._write_conn.execute('''
+                CREATE TABLE IF NOT EXISTS accident_rollups (
+                    period TEXT,
+                    bucket TEXT,
+                    severity INTEGER,
+                    count INTEGER,
+                    PRIMARY KEY (period, bucket, severity)
+                ) WITHOUT ROWID
+            ''')
+            if not exists:
+                # one-off backfill from the existing history
+                self._write_conn.execute(
+                    "INSERT INTO accident_rollups SELECT 'total', '', COALESCE(severity, 0) AS sev, COUNT(*) "
+                    "FROM accidents GROUP BY sev")
+                for period, fmt in ROLLUP_BUCKETS.items():
+                    self._write_conn.execute(
+                        "INSERT INTO accident_rollups SELECT ?, strftime(?, ts, 'unixepoch', 'localtime') AS bucket, "
+                        "COALESCE(severity, 0) AS sev, COUNT(*) FROM accidents WHERE ts IS NOT NULL GROUP BY bucket, sev",
+                        (period, fmt))
+
+    def _write_rows(self, conn, rows):
+        conn.executemany(INSERT_SQL, rows)
+        counts = Counter()
+        for row in rows:
+            severity, ts = row[3] or 0, row[5]
+            counts['total', '', severity] += 1
+            local = datetime.fromtimestamp(ts)
+            for period, fmt in ROLLUP_BUCKETS.items():
+                counts[period, local.strftime(fmt), severity] += 1
+        conn.executemany(ROLLUP_UPSERT_SQL, [(*key, count) for key, count in counts.items()])
+
+    def _insert_rows(self, rows):
+        # one transaction per batch instead of one commit per accident; the
+        # rollups are updated in the same transaction
+        with self._write_conn:
+            self._write_rows(self._write_conn, rows)
+
+    def _write_loop(self):
+        pending = []   # rows whose batch failed, retried ahead of new ones
+        while True:
+            try:
+                item = self._queue.get(timeout=PENDING_RETRY_INTERVAL if pending else None)
+            except queue.Empty:
+                batch = []
+            else:
+                batch = [item]
+            # drain whatever else arrived during the previous commit
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(row is _STOP for row in batch)
+            rows = pending + [row for row in batch if row is not _STOP]
+            pending = []
+            try:
+                if rows and not self._write_with_retries(rows):
+                    # keep them for the next round instead of dropping them
+                    pending = rows
+            except Exception as e:
+                # the writer must outlive anything one batch throws
+                print(f"Accident writer error: {e}")
+                pending = rows
+            try:
+                if stop and pending:
+                    self._spill(pending)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _write_with_retries(self, rows):
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                self._insert_rows(rows)
+                return True
+            except sqlite3.Error as e:
+                print(f"Failed to write {len(rows)} accident row(s) (attempt {attempt}): {e}")
+                time.sleep(0.1 * attempt)
+        return False
+
+    @property
+    def spill_path(self):
+        return self.db_name + '.pending'
+
+    def _spill(self, rows):
+        # rows still unwritten at close(): saved as JSON lines and queued again
+        # by the next Database opened on the same file
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(list(row), default=lambda value: value.item()) + '\n')
+            print(f"Saved {len(rows)} unwritten accident row(s) to {self.spill_path}")
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Lost {len(rows)} accident row(s), could not save them: {e}")
+
+    def _load_spill(self):
+        if self.db_name == ':memory:' or not os.path.exists(self.spill_path):
+            return
+        with open(self.spill_path, encoding='utf-8') as f:
+            rows = [tuple(json.loads(line)) for line in f if line.strip()]
+        os.remove(self.spill_path)
+        for row in rows:
+            self._queue.put(row)
 
     def log_accident(self, latitude=None, longitude=None, severity=1, description='Accident detected'):
         if latitude is None:
             latitude = 28.6139 + (np.random.random() - 0.5) * 0.1  # Dummy random lat around Delhi
         if longitude is None:
             longitude = 77.2090 + (np.random.random() - 0.5) * 0.1  # Dummy random lng around Delhi
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('INSERT INTO accidents (timestamp, latitude, longitude, severity, description) VALUES (?, ?, ?, ?, ?)',
-                       (timestamp, latitude, longitude, severity, description))
-        conn.commit()
-        conn.close()
-
-    def get_logs(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM accidents ORDER BY timestamp DESC')
-        logs = cursor.fetchall()
-        conn.close()
-        return logs
+        now = time.time()
+        timestamp = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        row = (timestamp, latitude, longitude, severity, description, now)
+        with self._state_lock:
+            if not self._closed:
+                self._queue.put(row)
+                return
+        # after close() (e.g. a stream still running during shutdown) write directly
+        conn = self._connect()
+        try:
+            with conn:
+                self._write_rows(conn, [row])
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Block until every queued accident has been handled (committed, or set aside after failing)."""
+        self._queue.join()
+
+    def close(self):
+        """Commit queued rows, stop the writer and close the connections."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+        self._write_conn.close()
+        atexit.unregister(self.close)
+        with self._read_lock:
+            self._read_conn.close()
+            self._read_conn = None
+
+    def _query(self, sql, params=()):
+        # rows still in the writer queue are not visible yet; call flush() first
+        # where that matters
+        with self._read_lock:
+            if self._read_conn is None:
+                self._read_conn = self._connect()
+            return self._read_conn.execute(sql, params).fetchall()
+
+    def get_logs(self, before=None, limit=None, since=None, until=None, severity=None, min_severity=None):
+        """
+        Accident rows, newest first.
+
+        Args:
+            before: Keyset cursor: a (ts, id) pair from the last row of the
+                    previous page, or a bare ts; only older rows are returned
+            limit: Maximum rows (default: all)
+            since, until: Unix-time range [since, until)
+            severity: Only this severity
+            min_severity: Only this severity or higher
+
+        Returns:
+            list: (id, timestamp, latitude, longitude, severity, description, ts) tuples
+        """
+        where = []
+        params = []
+        if before is not None:
+            if isinstance(before, (tuple, list)):
+                where.append('(ts, id) < (?, ?)')
+                params.extend(before)
+            else:
+                where.append('ts < ?')
+                params.append(before)
+        if since is not None:
+            where.append('ts >= ?')
+            params.append(since)
+        if until is not None:
+            where.append('ts < ?')
+            params.append(until)
+        if severity is not None:
+            where.append('severity = ?')
+            params.append(severity)
+        if min_severity is not None:
+            where.append('severity >= ?')
+            params.append(min_severity)
+
+        sql = f'SELECT {LOG_COLUMNS}, ts FROM accidents'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ts DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        return self._query(sql, params)
 
     def get_accident_count(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM accidents')
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        return self._query("SELECT COALESCE(SUM(count), 0) FROM accident_rollups WHERE period = 'total'")[0][0]
+
+    def get_severity_counts(self):
+        """(severity, count) pairs from the rollups, ordered by severity."""
+        return self._query(
+            "SELECT severity, count FROM accident_rollups WHERE period = 'total' ORDER BY severity")
+
+    def get_bucket_counts(self, period='hour', limit=24):
+        """
+        Accident counts per time bucket from the rollups, newest first.
+
+        Args:
+            period: 'hour' or 'day'
+            limit: Number of most recent non-empty buckets
+
+        Returns:
+            list: (bucket, count) pairs; bucket is local 'YYYY-MM-DD HH:00' or 'YYYY-MM-DD'
+        """
+        if period not in ROLLUP_BUCKETS:
+            raise ValueError(f"Unknown period '{period}', expected one of {tuple(ROLLUP_BUCKETS)}")
+        return self._query(
+            'SELECT bucket, SUM(count) FROM accident_rollups WHERE period = ? '
+            'GROUP BY bucket ORDER BY bucket DESC LIMIT ?', (period, int(limit)))
+
+    def get_stats(self, hours=24, days=30):
+        """
+        Dashboard statistics read only from the rollups, so the cost does not
+        grow with the size of the accident history.
+
+        Returns:
+            dict: total, by_severity {severity: count}, average_severity,
+                  hourly and daily [(bucket, count)] newest first
+        """
+        by_severity = dict(self.get_severity_counts())
+        total = sum(by_severity.values())
+        return {
+            'total': total,
+            'by_severity': by_severity,
+            'average_severity': sum(s * c for s, c in by_severity.items()) / total if total else 0.0,
+            'hourly': self.get_bucket_counts('hour', hours),
+            'daily': self.get_bucket_counts('day', days),
+        }
@@ -4,6 +4,9 @@ Rakshak AI - Car Detector
 YOLO-based car/vehicle detection with accident detection.
 Used by the Flask app for real-time video processing.
 
+The model and detect/collide pipeline come from engine.py; this module
+adds the per-stream video loop (capture, scheduling, tracking).
+
 Note: For Streamlit Cloud, use model_logic.py instead.
 """
 
@@ -13,136 +16,299 @@ try:
 except Exception:
     cv2 = None
 
-import numpy as np
-import os
+import time
 
-# Patch torch.load to use weights_only=False for YOLO model compatibility
-import torch
-_original_torch_load = torch.load
+import engine
+from annotation import draw_detections
+from capture import FrameGrabber
+from collision import VEHICLE_CLASSES
+from motion import MotionGate
+from preprocess import STRIDE, Preprocessor
+from scheduler import StrideScheduler
+from source_config import get_source_config
+from tracker import CollisionMonitor
 
-def _patched_torch_load(f, *args, **kwargs):
-    """Patched torch.load that defaults to weights_only=False"""
-    if 'weights_only' not in kwargs:
-        kwargs['weights_only'] = False
-    return _original_torch_load(f, *args, **kwargs)
 
-torch.load = _patched_torch_load
+# per-frame actions chosen by the scheduler and motion gate
+INFER = 'infer'
+SKIP_STRIDE = 'skip_stride'
+SKIP_STATIC = 'skip_static'
 
 
 class CarDetector:
-    def __init__(self, model_name="yolov8n.pt"):
+    def __init__(self, model_name="yolov8n.pt", motion_gate=True, scheduler=True, backend=None, int8=None,
+                 roi=None, imgsz=None, tiler=None, timeseries=None):
         """
         Initialize the car detector with YOLO model.
-        Model is automatically downloaded if not present.
+        Model is automatically downloaded if not present. The model is the
+        shared engine model, so several detectors (and model_logic) in one
+        process hold a single copy; per-stream state stays on the detector.
         
         Args:
             model_name: Name of YOLO model to use (default: yolov8n.pt)
+            motion_gate: True for a MotionGate with default thresholds, a
+                         configured MotionGate instance, or False/None to run
+                         YOLO on every frame
+            scheduler: True for a StrideScheduler with default strides, a
+                       configured StrideScheduler, or False/None to sample
+                       every frame
+            backend: 'torch', 'onnx', 'openvino' or 'auto' (default: RAKSHAK_BACKEND)
+            int8: Use the INT8-quantized export (onnx/openvino only)
+            roi: roi.RegionOfInterest applied to every frame; a source's own
+                 ROI from source_config takes precedence in process_video()
+            imgsz: Model input size (default: RAKSHAK_IMGSZ); overridden per source
+            tiler: tiling.Tiler for tiled inference on high-resolution feeds;
+                   overridden per source
+            timeseries: Optional timeseries.TimeSeriesStore; process_video()
+                        then records every frame's count and boxes per source
         """
         # Check cv2 availability
         if cv2 is None:
             raise ImportError("OpenCV (cv2) is not available. Please install opencv-python-headless")
         
-        from ultralytics import YOLO
-        
-        print(f"Loading YOLO model: {model_name}")
-        print("Model will be auto-downloaded if not cached...")
-        
-        # YOLO() automatically downloads the model if not present
-        # It caches the model after first download
-        self.model = YOLO(model_name)
+        self.model = engine.load_model(model_name, backend, int8)
+        if self.model is None:
+            raise RuntimeError(f"Failed to load YOLO model: {engine.get_loading_error()}")
+        self.backend = engine.get_backend()
+        print(f"Inference backend: {self.backend}")
         
-        # counter for consecutive-frame overlaps to confirm collisions
-        self.overlap_count = 0
+        # per-vehicle-pair overlap history to confirm collisions
+        self.monitor = CollisionMonitor(min_consecutive=3)
+        self.last_overlap_candidate = False
         self.prev_boxes = []
 
-    def detect_cars(self, results):
-        car_count = 0
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                cls = int(box.cls[0])
-                if cls in [2, 3, 5, 7]:  # car, motorcycle, bus, truck
-                    car_count += 1
-        return car_count
-
-    def process_frame(self, frame):
-        results = self.model(frame)
-        annotated_frame = results[0].plot()
-
-        car_count = self.detect_cars(results)
-        cv2.putText(annotated_frame, f"Cars Detected: {car_count}", (50, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-
-        # extract boxes as (x1,y1,x2,y2,cls)
-        boxes = []
-        if len(results) > 0:
-            for box in results[0].boxes:
-                xy = box.xyxy[0].tolist()
-                cls = int(box.cls[0])
-                boxes.append((xy[0], xy[1], xy[2], xy[3], cls))
+        # background frame grabber for the video currently being processed
+        self.grabber = None
+
+        # skip inference on static scenes and reuse the last detections
+        if motion_gate is True:
+            motion_gate = MotionGate()
+        self.motion_gate = motion_gate or None
+
+        # adapt the inference stride to recent activity
+        if scheduler is True:
+            scheduler = StrideScheduler()
+        self.scheduler = scheduler or None
+
+        # letterbox/normalize buffers reused for every frame of this stream
+        self.imgsz = imgsz or engine.DEFAULT_IMGSZ
+        self.preprocessor = Preprocessor(self.imgsz)
+
+        # road polygon: only its bounding crop is inferred
+        self.roi = roi
+        self.tiler = tiler
+
+        # per-frame counts and boxes for traffic analytics and replay
+        self.timeseries = timeseries
+
+    def warmup(self, frame_shape=(480, 640, 3), runs=engine.WARMUP_RUNS):
+        """
+        Run dummy inferences at the stream's resolution, preallocating the
+        preprocessing buffers, so the first real frames are not slow.
+
+        Returns:
+            list: Seconds taken by each run
+        """
+        return engine.warmup(frame_shape, runs, preprocessor=self.preprocessor)
+
+    def annotate_frame(self, frame, car_count, boxes, roi=None):
+        """
+        Draw boxes, the car count and the ROI outline on a copy of frame.
+
+        Only needed when a viewer or output writer will consume the frame;
+        process_frame(annotate=False) skips it entirely.
+        """
+        annotated = draw_detections(frame, boxes, car_count, "Cars Detected", engine.class_names())
+        if roi is not None:
+            roi.draw(annotated)
+        return annotated
+
+    def process_frame(self, frame, annotate=True, roi=None, tiler=None):
+        """
+        Detect on one frame.
+
+        Args:
+            frame: BGR frame
+            annotate: Draw detections (annotated_frame is None when False)
+            roi: Region of interest for this frame (default: self.roi)
+            tiler: Tiled inference for this frame (default: self.tiler)
+
+        Returns:
+            (annotated_frame, car_count, boxes) with boxes in full-frame coordinates
+        """
+        roi = roi or self.roi
+        tiler = tiler or self.tiler
+        car_count, boxes = engine.detect([frame], preprocessor=self.preprocessor, roi=roi, tiler=tiler)[0]
+
+        annotated_frame = self.annotate_frame(frame, car_count, boxes, roi) if annotate else None
 
         return annotated_frame, car_count, boxes
 
-    def process_video(self, source):
-        if source == 'webcam':
-            cap = cv2.VideoCapture(0)
-        elif source.startswith('rtsp://'):
-            cap = cv2.VideoCapture(source)
-        else:
-            cap = cv2.VideoCapture(source)
+    def process_frames(self, frames, annotate=True, roi=None, tiler=None):
+        """
+        Run several frames through the model in one forward pass.
+
+        Args:
+            frames: List of BGR frames
+            annotate: Draw detections on each frame (annotated_frame is None when False)
+            roi: Region of interest for these frames (default: self.roi)
+            tiler: Tiled inference for these frames (default: self.tiler)
+
+        Returns:
+            List of (annotated_frame, car_count, boxes) tuples, one per frame
+        """
+        if not frames:
+            return []
+
+        roi = roi or self.roi
+        tiler = tiler or self.tiler
+        outputs = []
+        detections = engine.detect(frames, len(frames), self.preprocessor, roi, tiler=tiler)
+        for frame, (car_count, boxes) in zip(frames, detections):
+            annotated_frame = self.annotate_frame(frame, car_count, boxes, roi) if annotate else None
+            outputs.append((annotated_frame, car_count, boxes))
+        return outputs
+
+    def check_overlaps(self, boxes, frame_index=None):
+        """
+        Update the per-pair overlap history with one inferred frame's boxes.
+
+        A collision is confirmed when the same two tracked vehicles overlap
+        on 3 inferred frames; frames skipped by the scheduler or motion gate
+        neither add nor remove evidence.
+
+        Returns:
+            (accident_flag, severity)
+        """
+        # require both a sufficiently large IoU and a minimum intersection area to avoid tiny overlaps
+        accident_flag, severity, collisions = engine.check_collisions(
+            boxes, overlap_threshold=0.8, min_area=5000, monitor=self.monitor, frame_index=frame_index)
+        self.last_overlap_candidate = bool(collisions)
+        if collisions:
+            _, _, iou, interArea = collisions[0]
+            # debug log to help tune thresholds
+            print(f"[detector] Overlap candidate: iou={iou:.2f} interArea={interArea} (frame, {len(collisions)} pair(s))")
+
+        return accident_flag, severity
+
+    def process_video(self, source, batch_size=1, annotate=True):
+        """
+        Yield (frame, car_count, accident_flag, severity) for every frame of source.
+
+        Args:
+            source: 'webcam', an rtsp:// URL or a video file path
+            batch_size: Frames per forward pass. Keep 1 for live sources;
+                        larger values speed up offline file analysis.
+            annotate: Draw detections on yielded frames. Pass False for
+                      headless analysis; frame is then None.
 
-        if not cap.isOpened():
+        Frames the stride scheduler does not sample, and samples the motion
+        gate considers unchanged, reuse the last detections instead of
+        running YOLO.
+        """
+        # capture runs on its own thread: drop-oldest for live feeds, lossless for files
+        grabber = FrameGrabber(source)
+        self.grabber = grabber
+
+        if not grabber.start():
             print(f"Error: Could not open video source {source}")
             return
 
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                print("Error: Could not read frame")
-                break
-
-            processed_frame, car_count, boxes = self.process_frame(frame)
-
-            accident_flag = False
-            severity = 0
-
-            # detect significant overlap between any two vehicle boxes
-            for i in range(len(boxes)):
-                for j in range(i+1, len(boxes)):
-                    a = boxes[i]
-                    b = boxes[j]
-                    # only consider vehicle classes
-                    if a[4] not in [2,3,5,7] or b[4] not in [2,3,5,7]:
-                        continue
-                    xA = max(a[0], b[0])
-                    yA = max(a[1], b[1])
-                    xB = min(a[2], b[2])
-                    yB = min(a[3], b[3])
-                    interW = max(0, xB - xA)
-                    interH = max(0, yB - yA)
-                    interArea = interW * interH
-                    boxAArea = max(0, (a[2] - a[0])) * max(0, (a[3] - a[1]))
-                    boxBArea = max(0, (b[2] - b[0])) * max(0, (b[3] - b[1]))
-                    unionArea = boxAArea + boxBArea - interArea if (boxAArea + boxBArea - interArea) > 0 else 1
-                    iou = interArea / unionArea
-                    # require both a sufficiently large IoU and a minimum intersection area to avoid tiny overlaps
-                    if iou > 0.8 and interArea > 5000:
-                        # debug log to help tune thresholds
-                        print(f"[detector] Overlap candidate: iou={iou:.2f} interArea={interArea} (frame)")
-                        self.overlap_count += 1
-                        print(f"[detector] overlap_count={self.overlap_count}")
-                        if self.overlap_count >= 3:
-                            accident_flag = True
-                            severity = min(5, int(iou * 10))
-                            self.overlap_count = 0
+        batch_size = max(1, int(batch_size))
+
+        # per-camera settings (ROI, input size, tiling) override the detector defaults.
+        # The motion gate also looks only inside it, so moving clouds or
+        # pedestrians on the footpath do not trigger inference.
+        config = get_source_config(source)
+        roi = config.roi or self.roi
+        tiler = config.tiler or self.tiler
+        imgsz = config.imgsz or self.imgsz
+        if -(-int(imgsz) // STRIDE) * STRIDE != self.preprocessor.imgsz:
+            self.preprocessor = Preprocessor(imgsz)
+
+        gate = self.motion_gate
+        if gate is not None:
+            gate.reset()
+        scheduler = self.scheduler
+        if scheduler is not None:
+            scheduler.reset()
+        self.monitor.reset()
+        series = self.timeseries.open(source) if self.timeseries is not None else None
+        # live frames are stamped when processed; file frames at their media
+        # position from the start of the run, so a file analysed faster or
+        # slower than real time keeps its own timeline
+        started = time.time()
+        last_detections = (0, [])
+        frame_index = -1
+
+        try:
+            while grabber.isOpened():
+                frames = []
+                while len(frames) < batch_size:
+                    ret, frame = grabber.read()
+                    if not ret:
                         break
-                if accident_flag:
+                    frames.append(frame)
+
+                if not frames:
+                    print("Error: Could not read frame")
                     break
 
-            # decay overlap_count when no qualifying overlap found
-            if not accident_flag:
-                if self.overlap_count > 0:
-                    self.overlap_count = max(0, self.overlap_count - 1)
+                # stride scheduler samples frames by recent activity, then the
+                # motion gate drops samples whose scene has not changed
+                infer_mask = []
+                for frame in frames:
+                    if scheduler is not None and not scheduler.tick():
+                        infer_mask.append(SKIP_STRIDE)
+                    elif gate is not None and not gate.should_infer(roi.crop(frame)[0] if roi else frame):
+                        infer_mask.append(SKIP_STATIC)
+                    else:
+                        infer_mask.append(INFER)
+                to_infer = [frame for frame, action in zip(frames, infer_mask) if action == INFER]
 
-            yield processed_frame, car_count, accident_flag, severity
+                if len(to_infer) == 1:
+                    fresh = iter([self.process_frame(to_infer[0], annotate, roi, tiler)])
+                else:
+                    fresh = iter(self.process_frames(to_infer, annotate, roi, tiler))
+
+                for frame, action in zip(frames, infer_mask):
+                    frame_index += 1
+                    if action == INFER:
+                        processed_frame, car_count, boxes = next(fresh)
+                        last_detections = (car_count, boxes)
+                        accident_flag, severity = self.check_overlaps(boxes, frame_index)
+                        if scheduler is not None:
+                            scheduler.observe(car_count, self.last_overlap_candidate)
+                    else:
+                        # skipped frame: no new overlap evidence. Between stride samples the
+                        # tracker interpolates vehicle boxes; a static scene keeps the last ones.
+                        car_count, boxes = last_detections
+                        if action == SKIP_STRIDE:
+                            boxes = self.monitor.tracker.predicted_boxes(frame_index) + \
+                                [b for b in boxes if b[4] not in VEHICLE_CLASSES]
+                        processed_frame = self.annotate_frame(frame, car_count, boxes, roi) if annotate else None
+                        accident_flag, severity = False, 0
+                    if series is not None:
+                        ts = time.time() if grabber.live else started + frame_index / grabber.fps
+                        series.append(ts, frame_index, car_count, boxes, accident_flag, severity,
+                                      inferred=action == INFER)
+                    yield processed_frame, car_count, accident_flag, severity
+
+                if len(frames) < batch_size:
+                    break
+        finally:
+            grabber.stop()
+            if series is not None:
+                series.release()
+            stats = grabber.stats()
+            print(f"[detector] Capture finished for {source}: read={stats['frames_read']} dropped={stats['frames_dropped']}")
+            if scheduler is not None:
+                print(f"[detector] Scheduler sampled {scheduler.frames_sampled}/{scheduler.frames_seen} frames")
+            if gate is not None:
+                print(f"[detector] Motion gate skipped {gate.frames_skipped}/{gate.frames_seen} frames")
 
-        cap.release()
+    def capture_stats(self):
+        """Return read/dropped frame counters for the most recent capture, or None."""
+        if self.grabber is None:
+            return None
+        return self.grabber.stats()
@@ -0,0 +1,173 @@
+"""
+Rakshak AI - Alert Dispatcher
+=============================
+Delivers accident alerts (siren, SMS) off the stream pipelines.
+
+Alerts are submitted when an incident is confirmed or escalates
+(incidents.py) and delivered by one dispatcher instead of a thread per
+alert. Logging the incident is not its job: the accident log records
+every confirmed incident, cooldown or not.
+
+- submit() is non-blocking and cheap enough to call from a stream thread
+- a per-source cooldown drops repeats of an alert that was already sent
+  (e.g. a crash that resolves and immediately re-triggers); a higher
+  severity within the window still goes out as an escalation
+- a bounded queue served by a small worker pool; when it is full new
+  alerts are counted as dropped rather than piling up threads
+- SMS delivery is retried with exponential backoff on network errors,
+  429 and 5xx, never on permanent rejections
+- delivery counters for /alerts/stats
+
+Classes:
+- AlertDispatcher: Queue, workers, cooldowns and metrics
+"""
+
+import os
+import queue
+import threading
+import time
+
+from alerts import AlertError
+
+# Alerts waiting for a worker before new ones are dropped
+ALERT_QUEUE_SIZE = 64
+ALERT_WORKERS = 2
+
+# Seconds after an alert during which the same source is not alerted again
+ALERT_COOLDOWN = float(os.environ.get('RAKSHAK_ALERT_COOLDOWN', 60))
+
+# SMS retries after the first attempt, and the first backoff delay in seconds
+ALERT_RETRIES = 3
+ALERT_BACKOFF = 1.0
+
+_STOP = object()
+
+
+class AlertDispatcher:
+    def __init__(self, alerts, workers=ALERT_WORKERS, queue_size=ALERT_QUEUE_SIZE,
+                 cooldown=ALERT_COOLDOWN, retries=ALERT_RETRIES, backoff=ALERT_BACKOFF, siren=True):
+        """
+        Args:
+            alerts: alerts.Alerts used for the siren and SMS
+            workers: Delivery threads
+            queue_size: Pending alerts before new ones are dropped
+            cooldown: Per-source dedup window in seconds
+            retries: SMS retries after the first attempt
+            backoff: First retry delay in seconds, doubled on each retry
+            siren: Play the local siren for each alert
+        """
+        self.alerts = alerts
+        self.cooldown = cooldown
+        self.retries = retries
+        self.backoff = backoff
+        self.siren = siren
+
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._lock = threading.Lock()
+        self._last_alert = {}   # source -> (monotonic time, severity)
+        self._stop = threading.Event()
+        self.metrics = {
+            'submitted': 0,
+            'deduplicated': 0,
+            'dropped': 0,
+            'delivered': 0,
+            'sms_sent': 0,
+            'sms_failed': 0,
+            'sms_retries': 0,
+            'last_error': None,
+            'last_latency_s': None,
+        }
+        self._workers = [threading.Thread(target=self._work, name=f'alert-{i}', daemon=True)
+                         for i in range(max(1, int(workers)))]
+        for worker in self._workers:
+            worker.start()
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self.metrics[key] += n
+
+    def submit(self, source, severity):
+        """
+        Queue an alert for source unless it is a repeat within the cooldown.
+
+        Args:
+            source: Camera the accident was seen on
+            severity: Accident severity
+
+        Returns:
+            bool: True if the alert was queued
+        """
+        now = time.monotonic()
+        with self._lock:
+            self.metrics['submitted'] += 1
+            last = self._last_alert.get(source)
+            if last is not None and now - last[0] < self.cooldown and severity <= last[1]:
+                self.metrics['deduplicated'] += 1
+                return False
+            try:
+                self._queue.put_nowait((source, severity, now))
+            except queue.Full:
+                # not sent, so it must not start a cooldown that mutes the next try
+                self.metrics['dropped'] += 1
+                return False
+            self._last_alert[source] = (now, severity)
+        return True
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._deliver(*item)
+            except Exception as e:
+                # a worker must survive anything one alert throws
+                print(f"[alerts] Delivery failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, source, severity, queued_at):
+        if self.siren:
+            self.alerts.play_siren()
+        self._send_sms(f"Accident detected by Rakshak AI! Severity {severity} at {source}")
+        with self._lock:
+            self.metrics['delivered'] += 1
+            self.metrics['last_latency_s'] = round(time.monotonic() - queued_at, 3)
+
+    def _send_sms(self, body):
+        for attempt in range(self.retries + 1):
+            try:
+                self.alerts.send_sms(body)
+                self._count('sms_sent')
+                return True
+            except AlertError as e:
+                with self._lock:
+                    self.metrics['last_error'] = str(e)
+                if not e.retryable or attempt == self.retries:
+                    print(f"[alerts] SMS failed after {attempt + 1} attempt(s): {e}")
+                    self._count('sms_failed')
+                    return False
+                self._count('sms_retries')
+                # interruptible by close()
+                if self._stop.wait(self.backoff * 2 ** attempt):
+                    self._count('sms_failed')
+                    return False
+
+    def flush(self):
+        """Block until every queued alert has been handled."""
+        self._queue.join()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+        stats['queued'] = self._queue.qsize()
+        stats['connections_opened'] = getattr(self.alerts, 'connections_opened', None)
+        return stats
+
+    def close(self, timeout=5.0):
+        """Stop the workers after the queued alerts (retry backoff is cut short)."""
+        self._stop.set()
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
@@ -0,0 +1,190 @@
+"""
+Rakshak AI - MJPEG Encode Stage
+===============================
+JPEG encoding for /video_feed, off the inference thread and per viewer.
+
+The stream pipeline no longer encodes: it publishes each annotated frame
+as a FrameTicket and goes straight back to inference. JPEGs are produced
+on a small thread pool (cv2.imencode releases the GIL), so encoding
+frame N overlaps inference on frame N+1.
+
+Viewers pick an output level (width, quality) from a fixed ladder and
+every level is encoded at most once per frame, so viewers on the same
+level share the same bytes. AdaptiveQuality moves a viewer along the
+ladder from measured send throughput: a slow VPN client gets smaller,
+lower-quality frames instead of stalling, and the drop-oldest
+subscriber queue (hub.py) lowers its frame rate if even the smallest
+level cannot keep up.
+
+Classes:
+- EncodePool: Thread pool for resize + JPEG encode
+- FrameTicket: One annotated frame and its encodes, shared by all viewers
+- AdaptiveQuality: Per-viewer level controller driven by send time
+
+Functions:
+- viewer_options(width, fps): Validated ?width= and ?fps= of a viewer
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import atexit
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# (max width, JPEG quality) from best to cheapest; None keeps the source width
+QUALITY_LADDER = (
+    (None, 80),
+    (None, 65),
+    (960, 65),
+    (640, 60),
+    (480, 50),
+    (320, 40),
+)
+
+# Default frame rate a viewer should be able to sustain before being stepped down
+TARGET_FPS = 15.0
+
+# Accepted range for a viewer's ?fps= target, and the smallest ?width=
+MIN_TARGET_FPS = 1.0
+MAX_TARGET_FPS = 60.0
+MIN_VIEWER_WIDTH = 64
+
+ENCODE_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+
+def encode_jpeg(frame, width=None, quality=80):
+    """Resize frame to at most width pixels wide and JPEG-encode it."""
+    if width is not None and frame.shape[1] > width:
+        height = max(1, int(round(frame.shape[0] * width / frame.shape[1])))
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ret:
+        raise RuntimeError("JPEG encoding failed")
+    return buffer.tobytes()
+
+
+def viewer_options(width=None, fps=None):
+    """
+    Validate a viewer's ?width= and ?fps= query values.
+
+    Returns:
+        (max_width, target_fps): max_width is None or at least
+        MIN_VIEWER_WIDTH; target_fps is finite and within
+        [MIN_TARGET_FPS, MAX_TARGET_FPS], TARGET_FPS when missing or invalid
+    """
+    try:
+        max_width = max(int(width), MIN_VIEWER_WIDTH) if width not in (None, '') else None
+    except ValueError:
+        max_width = None
+    try:
+        target_fps = float(fps) if fps not in (None, '') else TARGET_FPS
+    except ValueError:
+        target_fps = TARGET_FPS
+    if not math.isfinite(target_fps) or target_fps <= 0:
+        target_fps = TARGET_FPS
+    return max_width, min(max(target_fps, MIN_TARGET_FPS), MAX_TARGET_FPS)
+
+
+class EncodePool:
+    def __init__(self, workers=ENCODE_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='jpeg')
+        atexit.register(self.shutdown)
+
+    def submit(self, frame, width, quality):
+        return self._executor.submit(encode_jpeg, frame, width, quality)
+
+    def shutdown(self):
+        """Stop the workers; encodes not yet started are cancelled."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class FrameTicket:
+    def __init__(self, frame, pool):
+        """
+        Args:
+            frame: Annotated BGR frame (not modified afterwards)
+            pool: EncodePool that produces the JPEGs
+        """
+        self.frame = frame
+        self.pool = pool
+        self._encodes = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, levels):
+        """Start encoding levels in the background; returns immediately."""
+        for level in levels:
+            self.future(level)
+
+    def future(self, level):
+        """concurrent.futures.Future for the (width, quality) JPEG."""
+        with self._lock:
+            future = self._encodes.get(level)
+            if future is None:
+                future = self._encodes[level] = self.pool.submit(self.frame, *level)
+            return future
+
+    def jpeg(self, level):
+        """JPEG bytes for (width, quality), encoded once and shared."""
+        return self.future(level).result()
+
+
+class AdaptiveQuality:
+    def __init__(self, max_width=None, target_fps=TARGET_FPS, ladder=QUALITY_LADDER, start=0):
+        """
+        Args:
+            max_width: Largest width this viewer wants (e.g. from ?width=)
+            target_fps: Frame rate the viewer should sustain
+            ladder: (width, quality) levels, best first
+            start: Initial ladder index
+        """
+        # clamp ladder widths to what the viewer asked for
+        levels = []
+        for width, quality in ladder:
+            if max_width is not None:
+                width = max_width if width is None else min(width, max_width)
+            if (width, quality) not in levels:
+                levels.append((width, quality))
+        self.levels = levels
+        self.index = min(max(int(start), 0), len(levels) - 1)
+        self.budget = 1.0 / target_fps
+        self.throughput = None   # bytes per second, smoothed
+        self._slow_frames = 0
+        self._fast_frames = 0
+
+    @property
+    def level(self):
+        return self.levels[self.index]
+
+    def record(self, size, seconds):
+        """
+        Feed how long sending size bytes took and adjust the level.
+
+        A few consecutive frames over the per-frame budget step down one
+        level; stepping back up needs a longer run of frames sent in well
+        under half the budget, so the level does not oscillate.
+        """
+        seconds = max(seconds, 1e-6)
+        rate = size / seconds
+        self.throughput = rate if self.throughput is None else 0.8 * self.throughput + 0.2 * rate
+
+        if seconds > self.budget:
+            self._slow_frames += 1
+            self._fast_frames = 0
+            if self._slow_frames >= 3 and self.index < len(self.levels) - 1:
+                self.index += 1
+                self._slow_frames = 0
+        elif seconds < self.budget / 2:
+            self._fast_frames += 1
+            self._slow_frames = 0
+            if self._fast_frames >= 30 and self.index > 0:
+                self.index -= 1
+                self._fast_frames = 0
+        else:
+            self._slow_frames = 0
+            self._fast_frames = 0
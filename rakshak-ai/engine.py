@@ -0,0 +1,321 @@
+"""
+Rakshak AI - Detection Engine
+=============================
+The single owner of the YOLO model in a process. Both front ends go
+through it: model_logic (Streamlit) and detector.CarDetector (Flask).
+
+It is responsible for:
+- Model lifecycle: one lazily loaded, thread-safe model per process.
+  torch and Ultralytics are imported only when the model is loaded.
+- Backend choice: torch / onnx / openvino, see backends.py
+- The detect/collide pipeline: frames -> (vehicle_count, boxes) ->
+  collision verdicts, see collision.py and tracker.py
+
+Functions:
+- load_model(model_name, backend, int8): Load the shared model (once)
+- get_model(): The shared model, loading it on first use
+- unload_model(): Drop the shared model
+- warmup(frame_shape): Dummy inferences so the first real frames run at full speed
+- detect(frames): Vehicle count and boxes for each frame
+- check_collisions(boxes): Collision verdict for one frame's boxes
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+
+from collision import VEHICLE_CLASSES, find_collisions, collision_severity
+
+DEFAULT_MODEL = "yolov8n.pt"
+
+# Frames per forward pass when detect() is given more frames than this
+DEFAULT_BATCH_SIZE = 8
+
+# Model input size (longest side); RAKSHAK_IMGSZ overrides it
+DEFAULT_IMGSZ = int(os.environ.get('RAKSHAK_IMGSZ', 640))
+
+# Dummy forward passes run by warmup()
+WARMUP_RUNS = 2
+
+_model = None
+_backend = None
+_model_name = None
+_loading_error = None
+
+# Guards loading, and serialises inference: Ultralytics predictors are not
+# safe to call from several threads at once on one model instance
+_load_lock = threading.Lock()
+_infer_lock = threading.Lock()
+
+_torch_patched = False
+
+
+def patch_torch_load():
+    """Make torch.load default to weights_only=False for YOLO checkpoints (once per process)."""
+    global _torch_patched
+    if _torch_patched:
+        return
+
+    import torch
+    original_torch_load = torch.load
+
+    def patched_torch_load(f, *args, **kwargs):
+        """Patched torch.load that defaults to weights_only=False"""
+        if 'weights_only' not in kwargs:
+            kwargs['weights_only'] = False
+        return original_torch_load(f, *args, **kwargs)
+
+    torch.load = patched_torch_load
+    _torch_patched = True
+
+
+def load_model(model_name=DEFAULT_MODEL, backend=None, int8=None):
+    """
+    Load the process-wide YOLO model.
+    Automatically downloads the model if not present locally.
+
+    Later calls return the already loaded model, whatever arguments they
+    pass, so every caller in the process shares one copy. A failed load
+    can be retried by calling load_model() again.
+
+    Args:
+        model_name: Name of the YOLO model to load (default: yolov8n.pt)
+        backend: 'torch', 'onnx', 'openvino' or 'auto' (default: RAKSHAK_BACKEND)
+        int8: Use the INT8-quantized export (onnx/openvino only)
+
+    Returns:
+        The loaded YOLO model, or None if loading failed
+    """
+    global _model, _backend, _model_name, _loading_error
+
+    with _load_lock:
+        if _model is not None:
+            if model_name != _model_name:
+                print(f"Model {_model_name} already loaded, ignoring request for {model_name}")
+            return _model
+
+        if _loading_error:
+            print(f"Previous error loading model: {_loading_error}")
+
+        try:
+            print(f"Loading YOLO model: {model_name}")
+            print("Model will be auto-downloaded if not cached...")
+
+            patch_torch_load()
+            from backends import load_yolo
+
+            # YOLO() automatically downloads the model if not present
+            # It caches the model (and any backend export) after first download
+            _model, _backend = load_yolo(model_name, backend, int8)
+            _model_name = model_name
+            _loading_error = None
+
+            print(f"YOLO model loaded successfully! (backend: {_backend})")
+            return _model
+        except Exception as e:
+            _loading_error = str(e)
+            print(f"Failed to load YOLO model: {e}")
+            return None
+
+
+def unload_model():
+    """Drop the shared model so the next load_model() loads afresh (e.g. another backend)."""
+    global _model, _backend, _model_name, _loading_error
+
+    with _load_lock, _infer_lock:
+        _model = None
+        _backend = None
+        _model_name = None
+        _loading_error = None
+
+
+def get_model():
+    """
+    Get the shared model, loading it on first use.
+
+    Does not retry automatically after a failed load, so demo mode does
+    not re-attempt a download on every frame.
+
+    Returns:
+        The loaded YOLO model, or None
+    """
+    if _model is None and _loading_error is None:
+        return load_model()
+    return _model
+
+
+def is_loaded():
+    """Return whether the shared model is loaded."""
+    return _model is not None
+
+
+def get_backend():
+    """Return the inference backend the model was loaded with, if any."""
+    return _backend
+
+
+def get_loading_error():
+    """Return the error message from model loading, if any."""
+    return _loading_error
+
+
+def class_names():
+    """Return the model's class_id -> name mapping, or None before loading."""
+    return getattr(_model, 'names', None)
+
+
+def count_vehicles(boxes):
+    """Number of boxes whose class is a vehicle."""
+    return sum(1 for box in boxes if int(box[4]) in VEHICLE_CLASSES)
+
+
+def result_to_boxes(result):
+    """
+    Extract vehicle count and boxes from a single Ultralytics result.
+
+    Returns:
+        tuple: (vehicle_count, boxes)
+            - vehicle_count: Number of vehicle-class detections
+            - boxes: List of (x1, y1, x2, y2, class_id) tuples
+    """
+    xyxy = result.boxes.xyxy.tolist()
+    classes = result.boxes.cls.tolist()
+    boxes = [(xy[0], xy[1], xy[2], xy[3], int(cls)) for xy, cls in zip(xyxy, classes)]
+    return count_vehicles(boxes), boxes
+
+
+def _infer(model, frames, batch_size, preprocessor, imgsz):
+    """(boxes, confidences) per frame, in frame coordinates."""
+    outputs = []
+    for start in range(0, len(frames), batch_size):
+        chunk = frames[start:start + batch_size]
+        with _infer_lock:
+            if preprocessor is None:
+                results = model(chunk[0] if len(chunk) == 1 else chunk, imgsz=imgsz or DEFAULT_IMGSZ)
+                restore = None
+            else:
+                # the preprocessor's buffers are shared, so fill and read them under the lock
+                results = model(preprocessor.prepare(chunk))
+                restore = preprocessor.restore_boxes
+            for result in results:
+                _, boxes = result_to_boxes(result)
+                if restore is not None:
+                    boxes = restore(boxes)
+                outputs.append((boxes, result.boxes.conf.tolist()))
+    return outputs
+
+
+def detect(frames, batch_size=DEFAULT_BATCH_SIZE, preprocessor=None, roi=None, imgsz=None, tiler=None):
+    """
+    Run the shared model on one or more frames.
+
+    Args:
+        frames: List of numpy arrays (BGR format from OpenCV)
+        batch_size: Maximum frames per forward pass
+        preprocessor: Optional preprocess.Preprocessor whose reusable buffers
+                      replace Ultralytics' per-call letterbox; all frames
+                      must then have the same shape
+        roi: Optional roi.RegionOfInterest; only its bounding crop is
+             inferred, boxes outside the polygon are dropped and the rest
+             are returned in full-frame coordinates
+        imgsz: Model input size when no preprocessor is given
+               (default: DEFAULT_IMGSZ; a preprocessor carries its own)
+        tiler: Optional tiling.Tiler; each frame is split into overlapping
+               tiles that run as one batch, and their detections are merged
+               with NMS
+
+    Returns:
+        list: (vehicle_count, boxes) per frame, in order
+
+    Raises:
+        RuntimeError: if the model is not loaded
+        Exception: inference errors are propagated to the caller
+    """
+    model = get_model()
+    if model is None:
+        raise RuntimeError(f"Model not loaded: {_loading_error}")
+
+    frames = list(frames)
+    if roi is not None:
+        crops = [roi.crop(frame)[0] for frame in frames]
+        outputs = []
+        for frame, (_, boxes) in zip(frames, detect(crops, batch_size, preprocessor, imgsz=imgsz, tiler=tiler)):
+            boxes = roi.to_frame(boxes, frame.shape)
+            outputs.append((count_vehicles(boxes), boxes))
+        return outputs
+
+    outputs = []
+    if tiler is not None:
+        for frame in frames:
+            tiles = tiler.split(frame)
+            boxes = tiler.merge(_infer(model, tiles, len(tiles), preprocessor, imgsz), frame.shape)
+            outputs.append((count_vehicles(boxes), boxes))
+        return outputs
+
+    for boxes, _ in _infer(model, frames, max(1, int(batch_size)), preprocessor, imgsz):
+        outputs.append((count_vehicles(boxes), boxes))
+    return outputs
+
+
+def warmup(frame_shape=None, runs=WARMUP_RUNS, batch_size=1, preprocessor=None):
+    """
+    Run dummy inferences so lazy initialisation (kernel selection, memory
+    pools, ONNX/OpenVINO graph compilation) happens before the first real
+    frame instead of delaying the first alarm.
+
+    Args:
+        frame_shape: Shape of the frames that will be served
+                     (default: DEFAULT_IMGSZ square)
+        runs: Number of forward passes
+        batch_size: Frames per pass, to warm up the batched path
+        preprocessor: Warm up (and preallocate) this stream's buffers
+
+    Returns:
+        list: Seconds taken by each run
+    """
+    if frame_shape is None:
+        frame_shape = (DEFAULT_IMGSZ, DEFAULT_IMGSZ, 3)
+    frames = [np.zeros(frame_shape, dtype=np.uint8)] * max(1, int(batch_size))
+
+    timings = []
+    for _ in range(max(1, int(runs))):
+        start = time.perf_counter()
+        detect(frames, len(frames), preprocessor)
+        timings.append(time.perf_counter() - start)
+    print("Warmup: " + ", ".join(f"{t * 1000:.0f}ms" for t in timings))
+    return timings
+
+
+def check_collisions(boxes, overlap_threshold=0.8, min_area=5000, monitor=None, frame_index=None,
+                     min_consecutive=None):
+    """
+    Collide one frame's boxes.
+
+    Args:
+        boxes: List of (x1, y1, x2, y2, class_id) tuples
+        overlap_threshold: IoU threshold for a collision candidate
+        min_area: Minimum intersection area for a collision candidate
+        monitor: Optional tracker.CollisionMonitor; when given, a collision is
+                 confirmed only after the same vehicle pair overlaps on
+                 min_consecutive frames. Without it the check is stateless
+                 and any candidate counts.
+        frame_index: Frame number passed to the monitor
+        min_consecutive: Override the monitor's threshold. Ignored without a
+                         monitor: a single call has no history to count.
+
+    Returns:
+        tuple: (accident_flag, severity, collisions) where collisions are
+               the (i, j, iou, inter_area) candidates of this frame
+    """
+    collisions = find_collisions(boxes, overlap_threshold, min_area)
+
+    if monitor is not None:
+        accident_flag, severity = monitor.check(boxes, collisions, frame_index, min_consecutive)
+        return accident_flag, severity, collisions
+
+    if collisions:
+        # Severity comes from the first qualifying pair
+        return True, collision_severity(collisions[0][2]), collisions
+    return False, 0, collisions
@@ -0,0 +1,122 @@
+"""
+Rakshak AI - Event Bus
+======================
+In-process publish/subscribe for accident events, feeding the /events
+Server-Sent Events stream and the /events/poll long-poll endpoint.
+
+Events are kept in a fixed-size ring buffer with increasing sequence
+ids. Subscribers do not get their own queues: each one remembers the
+last id it has seen and waits on a single shared condition, so a
+publish costs the same with one dashboard open or a hundred. A client
+that reconnects with its last id (the SSE Last-Event-ID header) gets
+every event it missed that is still in the buffer; if it fell further
+behind than the buffer, the reply says so and the client should
+refresh from /accident_status and /logs.
+
+Classes:
+- EventBus: Ring buffer of events with blocking reads by sequence id
+  and publish callbacks for asyncio subscribers
+
+Functions:
+- format_sse(event): Encode an event as a text/event-stream message
+"""
+
+import collections
+import json
+import threading
+import time
+
+# Events retained for replay on reconnect
+EVENT_BUFFER_SIZE = 256
+
+# Seconds between SSE keep-alive comments (keeps proxies from closing idle streams)
+KEEPALIVE_INTERVAL = 15.0
+
+
+class EventBus:
+    def __init__(self, capacity=EVENT_BUFFER_SIZE):
+        self._events = collections.deque(maxlen=max(1, int(capacity)))
+        self._cond = threading.Condition()
+        self._last_id = 0
+        self._listeners = set()
+
+    @property
+    def last_id(self):
+        with self._cond:
+            return self._last_id
+
+    def publish(self, event_type, **data):
+        """
+        Append an event and wake every waiting subscriber.
+
+        Args:
+            event_type: Event name, e.g. 'accident' or 'clear'
+            **data: JSON-serializable fields (severity, source, ...)
+
+        Returns:
+            dict: The stored event with id, type and ts added
+        """
+        with self._cond:
+            self._last_id += 1
+            event = dict(data, id=self._last_id, type=event_type, ts=time.time())
+            self._events.append(event)
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+        return event
+
+    def add_listener(self, callback):
+        """Call callback() after every publish (e.g. to wake an asyncio task)."""
+        with self._cond:
+            self._listeners.add(callback)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            self._listeners.discard(callback)
+
+    def since(self, last_id):
+        """
+        Events newer than last_id still in the buffer.
+
+        Returns:
+            (events, missed): missed is True when events after last_id
+            have already been dropped from the buffer
+        """
+        with self._cond:
+            return self._since(last_id)
+
+    def _since(self, last_id):
+        # called with the condition held
+        if last_id is None:
+            return [], False
+        missed = False
+        if last_id > self._last_id:
+            # id from before a restart: replay everything still buffered
+            last_id, missed = 0, True
+        if not self._events:
+            return [], missed
+        oldest = self._events[0]['id']
+        missed = missed or last_id < oldest - 1
+        start = max(0, last_id - oldest + 1)
+        return list(self._events)[start:], missed
+
+    def wait(self, last_id, timeout=None):
+        """
+        Block until there are events newer than last_id or timeout expires.
+
+        Returns:
+            (events, missed) as for since(); events is empty on timeout
+        """
+        with self._cond:
+            if last_id is None:
+                last_id = self._last_id
+            elif last_id > self._last_id:
+                return self._since(last_id)
+            self._cond.wait_for(lambda: self._last_id > last_id, timeout)
+            return self._since(last_id)
+
+
+def format_sse(event):
+    """Encode an event as one text/event-stream message."""
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
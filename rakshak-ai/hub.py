@@ -0,0 +1,220 @@
+"""
+Rakshak AI - Stream Broadcast Hub
+=================================
+One capture/inference pipeline per video source, shared by every
+viewer of that source.
+
+Without the hub each /video_feed request ran its own capture and YOLO
+loop, so N operators watching one camera cost N times the CPU and all of
+them fed the same collision history. Here the first subscriber to a
+source starts a StreamPipeline with its own CarDetector (per-stream
+tracker and collision state; the model itself is shared through
+engine.py). Every processed frame is handled once (accident callback)
+and fanned out to all subscribers as an encoder.FrameTicket; the JPEG
+levels the current subscribers use are encoded on the encode pool while
+the pipeline moves on to the next frame.
+
+Each subscriber has a small drop-oldest queue: a slow client skips
+frames instead of holding back the pipeline or the other viewers. A
+pipeline with no subscribers stops after idle_timeout seconds.
+
+Classes:
+- Subscription: One viewer's queue of frames
+- StreamPipeline: Capture/inference loop for one source
+- BroadcastHub: Source -> pipeline registry
+"""
+
+import collections
+import threading
+import time
+
+from encoder import QUALITY_LADDER, FrameTicket
+
+# Frames buffered per subscriber before the oldest is dropped
+SUBSCRIBER_QUEUE_SIZE = 2
+
+# Seconds a pipeline keeps running with no subscribers (covers page reloads)
+IDLE_TIMEOUT = 5.0
+
+
+class StreamEnd:
+    """Published when a pipeline stops; error is set if it failed."""
+
+    def __init__(self, error=None):
+        self.error = error
+
+
+class Subscription:
+    def __init__(self, pipeline, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.pipeline = pipeline
+        self._queue = collections.deque(maxlen=max(1, int(queue_size)))
+        # (width, quality) this viewer currently wants; set by its AdaptiveQuality
+        self.level = QUALITY_LADDER[0]
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.closed = False
+        # optional callable run (from the pipeline thread) whenever an item is
+        # queued; lets asyncio viewers wait without blocking a thread in get()
+        self.notify = None
+
+    def _put(self, item):
+        # called with the pipeline's condition held
+        if len(self._queue) == self._queue.maxlen:
+            self.frames_dropped += 1
+        self._queue.append(item)
+        if self.notify is not None:
+            self.notify()
+
+    def get(self, timeout=None):
+        """
+        Next item: a FrameTicket, a StreamEnd, or None on timeout
+        (timeout=0 polls without blocking).
+        """
+        cond = self.pipeline.cond
+        with cond:
+            if not self._queue and not cond.wait_for(lambda: self._queue or self.closed, timeout):
+                return None
+            if not self._queue:
+                return StreamEnd()
+            self.frames_delivered += 1
+            return self._queue.popleft()
+
+    def close(self):
+        """Detach from the pipeline."""
+        self.pipeline.unsubscribe(self)
+
+    def stats(self):
+        return {'delivered': self.frames_delivered, 'dropped': self.frames_dropped, 'level': self.level}
+
+
+class StreamPipeline:
+    def __init__(self, hub, source):
+        self.hub = hub
+        self.source = source
+        self.cond = threading.Condition()
+        self.subscribers = []
+        self.frames_processed = 0
+        self.closed = False
+        self._idle_since = None
+        self._thread = threading.Thread(target=self._run, name=f'stream-{source}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def subscribe(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        subscription = Subscription(self, queue_size)
+        with self.cond:
+            self.subscribers.append(subscription)
+            self._idle_since = None
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.cond:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+            subscription.closed = True
+            if not self.subscribers:
+                self._idle_since = time.monotonic()
+            self.cond.notify_all()
+
+    def publish(self, item):
+        with self.cond:
+            if isinstance(item, FrameTicket):
+                # encode every level in use now, in parallel with the next inference
+                item.prefetch({subscription.level for subscription in self.subscribers})
+            for subscription in self.subscribers:
+                subscription._put(item)
+            self.cond.notify_all()
+
+    def _idle_expired(self):
+        with self.cond:
+            return (not self.subscribers and self._idle_since is not None
+                    and time.monotonic() - self._idle_since >= self.hub.idle_timeout)
+
+    def _run(self):
+        error = None
+        outputs = None
+        try:
+            detector = self.hub.detector_factory()
+            outputs = detector.process_video(self.source, annotate=True)
+            for frame, car_count, accident_flag, severity in outputs:
+                self.frames_processed += 1
+                if self.hub.on_result is not None:
+                    self.hub.on_result(self.source, car_count, accident_flag, severity)
+                self.publish(FrameTicket(frame, self.hub.encoder))
+                # nobody has watched for a while: stop only if the hub agrees,
+                # so a viewer joining right now gets a fresh pipeline instead
+                if self._idle_expired() and self.hub._retire(self):
+                    break
+        except Exception as e:
+            error = str(e)
+            print(f"[hub] Pipeline for {self.source} failed: {e}")
+        finally:
+            if outputs is not None:
+                # runs process_video's cleanup (stops the capture thread)
+                outputs.close()
+            self.hub._retire(self, force=True)
+            self.publish(StreamEnd(error))
+            print(f"[hub] Pipeline for {self.source} stopped after {self.frames_processed} frames")
+
+    def stats(self):
+        with self.cond:
+            return {
+                'subscribers': len(self.subscribers),
+                'frames_processed': self.frames_processed,
+                'dropped': sum(s.frames_dropped for s in self.subscribers),
+            }
+
+
+class BroadcastHub:
+    def __init__(self, detector_factory, encoder, on_result=None, idle_timeout=IDLE_TIMEOUT):
+        """
+        Args:
+            detector_factory: Callable returning a new CarDetector for a pipeline
+            encoder: encoder.EncodePool shared by all pipelines
+            on_result: Optional callable(source, car_count, accident_flag, severity),
+                       run once per processed frame (alerts, status)
+            idle_timeout: Seconds a pipeline survives without subscribers
+        """
+        self.detector_factory = detector_factory
+        self.encoder = encoder
+        self.on_result = on_result
+        self.idle_timeout = idle_timeout
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, source, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        """
+        Attach a viewer to source, starting its pipeline if none is running.
+
+        Returns:
+            Subscription; call close() when the viewer goes away
+        """
+        with self._lock:
+            pipeline = self._pipelines.get(source)
+            started = pipeline is None
+            if started:
+                pipeline = StreamPipeline(self, source)
+                self._pipelines[source] = pipeline
+            subscription = pipeline.subscribe(queue_size)
+        if started:
+            pipeline.start()
+        return subscription
+
+    def _retire(self, pipeline, force=False):
+        """Remove pipeline from the registry; without force only while it is still idle."""
+        with self._lock:
+            if pipeline.closed:
+                return True
+            if not force and not pipeline._idle_expired():
+                return False
+            pipeline.closed = True
+            if self._pipelines.get(pipeline.source) is pipeline:
+                del self._pipelines[pipeline.source]
+            return True
+
+    def stats(self):
+        """Per-source subscriber and frame counters."""
+        with self._lock:
+            pipelines = dict(self._pipelines)
+        return {source: pipeline.stats() for source, pipeline in pipelines.items()}
@@ -0,0 +1,184 @@
+"""
+Rakshak AI - Incident Tracking
+==============================
+Coalesces per-frame accident flags into incidents, one lifecycle per
+video source:
+
+    (none) -> candidate -> confirmed -> ongoing -> resolved
+
+- candidate: first flagged frame; dropped silently if it is not seen
+  again on confirm_frames frames within candidate_window seconds
+- confirmed: the incident is real; this is where alerts and the
+  accident log happen
+- ongoing: further flagged frames of the same incident (severity rises
+  are reported as escalations)
+- resolved: no flagged frame for resolve_after seconds
+
+Only transitions reach the on_transition callback, so a crash that
+stays in view for a minute costs one alert and one log row, not one per
+frame. Incidents on different cameras are independent, and status() is
+keyed by camera.
+
+Classes:
+- Incident: One incident on one source
+- IncidentManager: Per-source state machines and the resolve timer
+"""
+
+import itertools
+import threading
+import time
+
+CANDIDATE = 'candidate'
+CONFIRMED = 'confirmed'
+ONGOING = 'ongoing'
+RESOLVED = 'resolved'
+
+# Flagged frames (including the first) needed to confirm a candidate
+CONFIRM_FRAMES = 2
+# Seconds a candidate has to collect them
+CANDIDATE_WINDOW = 2.0
+# Seconds without a flagged frame before an incident is resolved
+RESOLVE_AFTER = 5.0
+
+_ids = itertools.count(1)
+
+
+class Incident:
+    def __init__(self, source, severity, now):
+        self.id = next(_ids)
+        self.source = source
+        self.state = CANDIDATE
+        self.severity = severity
+        self.frames = 1
+        self.started = now
+        self.last_seen = now
+        self.resolved_at = None
+
+    def to_dict(self):
+        return {
+            'incident_id': self.id,
+            'state': self.state,
+            'severity': self.severity,
+            'frames': self.frames,
+            'started': self.started,
+            'last_seen': self.last_seen,
+            'resolved_at': self.resolved_at,
+        }
+
+
+class IncidentManager:
+    def __init__(self, on_transition=None, confirm_frames=CONFIRM_FRAMES,
+                 candidate_window=CANDIDATE_WINDOW, resolve_after=RESOLVE_AFTER):
+        """
+        Args:
+            on_transition: Optional callable(incident, old_state, new_state, escalated)
+                           run outside the lock after each state change; escalated
+                           is True for a severity rise without a state change
+            confirm_frames: Flagged frames needed to confirm a candidate
+            candidate_window: Seconds a candidate has to be confirmed
+            resolve_after: Quiet seconds before an incident resolves
+        """
+        self.on_transition = on_transition
+        self.confirm_frames = max(1, int(confirm_frames))
+        self.candidate_window = candidate_window
+        self.resolve_after = resolve_after
+        self._incidents = {}   # source -> active Incident
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def update(self, source, accident_flag, severity, now=None):
+        """
+        Feed one processed frame of source.
+
+        Returns:
+            list: (incident, old_state, new_state, escalated) transitions caused by this frame
+        """
+        now = time.time() if now is None else now
+        transitions = []
+        with self._lock:
+            self._expire(now, transitions)
+            incident = self._incidents.get(source)
+            if accident_flag:
+                if incident is None:
+                    incident = self._incidents[source] = Incident(source, severity, now)
+                    self._advance(incident, transitions)
+                else:
+                    incident.frames += 1
+                    incident.last_seen = now
+                    escalated = severity > incident.severity
+                    incident.severity = max(incident.severity, severity)
+                    old_state = incident.state
+                    self._advance(incident, transitions)
+                    if escalated and old_state in (CONFIRMED, ONGOING):
+                        transitions.append((incident, incident.state, incident.state, True))
+            if self._incidents:
+                self._schedule()
+        self._notify(transitions)
+        return transitions
+
+    def _advance(self, incident, transitions):
+        # called with the lock held, after a flagged frame was counted
+        old_state = incident.state
+        if old_state == CANDIDATE and incident.frames >= self.confirm_frames:
+            incident.state = CONFIRMED
+        elif old_state == CONFIRMED:
+            incident.state = ONGOING
+        if incident.state != old_state:
+            transitions.append((incident, old_state, incident.state, False))
+
+    def _expire(self, now, transitions):
+        # called with the lock held: drop stale candidates, resolve quiet incidents
+        for source, incident in list(self._incidents.items()):
+            if incident.state == CANDIDATE:
+                if now - incident.started >= self.candidate_window:
+                    del self._incidents[source]
+            elif now - incident.last_seen >= self.resolve_after:
+                old_state = incident.state
+                incident.state = RESOLVED
+                incident.resolved_at = now
+                del self._incidents[source]
+                transitions.append((incident, old_state, RESOLVED, False))
+
+    def sweep(self, now=None):
+        """Resolve incidents whose source has gone quiet (also run by the timer)."""
+        transitions = []
+        with self._lock:
+            self._expire(time.time() if now is None else now, transitions)
+            if self._incidents:
+                self._schedule()
+        self._notify(transitions)
+        return transitions
+
+    def _schedule(self):
+        # one timer for all sources, so incidents resolve even when their
+        # stream stops producing frames
+        if self._timer is not None:
+            return
+        delay = min(self.candidate_window, self.resolve_after)
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.sweep()
+
+    def _notify(self, transitions):
+        if self.on_transition is None:
+            return
+        for incident, old_state, new_state, escalated in transitions:
+            try:
+                self.on_transition(incident, old_state, new_state, escalated)
+            except Exception as e:
+                print(f"[incidents] Transition handler failed for {incident.source}: {e}")
+
+    def status(self):
+        """
+        Active incidents keyed by source, candidates included.
+
+        Returns:
+            dict: source -> Incident.to_dict()
+        """
+        with self._lock:
+            return {source: incident.to_dict() for source, incident in self._incidents.items()}
@@ -2,13 +2,19 @@
 Rakshak AI - Car Accident Detection Logic
 ==========================================
 This module contains the core AI detection logic extracted from the Flask app.
-It can be used by both the Flask app and the Streamlit app.
+It can be used by both the Flask app and the Streamlit app. The model itself
+and the detect/collide pipeline live in engine.py, shared with detector.py.
 
 Functions:
-- load_model(): Load the YOLO model (auto-downloads if not present)
-- detect_vehicles(image): Detect vehicles in an image
+- load_model(): Load the YOLO model (auto-downloads if not present) on the
+  selected backend (torch, onnx or openvino)
+- detect_vehicles(image, annotate=True, roi=None, imgsz=None, tiler=None): Detect
+  vehicles in an image, optionally only inside a road polygon (see roi.py),
+  at a chosen input size or as overlapping tiles (see tiling.py)
+- annotate_frame(image, vehicle_count, boxes): Draw detections (optional step)
+- detect_vehicles_batch(frames): Detect vehicles in several frames in one forward pass
 - check_accident(boxes): Check for accidents from overlapping vehicles
-- process_video_stream(source): Process video frames for real-time detection
+- analyze_video_batches(cap): Analyze a video capture in batches of frames
 """
 
 # Safe import for OpenCV - handles cloud environments
@@ -19,63 +25,57 @@ except Exception:
 
 import numpy as np
 import os
-import torch
+
+import engine
+from collision import VEHICLE_CLASSES, find_collisions
+from annotation import draw_detections
+from preprocess import Preprocessor
+from tracker import CollisionMonitor
 
 # BASE_DIR for safe path handling
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Patch torch.load to use weights_only=False for YOLO model compatibility
-_original_torch_load = torch.load
-
-def _patched_torch_load(f, *args, **kwargs):
-    """Patched torch.load that defaults to weights_only=False"""
-    if 'weights_only' not in kwargs:
-        kwargs['weights_only'] = False
-    return _original_torch_load(f, *args, **kwargs)
+# Reusable letterbox/normalize buffers for detect_vehicles(), one set per
+# input size; reallocated only when the image resolution changes
+_preprocessors = {}
 
-torch.load = _patched_torch_load
 
-# Global cached model variable for lazy loading
-_model = None
-_model_loading_error = None
+def _get_preprocessor(imgsz=None):
+    imgsz = imgsz or engine.DEFAULT_IMGSZ
+    if imgsz not in _preprocessors:
+        _preprocessors[imgsz] = Preprocessor(imgsz)
+    return _preprocessors[imgsz]
 
 
-def load_model(model_name="yolov8n.pt"):
+def load_model(model_name="yolov8n.pt", backend=None, int8=None, warmup=True):
     """
     Load the YOLO model for vehicle detection.
     Automatically downloads the model if not present locally.
     
+    The model is owned by the shared detection engine, so the Flask
+    detector and this module use the same single copy per process.
+    
     Args:
         model_name: Name of the YOLO model to load (default: yolov8n.pt)
                     Uses Ultralytics auto-download feature.
+        backend: Inference backend - 'torch', 'onnx', 'openvino' or 'auto'
+                 (default: RAKSHAK_BACKEND environment variable, else torch)
+        int8: Use the INT8-quantized export (onnx/openvino only)
+        warmup: Run dummy inferences right after loading so the first real
+                frames are not slowed down by lazy initialisation
         
     Returns:
         The loaded YOLO model, or None if failed
     """
-    global _model, _model_loading_error
-    
-    if _model is not None:
-        return _model
-    
-    if _model_loading_error:
-        print(f"Previous error loading model: {_model_loading_error}")
-    
-    try:
-        from ultralytics import YOLO
-        print(f"Loading YOLO model: {model_name}")
-        print("Model will be auto-downloaded if not cached...")
-        
-        # YOLO() automatically downloads the model if not present
-        # It caches the model after first download
-        _model = YOLO(model_name)
-        
-        print("YOLO model loaded successfully!")
-        return _model
-    except Exception as e:
-        _model_loading_error = str(e)
-        print(f"Failed to load YOLO model: {e}")
+    model = engine.load_model(model_name, backend, int8)
+    if model is None:
         print("Running without model - demo mode")
-        return None
+    elif warmup:
+        try:
+            engine.warmup(preprocessor=_get_preprocessor())
+        except Exception as e:
+            print(f"Model warmup failed: {e}")
+    return model
 
 
 def get_model():
@@ -86,20 +86,22 @@ def get_model():
     Returns:
         The loaded YOLO model, or None if failed
     """
-    global _model
-    if _model is None:
-        return load_model()
-    return _model
+    return engine.get_model()
 
 
 def is_demo_mode():
     """Return whether the model failed to load."""
-    return _model is None
+    return not engine.is_loaded()
+
+
+def get_model_backend():
+    """Return the inference backend the model was loaded with, if any."""
+    return engine.get_backend()
 
 
 def get_model_loading_error():
     """Return the error message from model loading, if any."""
-    return _model_loading_error
+    return engine.get_loading_error()
 
 
 def get_vehicle_classes():
@@ -109,38 +111,67 @@ def get_vehicle_classes():
     Returns:
         List of class IDs: [2, 3, 5, 7] (car, motorcycle, bus, truck)
     """
-    return [2, 3, 5, 7]
+    return list(VEHICLE_CLASSES)
+
+
+def annotate_frame(image, vehicle_count, boxes, roi=None):
+    """
+    Draw detections on a frame. This is the optional rendering step that
+    detect_vehicles(annotate=False) skips; call it only when the frame will
+    actually be shown or written out.
+    
+    Args:
+        image: numpy array (BGR format from OpenCV)
+        vehicle_count: Number of vehicles detected
+        boxes: List of (x1, y1, x2, y2, class_id) tuples
+        roi: Optional roi.RegionOfInterest to outline
+        
+    Returns:
+        A new image with bounding boxes and the vehicle count drawn
+    """
+    annotated_image = draw_detections(image, boxes, vehicle_count, "Vehicles Detected", engine.class_names())
+    if roi is not None:
+        roi.draw(annotated_image)
+    return annotated_image
 
 
-def detect_vehicles(image):
+def detect_vehicles(image, annotate=True, roi=None, imgsz=None, tiler=None):
     """
     Detect vehicles in an image frame.
     
     Args:
         image: numpy array (BGR format from OpenCV)
+        annotate: Draw the detections (default True). Pass False for
+                  detection-only use; annotated_image is then None.
+        roi: Optional roi.RegionOfInterest. Only its bounding crop is sent
+             through the model and detections outside the polygon are
+             discarded; boxes are always in full-frame coordinates.
+        imgsz: Model input size (default: RAKSHAK_IMGSZ). Smaller is faster,
+               larger finds smaller vehicles.
+        tiler: Optional tiling.Tiler for high-resolution images; overlapping
+               tiles run as one batch and are merged with NMS.
         
     Returns:
         tuple: (annotated_image, vehicle_count, boxes)
-            - annotated_image: Image with bounding boxes drawn
+            - annotated_image: Image with bounding boxes drawn, or None
             - vehicle_count: Number of vehicles detected
             - boxes: List of (x1, y1, x2, y2, class_id) tuples
     """
-    global _model
-    
     # Check cv2 availability
     if cv2 is None:
+        if not annotate:
+            return None, 0, []
         # Return a placeholder image with error text
         placeholder = np.zeros((480, 640, 3), dtype=np.uint8)
         cv2.putText(placeholder, "OpenCV Not Available", (100, 240), 
                     cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
         return placeholder, 0, []
     
-    # Lazy load model on first use
-    if _model is None:
-        load_model()
-    
-    # If model still not loaded, return demo mode
-    if _model is None:
+    # Lazy load model on first use; if it is still not loaded, return demo mode
+    if engine.get_model() is None:
+        if not annotate:
+            return None, 0, []
+        
         # Create annotated frame with demo text
         annotated_image = image.copy()
         if annotated_image is None or annotated_image.size == 0:
@@ -156,31 +187,15 @@ def detect_vehicles(image):
     
     # Normal mode - use YOLO model
     try:
-        results = _model(image)
-        annotated_image = results[0].plot()
+        vehicle_count, boxes = engine.detect([image], preprocessor=_get_preprocessor(imgsz), roi=roi, tiler=tiler)[0]
         
-        # Count vehicles
-        vehicle_count = 0
-        vehicle_classes = get_vehicle_classes()
-        boxes = []
-        
-        for result in results:
-            for box in result.boxes:
-                cls = int(box.cls[0])
-                if cls in vehicle_classes:
-                    vehicle_count += 1
-                
-                # Extract box coordinates
-                xy = box.xyxy[0].tolist()
-                boxes.append((xy[0], xy[1], xy[2], xy[3], cls))
-        
-        # Draw vehicle count on frame
-        cv2.putText(annotated_image, f"Vehicles Detected: {vehicle_count}", (50, 50), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        annotated_image = annotate_frame(image, vehicle_count, boxes, roi) if annotate else None
         
         return annotated_image, vehicle_count, boxes
     except Exception as e:
         print(f"Error during detection: {e}")
+        if not annotate:
+            return None, 0, []
         # Return demo mode on error
         annotated_image = image.copy()
         cv2.putText(annotated_image, f"Detection Error: {str(e)[:50]}", (50, 50), 
@@ -188,7 +203,55 @@ def detect_vehicles(image):
         return annotated_image, 0, []
 
 
-def check_accident(boxes, overlap_threshold=0.8, min_area=5000, min_consecutive=3):
+def detect_vehicles_batch(frames, batch_size=8, annotate=True, preprocessor=None, roi=None, imgsz=None,
+                          tiler=None):
+    """
+    Detect vehicles in several frames, sending up to batch_size frames
+    through the YOLO model in a single forward pass.
+    
+    Args:
+        frames: List of numpy arrays (BGR format from OpenCV)
+        batch_size: Maximum number of frames per forward pass (default 8)
+        annotate: Draw the detections (default True); see detect_vehicles()
+        preprocessor: Reusable buffers for same-resolution frames, e.g. one
+                      per video (default: the module's shared buffers for imgsz)
+        roi, imgsz, tiler: See detect_vehicles()
+        
+    Returns:
+        list: One (annotated_image, vehicle_count, boxes) tuple per input
+              frame, in the same order and with the same contents as
+              detect_vehicles() would return for that frame.
+    """
+    frames = list(frames)
+    if not frames:
+        return []
+    
+    # Demo mode and missing OpenCV are handled per frame
+    if cv2 is None or engine.get_model() is None:
+        return [detect_vehicles(frame, annotate, roi, imgsz, tiler) for frame in frames]
+    
+    batch_size = max(1, int(batch_size))
+    preprocessor = preprocessor or _get_preprocessor(imgsz)
+    outputs = []
+    
+    for start in range(0, len(frames), batch_size):
+        chunk = frames[start:start + batch_size]
+        try:
+            detections = engine.detect(chunk, batch_size, preprocessor, roi, tiler=tiler)
+        except Exception as e:
+            print(f"Error during batch detection: {e}")
+            # Fall back to per-frame detection so each frame gets its own result
+            outputs.extend(detect_vehicles(frame, annotate, roi, imgsz, tiler) for frame in chunk)
+            continue
+        
+        for frame, (vehicle_count, boxes) in zip(chunk, detections):
+            annotated_image = annotate_frame(frame, vehicle_count, boxes, roi) if annotate else None
+            outputs.append((annotated_image, vehicle_count, boxes))
+    
+    return outputs
+
+
+def check_accident(boxes, overlap_threshold=0.8, min_area=5000, min_consecutive=3, monitor=None, frame_index=None):
     """
     Check if there's an accident based on vehicle bounding box overlaps.
     
@@ -196,47 +259,21 @@ def check_accident(boxes, overlap_threshold=0.8, min_area=5000, min_consecutive=
         boxes: List of (x1, y1, x2, y2, class_id) tuples
         overlap_threshold: IoU threshold for detecting collision (default 0.8)
         min_area: Minimum intersection area to consider (default 5000)
-        min_consecutive: Minimum consecutive overlaps to confirm accident (default 3)
+        min_consecutive: Minimum consecutive overlaps of the same vehicle pair
+                         to confirm accident (default 3). Only enforced when a
+                         monitor carries the history between frames.
+        monitor: Optional tracker.CollisionMonitor for video; without it the
+                 check is stateless and any qualifying overlap counts
+        frame_index: Frame number passed to the monitor (default: next frame)
         
     Returns:
         tuple: (accident_detected, severity)
             - accident_detected: Boolean indicating if accident was detected
             - severity: Integer 0-5 indicating severity
     """
-    vehicle_classes = get_vehicle_classes()
-    
-    # Check for significant overlaps between any two vehicle boxes
-    for i in range(len(boxes)):
-        for j in range(i + 1, len(boxes)):
-            a = boxes[i]
-            b = boxes[j]
-            
-            # Only consider vehicle classes
-            if a[4] not in vehicle_classes or b[4] not in vehicle_classes:
-                continue
-            
-            # Calculate intersection
-            xA = max(a[0], b[0])
-            yA = max(a[1], b[1])
-            xB = min(a[2], b[2])
-            yB = min(a[3], b[3])
-            
-            interW = max(0, xB - xA)
-            interH = max(0, yB - yA)
-            interArea = interW * interH
-            
-            # Calculate IoU
-            boxAArea = max(0, (a[2] - a[0])) * max(0, (a[3] - a[1]))
-            boxBArea = max(0, (b[2] - b[0])) * max(0, (b[3] - b[1]))
-            unionArea = boxAArea + boxBArea - interArea if (boxAArea + boxBArea - interArea) > 0 else 1
-            iou = interArea / unionArea
-            
-            # Check if overlap is significant
-            if iou > overlap_threshold and interArea > min_area:
-                severity = min(5, int(iou * 10))
-                return True, severity
-    
-    return False, 0
+    accident_detected, severity, _ = engine.check_collisions(
+        boxes, overlap_threshold, min_area, monitor, frame_index, min_consecutive)
+    return accident_detected, severity
 
 
 def process_image(image_path):
@@ -253,6 +290,7 @@ def process_image(image_path):
             - accident_detected: Boolean
             - severity: Severity level (0 if no accident)
             - boxes: List of detection boxes
+            - collisions: Every qualifying (i, j, iou, inter_area) box pair
     """
     if cv2 is None:
         return {
@@ -260,7 +298,8 @@ def process_image(image_path):
             'vehicle_count': 0,
             'accident_detected': False,
             'severity': 0,
-            'boxes': []
+            'boxes': [],
+            'collisions': []
         }
     
     # Read the image
@@ -271,7 +310,8 @@ def process_image(image_path):
             'vehicle_count': 0,
             'accident_detected': False,
             'severity': 0,
-            'boxes': []
+            'boxes': [],
+            'collisions': []
         }
     
     # Detect vehicles
@@ -286,29 +326,97 @@ def process_image(image_path):
         'accident_detected': accident_detected,
         'severity': severity,
         'boxes': boxes,
+        'collisions': find_collisions(boxes),
         'demo_mode': is_demo_mode()
     }
 
 
-def analyze_video_frame(frame):
+def analyze_video_frame(frame, annotate=True, monitor=None):
     """
     Analyze a single video frame for vehicle detection and accident analysis.
     
     Args:
         frame: numpy array (BGR format from OpenCV)
+        annotate: Draw the detections (default True); annotated_frame is
+                  None when False
+        monitor: Optional tracker.CollisionMonitor shared across the frames
+                 of one video, so accidents need consecutive overlaps
         
     Returns:
         tuple: (annotated_frame, vehicle_count, accident_flag, severity)
     """
     # Detect vehicles
-    annotated_frame, vehicle_count, boxes = detect_vehicles(frame)
+    annotated_frame, vehicle_count, boxes = detect_vehicles(frame, annotate)
     
     # Check for accidents
-    accident_flag, severity = check_accident(boxes)
+    accident_flag, severity = check_accident(boxes, monitor=monitor)
     
     return annotated_frame, vehicle_count, accident_flag, severity
 
 
+def analyze_video_batches(cap, batch_size=8, annotate=True, max_frames=None, warmup_frames=0, roi=None,
+                          imgsz=None, tiler=None):
+    """
+    Analyze an opened video capture, reading batch_size frames at a time
+    and running them through detect_vehicles_batch().
+    
+    Args:
+        cap: An opened cv2.VideoCapture
+        batch_size: Number of frames per forward pass (default 8)
+        annotate: Draw the detections (default True). Pass False when no
+                  output video is written; annotated_frame is then None.
+        max_frames: Stop after this many frames (default: read to the end)
+        warmup_frames: Leading frames that are analysed only to build up
+                       frame-to-frame state and are not yielded. Used when
+                       a video is analysed in segments (see parallel_video).
+        roi, imgsz, tiler: Applied to every frame; see detect_vehicles()
+        
+    Accidents are confirmed per vehicle pair: the same two tracked vehicles
+    must overlap on consecutive frames (see check_accident()).
+    
+    Yields:
+        tuple: (annotated_frame, vehicle_count, accident_flag, severity)
+               for every frame in the capture after the warm-up, in order.
+    """
+    batch_size = max(1, int(batch_size))
+    frames_read = 0
+    monitor = CollisionMonitor()
+    # a video has one resolution, so its buffers are allocated once
+    preprocessor = Preprocessor(imgsz or engine.DEFAULT_IMGSZ)
+    
+    while cap.isOpened():
+        want = batch_size if max_frames is None else min(batch_size, max_frames - frames_read)
+        frames = []
+        while len(frames) < want:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        
+        if not frames:
+            break
+        
+        # Warm-up frames never need drawing
+        warm = max(0, min(len(frames), warmup_frames - frames_read))
+        frames_read += len(frames)
+        
+        detections = []
+        if warm:
+            detections.extend(detect_vehicles_batch(frames[:warm], batch_size, False, preprocessor, roi, tiler=tiler))
+        if warm < len(frames):
+            detections.extend(detect_vehicles_batch(frames[warm:], batch_size, annotate, preprocessor, roi, tiler=tiler))
+        
+        for index, (annotated_frame, vehicle_count, boxes) in enumerate(detections):
+            accident_flag, severity = check_accident(boxes, monitor=monitor)
+            if index < warm:
+                continue
+            yield annotated_frame, vehicle_count, accident_flag, severity
+        
+        # A short batch means the capture ran out of frames
+        if len(frames) < want:
+            break
+
+
 # Module initialization for easy importing
 def init():
     """Initialize the model (lazy loading happens automatically)."""
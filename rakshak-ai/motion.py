@@ -0,0 +1,97 @@
+"""
+Rakshak AI - Motion Gate
+========================
+Cheap frame-differencing gate that decides whether a frame is worth
+sending through YOLO.
+
+Each frame is shrunk to a small grayscale thumbnail, blurred, and compared
+with the thumbnail of the last frame that was actually inferred. Comparing
+against the last inferred frame (rather than the previous frame) means
+slow, gradual movement still accumulates and eventually opens the gate.
+A maximum staleness interval forces a fresh inference even on a
+perfectly static scene.
+
+Classes:
+- MotionGate: Decide per frame whether to run the detector or reuse the last detections
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import numpy as np
+
+
+class MotionGate:
+    def __init__(self, pixel_threshold=25, min_changed_ratio=0.005, max_stale_frames=15, thumb_width=160, blur_size=5):
+        """
+        Args:
+            pixel_threshold: Grayscale difference (0-255) for a thumbnail pixel to count as changed
+            min_changed_ratio: Fraction of changed pixels that opens the gate (default 0.5%)
+            max_stale_frames: Re-run inference after this many skipped frames regardless of motion
+            thumb_width: Width of the thumbnail used for differencing
+            blur_size: Gaussian blur kernel size (odd), 0 disables blurring
+        """
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_stale_frames = max_stale_frames
+        self.thumb_width = thumb_width
+        self.blur_size = blur_size
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame; the next frame always opens the gate."""
+        self._reference = None
+        self.stale_frames = 0
+        self.last_changed_ratio = 0.0
+        self.frames_seen = 0
+        self.frames_skipped = 0
+
+    def _thumbnail(self, frame):
+        h, w = frame.shape[:2]
+        width = min(self.thumb_width, w)
+        height = max(1, int(round(h * width / float(w))))
+        small = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        if self.blur_size:
+            small = cv2.GaussianBlur(small, (self.blur_size, self.blur_size), 0)
+        return small
+
+    def should_infer(self, frame):
+        """
+        Decide whether frame needs a fresh inference.
+
+        Returns True on the first frame, when enough pixels changed since
+        the last inferred frame, or when the last detections are stale.
+        A True result makes frame the new reference.
+        """
+        self.frames_seen += 1
+        thumb = self._thumbnail(frame)
+
+        if self._reference is None or self._reference.shape != thumb.shape:
+            changed = True
+            self.last_changed_ratio = 1.0
+        else:
+            diff = cv2.absdiff(thumb, self._reference)
+            self.last_changed_ratio = np.count_nonzero(diff > self.pixel_threshold) / float(diff.size)
+            changed = self.last_changed_ratio >= self.min_changed_ratio
+
+        if changed or self.stale_frames >= self.max_stale_frames:
+            self._reference = thumb
+            self.stale_frames = 0
+            return True
+
+        self.stale_frames += 1
+        self.frames_skipped += 1
+        return False
+
+    def stats(self):
+        """Return gate counters for monitoring and tuning."""
+        return {
+            'frames_seen': self.frames_seen,
+            'frames_skipped': self.frames_skipped,
+            'last_changed_ratio': self.last_changed_ratio,
+        }
@@ -0,0 +1,262 @@
+"""
+Rakshak AI - Parallel Segmented Video Analysis
+==============================================
+Splits a video file into frame ranges and analyses each range in a
+separate worker process with its own YOLO model instance.
+
+Each worker seeks to its range with CAP_PROP_POS_FRAMES (checked, and
+completed by decoding forward when the container seeks inexactly) and
+writes its annotated frames to a segment file. The parent then merges
+accident frames, the maximum vehicle count and the annotated segments
+back in frame order.
+
+Frame-to-frame state (vehicle tracks and per-pair consecutive-overlap
+counts) is rebuilt at every segment boundary: a worker starts
+warmup_frames before its range and analyses those frames without
+reporting them. The default warm-up is longer than the tracker's
+max_misses plus the min_consecutive window, so an overlap that begins
+inside the warm-up is confirmed on the same frame as in a serial pass.
+An overlap already running for longer than the warm-up at the boundary is
+still confirmed, but possibly on a different frame, because confirmations
+repeat every min_consecutive frames counted from the start of the overlap.
+
+The onnx/openvino export is produced once in the parent before the pool
+starts; the workers then only load the cached copy.
+
+Functions:
+- split_frame_ranges(total_frames, segments): Contiguous [start, end) ranges
+- analyze_video_parallel(video_path): Analyse a video across a process pool
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import multiprocessing
+import os
+import tempfile
+
+from capture import DEFAULT_FPS
+
+# Frames re-analysed before each segment start to rebuild temporal state;
+# covers VehicleTracker's max_misses (10) plus min_consecutive (3)
+SEGMENT_WARMUP_FRAMES = 16
+
+# Frames per forward pass inside each worker
+WORKER_BATCH_SIZE = 8
+
+
+def split_frame_ranges(total_frames, segments):
+    """
+    Split total_frames into up to segments contiguous [start, end) ranges.
+
+    The last range has end=None so it reads to the real end of the file,
+    since CAP_PROP_FRAME_COUNT is only an estimate for some containers.
+    """
+    segments = max(1, min(int(segments), int(total_frames) or 1))
+    size = -(-int(total_frames) // segments) or 1
+    ranges = []
+    for start in range(0, max(int(total_frames), 1), size):
+        ranges.append([start, start + size])
+    ranges[-1][1] = None
+    return [tuple(r) for r in ranges]
+
+
+def _prepare_backend():
+    """
+    Resolve the inference backend and build its export in the parent process.
+
+    Returns:
+        The backend the workers should load; torch if the export failed, so
+        the workers do not each retry it at the same time.
+    """
+    from backends import DEFAULT_INT8, export_model, resolve_backend
+    from engine import DEFAULT_MODEL
+
+    backend = resolve_backend()
+    if backend == 'torch':
+        return backend
+    try:
+        export_model(DEFAULT_MODEL, backend, DEFAULT_INT8)
+        return backend
+    except Exception as e:
+        print(f"Failed to prepare {backend} backend ({e}), workers will use torch")
+        return 'torch'
+
+
+def _init_worker(threads_per_worker, backend=None):
+    """Load one model per worker process and split CPU threads between workers."""
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except Exception:
+        pass
+
+    from model_logic import load_model
+    load_model(backend=backend)
+
+
+def _seek(cap, frame_index):
+    """
+    Position cap on frame_index.
+
+    CAP_PROP_POS_FRAMES is only as exact as the container's index: some
+    codecs land on the nearest keyframe instead. The position is checked
+    after seeking, and a short or overshot seek is completed by decoding
+    forward (from the start of the file if it overshot).
+    """
+    if frame_index <= 0:
+        return True
+    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if position == frame_index:
+        return True
+    if position > frame_index or position < 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        position = 0
+    while position < frame_index:
+        if not cap.grab():
+            return False
+        position += 1
+    return True
+
+
+def _analyze_segment(task):
+    """Analyse one frame range; runs inside a worker process."""
+    from model_logic import analyze_video_batches, is_demo_mode
+
+    index, video_path, start, end, warmup_frames, output_path = task
+
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    warmup = min(warmup_frames, start)
+    if not _seek(cap, start - warmup):
+        cap.release()
+        raise RuntimeError(f"Could not seek to frame {start - warmup} of {video_path}")
+    max_frames = None if end is None else (end - start) + warmup
+
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+
+    accident_frames = []
+    max_vehicle_count = 0
+    frame_count = 0
+
+    for annotated_frame, vehicle_count, accident_flag, severity in analyze_video_batches(
+            cap, WORKER_BATCH_SIZE, annotate=True, max_frames=max_frames, warmup_frames=warmup):
+        frame_count += 1
+        max_vehicle_count = max(max_vehicle_count, vehicle_count)
+        if accident_flag:
+            accident_frames.append({
+                # 1-based frame numbers, matching the serial analysis
+                'frame': start + frame_count,
+                'severity': severity,
+                'vehicle_count': vehicle_count
+            })
+        out.write(annotated_frame)
+
+    cap.release()
+    out.release()
+
+    return {
+        'index': index,
+        'output_path': output_path,
+        'frames': frame_count,
+        'accident_frames': accident_frames,
+        'max_vehicle_count': max_vehicle_count,
+        'demo_mode': is_demo_mode(),
+    }
+
+
+def _concat_segments(segment_paths, output_path, fps, size):
+    """Append annotated segment files into one output video, in order."""
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for path in segment_paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+        os.unlink(path)
+    out.release()
+
+
+def analyze_video_parallel(video_path, workers=None, segments=None, warmup_frames=SEGMENT_WARMUP_FRAMES,
+                           progress_callback=None):
+    """
+    Analyse a video file across a pool of worker processes.
+
+    Args:
+        video_path: Path to the video file
+        workers: Number of worker processes (default: half the CPU cores)
+        segments: Number of frame ranges (default: 2 per worker, for load balancing)
+        warmup_frames: Frames re-analysed before each segment to rebuild state
+        progress_callback: Optional callable(done_segments, total_segments)
+
+    Returns:
+        dict: Same keys as streamlit_app.process_uploaded_video():
+              output_video, total_frames, accident_frames, max_vehicle_count,
+              fps, width, height, demo_mode; or {'error': ...}
+    """
+    if cv2 is None:
+        return {'error': 'OpenCV not available', 'total_frames': 0}
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return {'error': 'Failed to open video', 'total_frames': 0}
+    # some containers and streams report 0 fps; use the same fallback as the workers
+    fps = cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    cpu_count = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, cpu_count // 2)
+    if segments is None:
+        segments = workers * 2
+
+    ranges = split_frame_ranges(total_frames, segments)
+    tasks = []
+    for index, (start, end) in enumerate(ranges):
+        segment_path = tempfile.NamedTemporaryFile(delete=False, suffix=f'.seg{index}.mp4').name
+        tasks.append((index, video_path, start, end, warmup_frames, segment_path))
+
+    workers = min(workers, len(tasks))
+    threads_per_worker = max(1, cpu_count // workers)
+
+    backend = _prepare_backend()
+
+    # spawn keeps torch/OpenMP state out of the children
+    context = multiprocessing.get_context('spawn')
+    results = [None] * len(tasks)
+    with context.Pool(workers, initializer=_init_worker, initargs=(threads_per_worker, backend)) as pool:
+        for done, result in enumerate(pool.imap_unordered(_analyze_segment, tasks), start=1):
+            results[result['index']] = result
+            if progress_callback is not None:
+                progress_callback(done, len(tasks))
+
+    output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+    _concat_segments([r['output_path'] for r in results], output_path, fps, (width, height))
+
+    accident_frames = []
+    for result in results:
+        accident_frames.extend(result['accident_frames'])
+
+    return {
+        'output_video': output_path,
+        'total_frames': sum(r['frames'] for r in results),
+        'accident_frames': accident_frames,
+        'max_vehicle_count': max((r['max_vehicle_count'] for r in results), default=0),
+        'fps': int(fps),
+        'width': width,
+        'height': height,
+        'demo_mode': any(r['demo_mode'] for r in results),
+    }
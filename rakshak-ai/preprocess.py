@@ -0,0 +1,114 @@
+"""
+Rakshak AI - Reusable Preprocessing Buffers
+===========================================
+Letterbox + normalize for fixed-resolution streams without per-frame
+large allocations.
+
+Ultralytics letterboxes every frame into a freshly allocated array and
+then allocates a new float tensor. For a camera whose resolution never
+changes, all of that can be done once: the letterbox canvas, the resize
+target and the float32 NCHW input are allocated for the first frame and
+reused for every later frame of the same shape. The tensor handed to the
+model shares memory with the float buffer.
+
+Boxes come back in letterboxed coordinates and are mapped to frame
+coordinates with restore_boxes().
+
+Classes:
+- Preprocessor(imgsz): Preallocated letterbox/normalize pipeline for one stream
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import numpy as np
+
+# Ultralytics' letterbox padding colour and the model stride
+PAD_VALUE = 114
+STRIDE = 32
+
+
+class Preprocessor:
+    def __init__(self, imgsz=640):
+        """
+        Args:
+            imgsz: Longest side of the model input, rounded up to a multiple of 32
+        """
+        self.imgsz = -(-int(imgsz) // STRIDE) * STRIDE
+        self._frame_shape = None
+        self._batch = 0
+        self.reallocations = 0
+
+    def _allocate(self, frame_shape, batch):
+        h, w = frame_shape[:2]
+        scale = min(self.imgsz / h, self.imgsz / w)
+        new_w, new_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        # minimal rectangle: pad only up to the next multiple of the stride
+        canvas_h = -(-new_h // STRIDE) * STRIDE
+        canvas_w = -(-new_w // STRIDE) * STRIDE
+        top = (canvas_h - new_h) // 2
+        left = (canvas_w - new_w) // 2
+
+        self.scale = scale
+        self.offset = (left, top)
+        self.resized_size = (new_w, new_h)
+        self._resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self._canvas = np.full((canvas_h, canvas_w, 3), PAD_VALUE, dtype=np.uint8)
+        self._input = np.empty((batch, 3, canvas_h, canvas_w), dtype=np.float32)
+        self._tensor = None
+        self._frame_shape = frame_shape
+        self._batch = batch
+        self.reallocations += 1
+
+    def prepare(self, frames):
+        """
+        Letterbox and normalize frames into the reused input buffer.
+
+        Args:
+            frames: List of same-shaped BGR frames (one batch)
+
+        Returns:
+            torch.Tensor of shape (N, 3, H, W), float32 in 0..1, RGB order.
+            It aliases the internal buffer and is overwritten by the next call.
+        """
+        frame_shape = frames[0].shape
+        if frame_shape != self._frame_shape or len(frames) > self._batch:
+            self._allocate(frame_shape, max(len(frames), self._batch))
+
+        left, top = self.offset
+        new_w, new_h = self.resized_size
+        region = self._canvas[top:top + new_h, left:left + new_w]
+
+        for i, frame in enumerate(frames):
+            if frame.shape != frame_shape:
+                raise ValueError("All frames in a batch must have the same shape")
+            cv2.resize(frame, self.resized_size, dst=self._resized, interpolation=cv2.INTER_LINEAR)
+            np.copyto(region, self._resized)
+            # BGR HWC uint8 -> RGB CHW float32 0..1, written straight into the input buffer
+            np.multiply(self._canvas[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=self._input[i])
+
+        if self._tensor is None:
+            import torch
+            self._tensor = torch.from_numpy(self._input)
+        return self._tensor[:len(frames)]
+
+    def restore_boxes(self, boxes):
+        """
+        Map (x1, y1, x2, y2, class_id) boxes from letterboxed input
+        coordinates back to the original frame.
+        """
+        left, top = self.offset
+        h, w = self._frame_shape[:2]
+        restored = []
+        for x1, y1, x2, y2, cls in boxes:
+            restored.append((
+                min(max((x1 - left) / self.scale, 0.0), w),
+                min(max((y1 - top) / self.scale, 0.0), h),
+                min(max((x2 - left) / self.scale, 0.0), w),
+                min(max((y2 - top) / self.scale, 0.0), h),
+                cls,
+            ))
+        return restored
@@ -0,0 +1,119 @@
+"""
+Rakshak AI - Region of Interest
+===============================
+Per-camera road polygons applied before inference.
+
+Only the bounding rectangle of the polygon is sent through YOLO, so sky,
+buildings and footpath cost nothing and the road itself gets more of the
+model's input resolution. Detections whose centre falls outside the
+polygon are discarded, and the remaining boxes are shifted back into
+full-frame coordinates before collision checks and annotation.
+
+Polygon points are either pixels or, when every coordinate is within
+0..1, fractions of the frame width/height, so one config works for any
+stream resolution.
+
+Classes:
+- RegionOfInterest(polygon): Crop frames to a polygon and filter/map boxes back
+"""
+
+# Safe import for OpenCV - handles cloud environments
+try:
+    import cv2
+except Exception:
+    cv2 = None
+
+import numpy as np
+
+ROI_COLOR = (0, 255, 255)
+
+
+def points_in_polygon(points, polygon):
+    """
+    Even-odd ray casting test for many points at once.
+
+    Args:
+        points: (N, 2) array of x, y
+        polygon: (M, 2) array of vertices
+
+    Returns:
+        Boolean array of length N
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    polygon = np.asarray(polygon, dtype=np.float64)
+    x, y = points[:, 0:1], points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at_y = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    inside = np.count_nonzero(crosses & (x < x_at_y), axis=1) % 2 == 1
+    return inside
+
+
+class RegionOfInterest:
+    def __init__(self, polygon):
+        """
+        Args:
+            polygon: At least three (x, y) vertices, in pixels or as 0..1 fractions
+        """
+        polygon = np.asarray(polygon, dtype=np.float64)
+        if polygon.ndim != 2 or polygon.shape[1] != 2 or len(polygon) < 3:
+            raise ValueError("ROI polygon needs at least three (x, y) points")
+        self.polygon = polygon
+        self.normalized = bool(polygon.max() <= 1.0)
+        self._shape = None
+
+    def _resolve(self, frame_shape):
+        """Pixel polygon and clipped bounding rectangle for frames of this shape (cached)."""
+        shape = frame_shape[:2]
+        if shape != self._shape:
+            h, w = shape
+            polygon = self.polygon * (w, h) if self.normalized else self.polygon
+            x1 = int(np.clip(np.floor(polygon[:, 0].min()), 0, w - 1))
+            y1 = int(np.clip(np.floor(polygon[:, 1].min()), 0, h - 1))
+            x2 = int(np.clip(np.ceil(polygon[:, 0].max()), x1 + 1, w))
+            y2 = int(np.clip(np.ceil(polygon[:, 1].max()), y1 + 1, h))
+            self._pixels = polygon
+            self._rect = (x1, y1, x2, y2)
+            self._shape = shape
+        return self._pixels, self._rect
+
+    def crop(self, frame):
+        """
+        The bounding rectangle of the ROI as a view of frame (no copy).
+
+        Returns:
+            tuple: (crop, (x_offset, y_offset))
+        """
+        _, (x1, y1, x2, y2) = self._resolve(frame.shape)
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def to_frame(self, boxes, frame_shape):
+        """
+        Map boxes detected on crop(frame) back to full-frame coordinates and
+        drop the ones whose centre lies outside the polygon.
+
+        Args:
+            boxes: List of (x1, y1, x2, y2, class_id) tuples in crop coordinates
+            frame_shape: Shape of the full frame
+
+        Returns:
+            list: (x1, y1, x2, y2, class_id) tuples in frame coordinates
+        """
+        if not boxes:
+            return []
+        polygon, (ox, oy, _, _) = self._resolve(frame_shape)
+        shifted = [(x1 + ox, y1 + oy, x2 + ox, y2 + oy, cls) for x1, y1, x2, y2, cls in boxes]
+        centres = [((b[0] + b[2]) / 2, (b[1] + b[3]) / 2) for b in shifted]
+        inside = points_in_polygon(centres, polygon)
+        return [box for box, keep in zip(shifted, inside) if keep]
+
+    def draw(self, image):
+        """Outline the ROI on image in place."""
+        if cv2 is None:
+            return image
+        polygon, _ = self._resolve(image.shape)
+        cv2.polylines(image, [np.round(polygon).astype(np.int32)], True, ROI_COLOR, 2)
+        return image
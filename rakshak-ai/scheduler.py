@@ -0,0 +1,82 @@
+"""
+Rakshak AI - Adaptive Frame-Stride Scheduler
+============================================
+Chooses how often to run inference from recent activity, so compute is
+spent where accidents are plausible:
+
+- no vehicles in view      -> idle_stride (e.g. every 6th frame)
+- vehicles in view         -> active_stride (e.g. every 2nd frame)
+- an overlap candidate     -> every frame, held for alert_hold frames so
+                              the consecutive-overlap confirmation sees
+                              consecutive frames
+
+Classes:
+- StrideScheduler: Decide per frame whether inference is due
+"""
+
+
+class StrideScheduler:
+    def __init__(self, idle_stride=6, active_stride=2, alert_hold=30):
+        """
+        Args:
+            idle_stride: Run inference every N frames while no vehicle is present
+            active_stride: Run inference every N frames while vehicles are present
+            alert_hold: Frames to stay at stride 1 after the last overlap candidate
+        """
+        self.idle_stride = max(1, int(idle_stride))
+        self.active_stride = max(1, int(active_stride))
+        self.alert_hold = max(0, int(alert_hold))
+        self.reset()
+
+    def reset(self):
+        """Start a new stream: the first frame is always due."""
+        self.stride = 1
+        self._since_sample = None
+        self._hold_remaining = 0
+        self.frames_seen = 0
+        self.frames_sampled = 0
+
+    def tick(self):
+        """
+        Advance one frame.
+
+        Returns:
+            True if this frame should be sampled for inference
+        """
+        self.frames_seen += 1
+        if self._hold_remaining > 0:
+            self._hold_remaining -= 1
+
+        if self._since_sample is None or self._since_sample + 1 >= self.stride:
+            self._since_sample = 0
+            self.frames_sampled += 1
+            return True
+
+        self._since_sample += 1
+        return False
+
+    def observe(self, vehicle_count, overlap_candidate):
+        """
+        Update the stride from the detections of an inferred frame.
+
+        Args:
+            vehicle_count: Number of vehicles detected in the frame
+            overlap_candidate: True if the frame had a qualifying vehicle overlap
+        """
+        if overlap_candidate:
+            self._hold_remaining = self.alert_hold
+            self.stride = 1
+        elif self._hold_remaining > 0:
+            self.stride = 1
+        elif vehicle_count > 0:
+            self.stride = self.active_stride
+        else:
+            self.stride = self.idle_stride
+
+    def stats(self):
+        """Return scheduler counters for monitoring."""
+        return {
+            'stride': self.stride,
+            'frames_seen': self.frames_seen,
+            'frames_sampled': self.frames_sampled,
+        }
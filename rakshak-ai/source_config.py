@@ -0,0 +1,118 @@
+"""
+Rakshak AI - Per-Source Settings
+================================
+Camera-specific detection settings, looked up by video source.
+
+Settings are read from the JSON file named by the RAKSHAK_SOURCES
+environment variable. Keys are the source as passed to the detector
+('webcam', an rtsp:// URL or a file path); the optional "default" entry
+applies to every source and is overridden field by field:
+
+    {
+        "default": {},
+        "rtsp://10.0.0.5/stream1": {
+            "roi": [[0.0, 0.45], [1.0, 0.45], [1.0, 1.0], [0.0, 1.0]],
+            "imgsz": 480
+        },
+        "rtsp://10.0.0.9/4k": {"imgsz": 960, "tiles": [2, 2], "tile_overlap": 0.2}
+    }
+
+Fields:
+- roi: Road polygon, pixels or 0..1 fractions (see roi.py)
+- imgsz: Model input size for this source (default: RAKSHAK_IMGSZ)
+- tiles: [cols, rows] to run overlapping tiles instead of the whole
+  frame, for high-resolution feeds (see tiling.py); imgsz then applies
+  to each tile
+- tile_overlap: Fraction of a tile shared with its neighbour (default 0.2)
+- tile_iou: NMS threshold for merging tile detections (default 0.5)
+
+Classes:
+- SourceConfig: Settings for one source
+
+Functions:
+- load_source_configs(path): Parse the JSON file into raw per-source dicts
+- get_source_config(source): SourceConfig for a source
+"""
+
+import json
+import os
+
+from roi import RegionOfInterest
+from tiling import Tiler
+
+SOURCES_FILE = os.environ.get('RAKSHAK_SOURCES')
+
+_configs = None
+
+
+class SourceConfig:
+    def __init__(self, roi=None, imgsz=None, tiler=None):
+        """
+        Args:
+            roi: RegionOfInterest, a polygon to build one from, or None for the full frame
+            imgsz: Model input size, or None for the global default
+            tiler: tiling.Tiler for tiled inference, or None
+        """
+        if roi is not None and not isinstance(roi, RegionOfInterest):
+            roi = RegionOfInterest(roi)
+        self.roi = roi
+        self.imgsz = int(imgsz) if imgsz else None
+        self.tiler = tiler
+
+    @classmethod
+    def from_dict(cls, data):
+        tiler = None
+        if data.get('tiles'):
+            tiles = data['tiles']
+            if len(tiles) != 2:
+                raise ValueError("tiles must be [cols, rows]")
+            tiler = Tiler(tiles, data.get('tile_overlap', 0.2), data.get('tile_iou', 0.5))
+        return cls(roi=data.get('roi'), imgsz=data.get('imgsz'), tiler=tiler)
+
+
+def load_source_configs(path=None):
+    """
+    Read per-source settings from a JSON file.
+
+    Args:
+        path: JSON file (default: RAKSHAK_SOURCES)
+
+    Returns:
+        dict: source -> settings dict; empty when no file is configured
+    """
+    path = path or SOURCES_FILE
+    if not path:
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Could not read source settings from {path}: {e}")
+        return {}
+    if not isinstance(data, dict):
+        print(f"Ignoring source settings in {path}: expected a JSON object")
+        return {}
+    return data
+
+
+def get_source_config(source):
+    """
+    Settings for a video source, merged over the "default" entry.
+
+    Args:
+        source: 'webcam', stream URL, file path or camera index
+
+    Returns:
+        SourceConfig
+    """
+    global _configs
+    if _configs is None:
+        _configs = load_source_configs()
+
+    merged = dict(_configs.get('default', {}))
+    merged.update(_configs.get(str(source), {}))
+    try:
+        return SourceConfig.from_dict(merged)
+    except ValueError as e:
+        print(f"Invalid settings for source {source}: {e}")
+        return SourceConfig()
@@ -21,7 +21,7 @@ import streamlit as st
 import numpy as np
 import os
 import tempfile
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 
 # Safe import for OpenCV - handles cloud environments
@@ -35,10 +35,11 @@ from model_logic import (
     load_model,
     detect_vehicles,
     check_accident,
-    analyze_video_frame,
+    analyze_video_batches,
     is_demo_mode,
     get_vehicle_classes
 )
+from parallel_video import analyze_video_parallel
 
 # Page configuration
 st.set_page_config(
@@ -62,6 +63,9 @@ CV2_ERROR = """
 Please ensure requirements.txt contains: opencv-python-headless==4.10.0.84
 """
 
+# Number of video frames sent through the model in one forward pass
+VIDEO_BATCH_SIZE = 8
+
 
 def initialize_model():
     """Initialize the YOLO model."""
@@ -117,12 +121,13 @@ def process_uploaded_image(uploaded_file):
     }
 
 
-def process_uploaded_video(uploaded_file):
+def process_uploaded_video(uploaded_file, parallel=False):
     """
     Process an uploaded video file.
     
     Args:
         uploaded_file: Streamlit uploaded file object
+        parallel: Split the video into segments analysed by a process pool
         
     Returns:
         dict: Processing results with video path and stats
@@ -135,6 +140,9 @@ def process_uploaded_video(uploaded_file):
     tfile.write(uploaded_file.read())
     tfile.close()
     
+    if parallel:
+        return process_video_file_parallel(tfile.name)
+    
     # Open video capture
     cap = cv2.VideoCapture(tfile.name)
     
@@ -161,14 +169,8 @@ def process_uploaded_video(uploaded_file):
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        # Analyze frame
-        annotated_frame, vehicle_count, accident_flag, severity = analyze_video_frame(frame)
-        
+    # Analyze frames in batches
+    for annotated_frame, vehicle_count, accident_flag, severity in analyze_video_batches(cap, VIDEO_BATCH_SIZE):
         # Update statistics
         frame_count += 1
         max_vehicle_count = max(max_vehicle_count, vehicle_count)
@@ -207,6 +209,30 @@ def process_uploaded_video(uploaded_file):
     }
 
 
+def process_video_file_parallel(video_path):
+    """
+    Analyze a saved video file across a pool of worker processes.
+    
+    Args:
+        video_path: Path to the temp video file (deleted afterwards)
+        
+    Returns:
+        dict: Same results as process_uploaded_video()
+    """
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    
+    def update_progress(done, total):
+        progress_bar.progress(done / total)
+        status_text.text(f"Processed segment {done}/{total}")
+    
+    try:
+        return analyze_video_parallel(video_path, progress_callback=update_progress)
+    finally:
+        # Clean up input temp file
+        os.unlink(video_path)
+
+
 def main():
     """Main Streamlit application."""
     
@@ -253,6 +279,12 @@ def main():
         help="Minimum intersection area to consider as collision"
     )
     
+    parallel_video = st.sidebar.checkbox(
+        "Parallel Video Analysis",
+        value=False,
+        help="Split uploaded videos into segments analysed on several CPU cores"
+    )
+    
     # Info section
     st.sidebar.markdown("---")
     st.sidebar.markdown("### ℹ️ About")
@@ -266,7 +298,7 @@ def main():
     if input_type == "Image Analysis":
         image_analysis_section(overlap_threshold, min_area)
     elif input_type == "Video Analysis":
-        video_analysis_section(overlap_threshold, min_area)
+        video_analysis_section(overlap_threshold, min_area, parallel_video)
     else:
         statistics_dashboard_section()
 
@@ -331,7 +363,7 @@ def image_analysis_section(overlap_threshold, min_area):
                     )
 
 
-def video_analysis_section(overlap_threshold, min_area):
+def video_analysis_section(overlap_threshold, min_area, parallel=False):
     """Video analysis section."""
     st.header("🎬 Video Analysis")
     st.markdown("Upload a video to analyze vehicle movements and detect potential accidents.")
@@ -346,7 +378,7 @@ def video_analysis_section(overlap_threshold, min_area):
         # Process button
         if st.button("🎥 Analyze Video", type="primary"):
             with st.spinner("Processing video... This may take a while..."):
-                results = process_uploaded_video(uploaded_file)
+                results = process_uploaded_video(uploaded_file, parallel)
             
             if 'error' in results:
                 st.error(f"Error: {results['error']}")
@@ -403,6 +435,13 @@ def video_analysis_section(overlap_threshold, min_area):
                 os.unlink(results['output_video'])
 
 
+@st.cache_resource
+def get_database(db_path):
+    """One Database (long-lived connections) per Streamlit server process."""
+    from database import Database
+    return Database(db_path)
+
+
 def statistics_dashboard_section():
     """Statistics dashboard section."""
     st.header("📈 Statistics Dashboard")
@@ -425,24 +464,14 @@ def statistics_dashboard_section():
         """)
     else:
         try:
-            import sqlite3
-            
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            # Get total accidents
-            cursor.execute("SELECT COUNT(*) FROM accidents")
-            total_accidents = cursor.fetchone()[0]
-            
-            # Get recent accidents
-            cursor.execute("SELECT * FROM accidents ORDER BY timestamp DESC LIMIT 10")
-            recent_accidents = cursor.fetchall()
-            
-            # Get severity distribution
-            cursor.execute("SELECT severity, COUNT(*) FROM accidents GROUP BY severity")
-            severity_dist = cursor.fetchall()
-            
-            conn.close()
+            # Totals and distributions come from the rollup tables, and the
+            # recent list is an indexed LIMIT query, so a rerun costs the
+            # same however much history the database holds
+            db = get_database(db_path)
+            stats = db.get_stats(hours=24, days=30)
+            total_accidents = stats['total']
+            severity_dist = sorted(stats['by_severity'].items())
+            recent_accidents = [row[:6] for row in db.get_logs(limit=10)]
             
             # Display statistics
             col1, col2, col3 = st.columns(3)
@@ -452,13 +481,13 @@ def statistics_dashboard_section():
             
             with col2:
                 if severity_dist:
-                    avg_severity = sum(s * c for s, c in severity_dist) / total_accidents if total_accidents > 0 else 0
-                    st.metric("Average Severity", f"{avg_severity:.1f}/5")
+                    st.metric("Average Severity", f"{stats['average_severity']:.1f}/5")
                 else:
                     st.metric("Average Severity", "N/A")
             
             with col3:
-                st.metric("Data Points", total_accidents)
+                cutoff = (datetime.now() - timedelta(hours=23)).strftime('%Y-%m-%d %H:00')
+                st.metric("Last 24 Hours", sum(c for bucket, c in stats['hourly'] if bucket >= cutoff))
             
             # Severity distribution chart
             if severity_dist:
@@ -466,6 +495,12 @@ def statistics_dashboard_section():
                 severity_df = pd.DataFrame(severity_dist, columns=['Severity', 'Count'])
                 st.bar_chart(severity_df.set_index('Severity'))
             
+            # Daily trend chart
+            if stats['daily']:
+                st.markdown("### Accidents per Day")
+                daily_df = pd.DataFrame(list(reversed(stats['daily'])), columns=['Day', 'Count'])
+                st.bar_chart(daily_df.set_index('Day'))
+            
             # Recent accidents table
             if recent_accidents:
                 st.markdown("### Recent Accidents")
@@ -0,0 +1,130 @@
+"""
+Rakshak AI - Tiled Inference
+============================
+Overlapping-tile inference for high-resolution (e.g. 4K) feeds.
+
+Downscaling a 3840x2160 frame to a 640px model input shrinks distant
+vehicles to a few pixels. Tiler splits the frame into a grid of equally
+sized, overlapping tiles that are run through the model as one batch;
+the per-tile detections are shifted back into frame coordinates and
+duplicates from the overlaps are merged with class-aware NMS.
+
+Functions:
+- tile_rects(frame_shape, grid, overlap): Equally sized overlapping tile rectangles
+- nms(boxes, scores, iou_threshold): Class-aware non-maximum suppression
+
+Classes:
+- Tiler(grid, overlap, iou_threshold): Split frames into tiles and merge detections
+"""
+
+import numpy as np
+
+from collision import boxes_to_array
+
+
+def tile_rects(frame_shape, grid=(2, 2), overlap=0.2):
+    """
+    Split a frame into cols x rows tiles of equal size that overlap by
+    roughly overlap times the tile size and together cover the frame.
+
+    Args:
+        frame_shape: (height, width, ...) of the frame
+        grid: (cols, rows)
+        overlap: Fraction of a tile shared with its neighbour (0..0.9)
+
+    Returns:
+        list: (x1, y1, x2, y2) integer rectangles, row by row
+    """
+    h, w = frame_shape[:2]
+    cols, rows = max(1, int(grid[0])), max(1, int(grid[1]))
+    overlap = min(max(float(overlap), 0.0), 0.9)
+
+    def spans(length, count):
+        size = min(length, int(np.ceil(length / (count - (count - 1) * overlap))))
+        if count == 1:
+            return [(0, length)]
+        step = (length - size) / (count - 1)
+        return [(int(round(i * step)), int(round(i * step)) + size) for i in range(count)]
+
+    return [(x1, y1, x2, y2) for y1, y2 in spans(h, rows) for x1, x2 in spans(w, cols)]
+
+
+def nms(boxes, scores, iou_threshold=0.5):
+    """
+    Greedy non-maximum suppression, applied separately per class.
+
+    Args:
+        boxes: List of (x1, y1, x2, y2, class_id) tuples
+        scores: Confidence per box
+        iou_threshold: Boxes of the same class overlapping a higher-scoring
+                       kept box by more than this are removed
+
+    Returns:
+        list: Indices of the kept boxes, highest score first
+    """
+    if not boxes:
+        return []
+    arr = boxes_to_array(boxes)
+    x1, y1, x2, y2, cls = arr[:, 0], arr[:, 1], arr[:, 2], arr[:, 3], arr[:, 4]
+    areas = (x2 - x1) * (y2 - y1)
+
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind='stable')
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        union = areas[i] + areas[rest] - inter
+        iou = np.where(union > 0, inter / np.where(union > 0, union, 1), 0.0)
+        order = rest[(iou <= iou_threshold) | (cls[rest] != cls[i])]
+    return keep
+
+
+class Tiler:
+    def __init__(self, grid=(2, 2), overlap=0.2, iou_threshold=0.5):
+        """
+        Args:
+            grid: (cols, rows) of tiles
+            overlap: Fraction of a tile shared with its neighbour; should be
+                     at least the size of the largest vehicle relative to a tile
+            iou_threshold: NMS threshold for merging duplicates across tiles
+        """
+        self.grid = (int(grid[0]), int(grid[1]))
+        self.overlap = overlap
+        self.iou_threshold = iou_threshold
+        self._shape = None
+
+    def rects(self, frame_shape):
+        """Tile rectangles for frames of this shape (cached)."""
+        if frame_shape[:2] != self._shape:
+            self._rects = tile_rects(frame_shape, self.grid, self.overlap)
+            self._shape = frame_shape[:2]
+        return self._rects
+
+    def split(self, frame):
+        """
+        Returns:
+            list: Tile views of frame (no copies), one per rectangle
+        """
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in self.rects(frame.shape)]
+
+    def merge(self, tile_detections, frame_shape):
+        """
+        Shift per-tile detections into frame coordinates and remove duplicates.
+
+        Args:
+            tile_detections: (boxes, scores) per tile, in split() order
+            frame_shape: Shape of the full frame
+
+        Returns:
+            list: (x1, y1, x2, y2, class_id) tuples, highest confidence first
+        """
+        boxes = []
+        scores = []
+        for (ox, oy, _, _), (tile_boxes, tile_scores) in zip(self.rects(frame_shape), tile_detections):
+            boxes.extend((x1 + ox, y1 + oy, x2 + ox, y2 + oy, cls) for x1, y1, x2, y2, cls in tile_boxes)
+            scores.extend(tile_scores)
+        return [boxes[i] for i in nms(boxes, scores, self.iou_threshold)]
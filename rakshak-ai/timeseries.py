@@ -0,0 +1,458 @@
+"""
+Rakshak AI - Per-Camera Time Series
+===================================
+Append-only, columnar storage of what the detector sees on every frame,
+for traffic analytics and replay, without a SQLite row per frame.
+
+Layout (one directory per camera under the store root):
+
+    <camera>/camera.json              original source name
+    <camera>/<start_ms>.frames.bin    fixed-size frame records (FRAME_DTYPE)
+    <camera>/<start_ms>.boxes.bin     boxes of inferred frames (BOX_DTYPE)
+    <camera>/rollup_<seconds>_<day>.bin  downsampled buckets (ROLLUP_DTYPE)
+
+Raw data is written in segments that rotate after segment_frames frames
+or segment_seconds, so retention deletes whole files. A frame record
+points at its boxes by offset/count within the segment's boxes file.
+Records are buffered and appended in blocks; readers memory-map the
+files and ignore a trailing partial record, so a crash loses at most
+the unflushed block.
+
+Rollups (per minute and per hour by default) are accumulated in memory
+and appended when a bucket closes or the last stream writing the camera
+releases it. They are kept much longer than the raw segments.
+
+Classes:
+- CameraSeries: Writer for one camera
+- TimeSeriesStore(root): All cameras; reading, replay and retention
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# Store location for the Flask app; RAKSHAK_TIMESERIES_DIR overrides it
+DEFAULT_DIR = os.environ.get('RAKSHAK_TIMESERIES_DIR',
+                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'timeseries'))
+
+FRAME_DTYPE = np.dtype([
+    ('ts', '<f8'),             # Unix seconds (media time from the run start for files)
+    ('frame', '<i8'),          # frame index within the stream
+    ('vehicle_count', '<u2'),
+    ('flags', 'u1'),           # FLAG_* bits
+    ('severity', 'u1'),
+    ('box_offset', '<u4'),     # first box in the segment's boxes file
+    ('box_count', '<u2'),
+])
+
+# Pixel coordinates fit in uint16 for any realistic camera resolution
+BOX_DTYPE = np.dtype([('x1', '<u2'), ('y1', '<u2'), ('x2', '<u2'), ('y2', '<u2'), ('cls', 'u1')])
+
+ROLLUP_DTYPE = np.dtype([
+    ('bucket', '<i8'),         # bucket start, Unix seconds
+    ('frames', '<u4'),
+    ('inferred', '<u4'),
+    ('count_sum', '<u4'),      # sum of vehicle_count, for the mean
+    ('count_max', '<u2'),
+    ('accidents', '<u2'),
+])
+
+FLAG_INFERRED = 1
+FLAG_ACCIDENT = 2
+
+ROLLUP_RESOLUTIONS = (60, 3600)
+
+
+def _camera_dirname(camera):
+    camera = str(camera)
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', camera).strip('_')[:48] or 'camera'
+    return f"{name}-{hashlib.sha1(camera.encode('utf-8')).hexdigest()[:8]}"
+
+
+def _read(path, dtype):
+    """Memory-map whole records of path (empty array for a missing or empty file)."""
+    try:
+        count = os.path.getsize(path) // dtype.itemsize
+    except OSError:
+        count = 0
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+
+def _append(path, records):
+    with open(path, 'ab') as f:
+        f.write(records.tobytes())
+
+
+def boxes_to_records(boxes):
+    """(x1, y1, x2, y2, class_id) tuples -> BOX_DTYPE array."""
+    records = np.zeros(len(boxes), dtype=BOX_DTYPE)
+    if len(boxes):
+        arr = np.asarray([b[:5] for b in boxes], dtype=np.float64)
+        for i, field in enumerate(('x1', 'y1', 'x2', 'y2')):
+            records[field] = np.clip(np.rint(arr[:, i]), 0, 65535)
+        records['cls'] = np.clip(arr[:, 4], 0, 255)
+    return records
+
+
+def records_to_boxes(records):
+    """BOX_DTYPE array -> (x1, y1, x2, y2, class_id) tuples."""
+    return [(int(r['x1']), int(r['y1']), int(r['x2']), int(r['y2']), int(r['cls'])) for r in records]
+
+
+class CameraSeries:
+    def __init__(self, path, camera, segment_frames=65536, segment_seconds=3600, flush_frames=256,
+                 resolutions=ROLLUP_RESOLUTIONS, on_rotate=None):
+        """
+        Args:
+            path: Directory for this camera
+            camera: Source name, recorded in camera.json
+            segment_frames: Frames per raw segment before rotating
+            segment_seconds: Maximum wall-clock span of a raw segment
+            flush_frames: Frames buffered in memory between appends
+            resolutions: Rollup bucket sizes in seconds
+            on_rotate: Called after a segment is closed (used for retention)
+        """
+        self.path = path
+        self.camera = str(camera)
+        self.segment_frames = segment_frames
+        self.segment_seconds = segment_seconds
+        self.flush_frames = flush_frames
+        self.resolutions = tuple(resolutions)
+        self.on_rotate = on_rotate
+        self._lock = threading.Lock()
+        self._users = 0
+
+        os.makedirs(path, exist_ok=True)
+        meta = os.path.join(path, 'camera.json')
+        if not os.path.exists(meta):
+            with open(meta, 'w', encoding='utf-8') as f:
+                json.dump({'camera': self.camera}, f)
+
+        self._segment = None          # start_ms of the open segment
+        self._segment_start = 0.0
+        self._segment_frames = 0
+        self._segment_boxes = 0
+        self._frames = []
+        self._boxes = []
+        # resolution -> [bucket, frames, inferred, count_sum, count_max, accidents]
+        self._buckets = {}
+        self._closed_buckets = {res: [] for res in self.resolutions}
+
+    def _segment_path(self, kind):
+        return os.path.join(self.path, f"{self._segment}.{kind}.bin")
+
+    def _rotate(self, ts):
+        self._flush_raw()
+        rotated = self._segment is not None
+        self._segment = int(ts * 1000)
+        self._segment_start = ts
+        self._segment_frames = 0
+        self._segment_boxes = 0
+        if rotated and self.on_rotate is not None:
+            self.on_rotate(self)
+
+    def append(self, ts, frame_index, vehicle_count, boxes=(), accident=False, severity=0, inferred=True):
+        """
+        Record one frame.
+
+        Args:
+            ts: Frame time (Unix seconds)
+            frame_index: Frame number within the stream
+            vehicle_count: Vehicles on the frame
+            boxes: (x1, y1, x2, y2, class_id) tuples; stored for inferred frames only
+            accident: Whether an accident was confirmed on this frame
+            severity: Accident severity (0-5)
+            inferred: False for frames that reused earlier detections
+        """
+        with self._lock:
+            if (self._segment is None or self._segment_frames >= self.segment_frames
+                    or ts - self._segment_start >= self.segment_seconds):
+                self._rotate(ts)
+
+            box_records = boxes_to_records(boxes) if inferred else boxes_to_records(())
+            flags = (FLAG_INFERRED if inferred else 0) | (FLAG_ACCIDENT if accident else 0)
+            self._frames.append((ts, frame_index, min(int(vehicle_count), 65535), flags, int(severity),
+                                 self._segment_boxes, len(box_records)))
+            if len(box_records):
+                self._boxes.append(box_records)
+            self._segment_frames += 1
+            self._segment_boxes += len(box_records)
+
+            self._update_rollups(ts, vehicle_count, inferred, accident)
+
+            if len(self._frames) >= self.flush_frames:
+                self._flush_raw()
+
+    def _update_rollups(self, ts, vehicle_count, inferred, accident):
+        for res in self.resolutions:
+            bucket = int(ts // res) * res
+            current = self._buckets.get(res)
+            if current is None or current[0] != bucket:
+                if current is not None:
+                    self._closed_buckets[res].append(tuple(current))
+                current = self._buckets[res] = [bucket, 0, 0, 0, 0, 0]
+            current[1] += 1
+            current[2] += bool(inferred)
+            current[3] += int(vehicle_count)
+            current[4] = max(current[4], min(int(vehicle_count), 65535))
+            current[5] += bool(accident)
+
+    def _flush_raw(self):
+        # boxes first: a frame record must never point past the boxes file
+        if self._boxes:
+            _append(self._segment_path('boxes'), np.concatenate(self._boxes))
+            self._boxes = []
+        if self._frames:
+            _append(self._segment_path('frames'), np.array(self._frames, dtype=FRAME_DTYPE))
+            self._frames = []
+        for res, closed in self._closed_buckets.items():
+            if closed:
+                records = np.array(closed, dtype=ROLLUP_DTYPE)
+                # one rollup file per UTC day so retention can drop whole days
+                for day in np.unique(records['bucket'] // 86400):
+                    path = os.path.join(self.path, f"rollup_{res}_{int(day)}.bin")
+                    _append(path, records[records['bucket'] // 86400 == day])
+                closed.clear()
+
+    def flush(self):
+        """Append buffered frames and closed rollup buckets to disk."""
+        with self._lock:
+            self._flush_raw()
+
+    def acquire(self):
+        """Register a stream writing to this series; pair with release()."""
+        with self._lock:
+            self._users += 1
+        return self
+
+    def release(self):
+        """
+        A stream stopped writing. The last one out closes the series, so
+        open rollup buckets are not cut short while other streams of the
+        same camera keep appending.
+        """
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users:
+                self._flush_raw()
+                return
+            self._close()
+
+    def close(self):
+        """Flush everything, including the still-open rollup buckets."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        for res, current in self._buckets.items():
+            self._closed_buckets[res].append(tuple(current))
+        self._buckets = {}
+        self._flush_raw()
+
+
+class TimeSeriesStore:
+    def __init__(self, root=DEFAULT_DIR, raw_retention_days=7, rollup_retention_days=90, **series_options):
+        """
+        Args:
+            root: Directory holding one subdirectory per camera
+            raw_retention_days: Keep per-frame segments this long
+            rollup_retention_days: Keep rollup buckets this long
+            series_options: Passed to CameraSeries (segment_frames, flush_frames, ...)
+        """
+        self.root = root
+        self.raw_retention_days = raw_retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.series_options = series_options
+        self._series = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        atexit.register(self.close)
+
+    def series(self, camera):
+        """The writer for camera (created on first use)."""
+        camera = str(camera)
+        with self._lock:
+            series = self._series.get(camera)
+            if series is None:
+                series = CameraSeries(os.path.join(self.root, _camera_dirname(camera)), camera,
+                                      on_rotate=lambda s: self._apply_retention(s.path),
+                                      **self.series_options)
+                self._series[camera] = series
+            return series
+
+    def open(self, camera):
+        """The writer for camera, acquired for one stream; call its release() when done."""
+        return self.series(camera).acquire()
+
+    def append(self, camera, ts, frame_index, vehicle_count, boxes=(), accident=False, severity=0, inferred=True):
+        """Record one frame for camera; see CameraSeries.append()."""
+        self.series(camera).append(ts, frame_index, vehicle_count, boxes, accident, severity, inferred)
+
+    def flush(self):
+        with self._lock:
+            series = list(self._series.values())
+        for s in series:
+            s.flush()
+
+    def close(self):
+        with self._lock:
+            series = list(self._series.values())
+        for s in series:
+            s.close()
+
+    def _flush_camera(self, camera):
+        with self._lock:
+            series = self._series.get(str(camera))
+        if series is not None:
+            series.flush()
+
+    def cameras(self):
+        """Source names of every camera with stored data."""
+        names = []
+        for entry in sorted(os.listdir(self.root)):
+            try:
+                with open(os.path.join(self.root, entry, 'camera.json'), encoding='utf-8') as f:
+                    names.append(json.load(f)['camera'])
+            except (OSError, ValueError, KeyError):
+                continue
+        return names
+
+    def _camera_path(self, camera):
+        return os.path.join(self.root, _camera_dirname(camera))
+
+    def _segments(self, camera):
+        path = self._camera_path(camera)
+        try:
+            starts = sorted(int(name.split('.')[0]) for name in os.listdir(path) if name.endswith('.frames.bin'))
+        except OSError:
+            return []
+        return [(start, os.path.join(path, str(start))) for start in starts]
+
+    def _segments_in_range(self, camera, since, until):
+        segments = self._segments(camera)
+        selected = []
+        for i, (start, base) in enumerate(segments):
+            end = segments[i + 1][0] if i + 1 < len(segments) else None
+            if until is not None and start / 1000 >= until:
+                continue
+            if since is not None and end is not None and end / 1000 <= since:
+                continue
+            selected.append(base)
+        return selected
+
+    def read_frames(self, camera, since=None, until=None):
+        """
+        Frame records for camera in [since, until).
+
+        Returns:
+            numpy structured array of FRAME_DTYPE (a copy)
+        """
+        self._flush_camera(camera)
+        parts = []
+        for base in self._segments_in_range(camera, since, until):
+            frames = _read(base + '.frames.bin', FRAME_DTYPE)
+            mask = np.ones(len(frames), dtype=bool)
+            if since is not None:
+                mask &= frames['ts'] >= since
+            if until is not None:
+                mask &= frames['ts'] < until
+            parts.append(np.array(frames[mask]))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=FRAME_DTYPE)
+
+    def replay(self, camera, since=None, until=None):
+        """
+        Yield (frame_record, boxes) for camera in [since, until), in order.
+
+        boxes are (x1, y1, x2, y2, class_id) tuples; empty for frames that
+        were not inferred.
+        """
+        self._flush_camera(camera)
+        for base in self._segments_in_range(camera, since, until):
+            frames = _read(base + '.frames.bin', FRAME_DTYPE)
+            boxes = _read(base + '.boxes.bin', BOX_DTYPE)
+            for record in frames:
+                if since is not None and record['ts'] < since:
+                    continue
+                if until is not None and record['ts'] >= until:
+                    return
+                offset, count = int(record['box_offset']), int(record['box_count'])
+                yield record, records_to_boxes(boxes[offset:offset + count])
+
+    def read_rollups(self, camera, resolution=60, since=None, until=None):
+        """
+        Downsampled buckets for camera in [since, until).
+
+        Returns:
+            numpy structured array of ROLLUP_DTYPE, oldest first
+        """
+        self._flush_camera(camera)
+        path = self._camera_path(camera)
+        prefix = f"rollup_{int(resolution)}_"
+        parts = []
+        try:
+            names = sorted(n for n in os.listdir(path) if n.startswith(prefix))
+        except OSError:
+            names = []
+        for name in names:
+            day = int(name[len(prefix):-len('.bin')])
+            if since is not None and (day + 1) * 86400 <= since:
+                continue
+            if until is not None and day * 86400 >= until:
+                continue
+            parts.append(np.array(_read(os.path.join(path, name), ROLLUP_DTYPE)))
+        if not parts:
+            return np.zeros(0, dtype=ROLLUP_DTYPE)
+        rollups = np.concatenate(parts)
+        mask = np.ones(len(rollups), dtype=bool)
+        if since is not None:
+            mask &= rollups['bucket'] >= since
+        if until is not None:
+            mask &= rollups['bucket'] < until
+        rollups = rollups[mask]
+
+        # a stream restarted within a bucket writes it twice; merge those
+        buckets, index = np.unique(rollups['bucket'], return_inverse=True)
+        if len(buckets) == len(rollups):
+            return rollups[np.argsort(rollups['bucket'], kind='stable')]
+        merged = np.zeros(len(buckets), dtype=ROLLUP_DTYPE)
+        merged['bucket'] = buckets
+        for field in ('frames', 'inferred', 'count_sum', 'accidents'):
+            np.add.at(merged[field], index, rollups[field])
+        np.maximum.at(merged['count_max'], index, rollups['count_max'])
+        return merged
+
+    def _apply_retention(self, path, now=None):
+        now = time.time() if now is None else now
+        raw_cutoff = (now - self.raw_retention_days * 86400) * 1000
+        rollup_cutoff_day = (now - self.rollup_retention_days * 86400) // 86400
+
+        names = os.listdir(path)
+        starts = sorted(int(n.split('.')[0]) for n in names if n.endswith('.frames.bin'))
+        # a segment is expired once the next one started before the cutoff
+        for start, next_start in zip(starts, starts[1:]):
+            if next_start < raw_cutoff:
+                for kind in ('frames', 'boxes'):
+                    try:
+                        os.remove(os.path.join(path, f"{start}.{kind}.bin"))
+                    except FileNotFoundError:
+                        pass
+        for name in names:
+            if name.startswith('rollup_') and int(name.rsplit('_', 1)[1][:-len('.bin')]) < rollup_cutoff_day:
+                os.remove(os.path.join(path, name))
+
+    def enforce_retention(self, now=None):
+        """Delete raw segments and rollup days older than the retention windows."""
+        # works on the camera directories directly: no writer is created
+        # for cameras that are not streaming
+        for entry in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, entry)
+            if os.path.isdir(path):
+                self._apply_retention(path, now)
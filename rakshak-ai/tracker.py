@@ -0,0 +1,234 @@
+"""
+Rakshak AI - Vehicle Tracker
+============================
+Lightweight IoU/centroid tracker plus per-pair collision history.
+
+VehicleTracker gives every vehicle box a stable track ID across frames.
+Detections are matched to tracks greedily by IoU against each track's
+predicted position, with a centroid-distance fallback for fast-moving or
+small vehicles. Each track keeps a constant-velocity estimate, so boxes
+can be extrapolated for frames where detection was skipped.
+
+CollisionMonitor keeps the overlap history per pair of track IDs. A
+collision is confirmed only when the same two vehicles overlap on
+min_consecutive inferred frames, instead of any pair bumping one global
+counter. Updates touch only the tracks and overlapping pairs in the
+current frame.
+
+Classes:
+- VehicleTracker: Assign track IDs and predict boxes between detections
+- CollisionMonitor: Enforce min_consecutive per vehicle pair
+"""
+
+import numpy as np
+
+from collision import VEHICLE_CLASSES, cross_overlap, collision_severity
+
+
+class Track:
+    __slots__ = ('track_id', 'box', 'cls', 'velocity', 'last_frame', 'hits', 'misses')
+
+    def __init__(self, track_id, box, cls, frame_index):
+        self.track_id = track_id
+        self.box = np.asarray(box, dtype=np.float64)
+        self.cls = cls
+        self.velocity = np.zeros(4, dtype=np.float64)
+        self.last_frame = frame_index
+        self.hits = 1
+        self.misses = 0
+
+    def predict(self, frame_index):
+        """Box extrapolated to frame_index with the current velocity."""
+        return self.box + self.velocity * (frame_index - self.last_frame)
+
+    def update(self, box, frame_index, smoothing=0.5):
+        box = np.asarray(box, dtype=np.float64)
+        elapsed = frame_index - self.last_frame
+        if elapsed > 0:
+            measured = (box - self.box) / elapsed
+            self.velocity = smoothing * measured + (1 - smoothing) * self.velocity
+        self.box = box
+        self.last_frame = frame_index
+        self.hits += 1
+        self.misses = 0
+
+
+class VehicleTracker:
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.5, max_misses=10, vehicle_classes=VEHICLE_CLASSES):
+        """
+        Args:
+            iou_threshold: Minimum IoU between a prediction and a detection to match
+            max_centroid_distance: Fallback match when centroids are closer than this
+                                   fraction of the track's box diagonal
+            max_misses: Inferred frames a track may go unmatched before it is dropped
+            vehicle_classes: Classes that are tracked; other boxes get no ID
+        """
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_misses = max_misses
+        self.vehicle_classes = tuple(vehicle_classes)
+        self.reset()
+
+    def reset(self):
+        self.tracks = {}
+        self._next_id = 1
+        self.frame_index = -1
+
+    def update(self, boxes, frame_index=None):
+        """
+        Match one frame's detections to tracks.
+
+        Args:
+            boxes: List of (x1, y1, x2, y2, class_id) tuples
+            frame_index: Frame number of these detections (default: previous + 1).
+                         Gaps between indices are frames where detection was skipped.
+
+        Returns:
+            list: Track ID for each box (None for non-vehicle classes)
+        """
+        if frame_index is None:
+            frame_index = self.frame_index + 1
+        self.frame_index = frame_index
+
+        ids = [None] * len(boxes)
+        det_index = [i for i, b in enumerate(boxes) if int(b[4]) in self.vehicle_classes]
+        tracks = list(self.tracks.values())
+
+        unmatched_dets = set(det_index)
+        unmatched_tracks = set(range(len(tracks)))
+
+        if det_index and tracks:
+            det_boxes = np.asarray([boxes[i][:4] for i in det_index], dtype=np.float64)
+            predicted = np.asarray([t.predict(frame_index) for t in tracks])
+            _, iou = cross_overlap(predicted, det_boxes)
+
+            # centroid fallback, scaled by each track's diagonal
+            track_c = (predicted[:, :2] + predicted[:, 2:]) / 2
+            det_c = (det_boxes[:, :2] + det_boxes[:, 2:]) / 2
+            diag = np.hypot(predicted[:, 2] - predicted[:, 0], predicted[:, 3] - predicted[:, 1])
+            dist = np.linalg.norm(track_c[:, None, :] - det_c[None, :, :], axis=2) / np.maximum(diag[:, None], 1.0)
+
+            # greedy: best IoU first, then closest centroid, one match per track/detection
+            score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                             np.where(dist <= self.max_centroid_distance, 1.0 - dist, 0.0))
+            for flat in np.argsort(-score, axis=None):
+                t, d = divmod(int(flat), score.shape[1])
+                if score[t, d] <= 0:
+                    break
+                if t not in unmatched_tracks or det_index[d] not in unmatched_dets:
+                    continue
+                tracks[t].update(det_boxes[d], frame_index)
+                ids[det_index[d]] = tracks[t].track_id
+                unmatched_tracks.discard(t)
+                unmatched_dets.discard(det_index[d])
+
+        for t in unmatched_tracks:
+            track = tracks[t]
+            track.misses += 1
+            if track.misses > self.max_misses:
+                del self.tracks[track.track_id]
+
+        for i in sorted(unmatched_dets):
+            track = Track(self._next_id, boxes[i][:4], int(boxes[i][4]), frame_index)
+            self.tracks[track.track_id] = track
+            ids[i] = track.track_id
+            self._next_id += 1
+
+        return ids
+
+    def predicted_boxes(self, frame_index):
+        """
+        Extrapolate every live track to frame_index.
+
+        Used to fill frames where detection was skipped.
+
+        Returns:
+            list: (x1, y1, x2, y2, class_id) tuples
+        """
+        boxes = []
+        for track in self.tracks.values():
+            if track.misses:
+                continue
+            x1, y1, x2, y2 = track.predict(frame_index).tolist()
+            boxes.append((x1, y1, x2, y2, track.cls))
+        return boxes
+
+
+class CollisionMonitor:
+    def __init__(self, min_consecutive=3, tracker=None, max_gap=0):
+        """
+        Args:
+            min_consecutive: Inferred frames a specific vehicle pair must overlap
+                             before the collision is confirmed
+            tracker: VehicleTracker to use (a default one is created if omitted)
+            max_gap: Inferred frames in a row a pair may miss without losing its
+                     count, to tolerate dropped detections. Missed frames do not
+                     add to the count. The default 0 resets a pair on its first miss.
+        """
+        self.min_consecutive = min_consecutive
+        self.max_gap = max(0, int(max_gap))
+        self.tracker = tracker or VehicleTracker()
+        self.pair_counts = {}
+        self._pair_gaps = {}
+
+    def reset(self):
+        self.tracker.reset()
+        self.pair_counts = {}
+        self._pair_gaps = {}
+
+    def update(self, boxes, collisions, frame_index=None, min_consecutive=None):
+        """
+        Feed one inferred frame's boxes and collision candidates.
+
+        Args:
+            boxes: List of (x1, y1, x2, y2, class_id) tuples
+            collisions: (i, j, iou, inter_area) tuples from find_collisions(boxes)
+            frame_index: Frame number (see VehicleTracker.update)
+            min_consecutive: Override the monitor's threshold for this call
+
+        Returns:
+            list: Confirmed (track_a, track_b, iou) pairs, highest IoU first
+        """
+        required = self.min_consecutive if min_consecutive is None else min_consecutive
+        ids = self.tracker.update(boxes, frame_index)
+
+        seen = set()
+        confirmed = []
+        for i, j, iou, _ in collisions:
+            if ids[i] is None or ids[j] is None:
+                continue
+            pair = (min(ids[i], ids[j]), max(ids[i], ids[j]))
+            if pair in seen:
+                continue
+            seen.add(pair)
+            self._pair_gaps.pop(pair, None)
+            count = self.pair_counts.get(pair, 0) + 1
+            if count >= required:
+                confirmed.append((pair[0], pair[1], iou))
+                count = 0
+            self.pair_counts[pair] = count
+
+        # reset pairs that did not overlap this frame (after max_gap misses),
+        # and forget dead tracks
+        for pair in list(self.pair_counts):
+            if pair in seen:
+                continue
+            gap = self._pair_gaps.get(pair, 0) + 1
+            if gap > self.max_gap or pair[0] not in self.tracker.tracks or pair[1] not in self.tracker.tracks:
+                del self.pair_counts[pair]
+                self._pair_gaps.pop(pair, None)
+            else:
+                self._pair_gaps[pair] = gap
+
+        confirmed.sort(key=lambda p: p[2], reverse=True)
+        return confirmed
+
+    def check(self, boxes, collisions, frame_index=None, min_consecutive=None):
+        """
+        Like update(), but returns (accident_flag, severity) for callers
+        that only need the verdict.
+        """
+        confirmed = self.update(boxes, collisions, frame_index, min_consecutive)
+        if confirmed:
+            return True, collision_severity(confirmed[0][2])
+        return False, 0
@@ -0,0 +1,31 @@
+import os
+import sys
+import types
+
+import pytest
+
+# the application modules live flat in rakshak-ai/ and import each other by name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'rakshak-ai'))
+
+# alerts.py plays the siren through playsound; nothing should play in tests
+_playsound = types.ModuleType('playsound')
+_playsound.playsound = lambda *args, **kwargs: None
+sys.modules.setdefault('playsound', _playsound)
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """
+    The Flask app module, imported once with its database in a temporary
+    directory, the model left unloaded and time-series recording off.
+    """
+    os.environ['RAKSHAK_MODEL_INIT'] = 'lazy'
+    os.environ['RAKSHAK_TIMESERIES'] = '0'
+
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        import app
+    finally:
+        os.chdir(cwd)
+    return app
@@ -0,0 +1,160 @@
+import sys
+import types
+from datetime import datetime
+
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    db = Database(str(tmp_path / 'accidents.db'))
+    monkeypatch.setattr(app_module, 'db', db)
+    yield app_module.app.test_client()
+    db.close()
+
+
+def _fill(db, count):
+    db._insert_rows([('2024-01-01 00:00:00', 0.0, 0.0, 1 + i % 3, f'row {i}', 1000.0 + i // 2)
+                     for i in range(count)])
+
+
+def test_logs_cursor_walks_every_page(app_module, client):
+    _fill(app_module.db, 25)
+
+    ids, before = [], None
+    while True:
+        response = client.get('/logs', query_string={'limit': 10, **({'before': before} if before else {})})
+        assert response.status_code == 200
+        ids.extend(row[0] for row in response.get_json())
+        before = response.headers.get('X-Next-Before')
+        if before is None:
+            break
+        assert not before.startswith('None')
+
+    assert ids == sorted(ids, reverse=True)
+    assert len(set(ids)) == 25
+
+
+def test_logs_last_full_page_cursor_returns_empty_page(app_module, client):
+    _fill(app_module.db, 10)
+
+    response = client.get('/logs?limit=10')
+    following = client.get('/logs', query_string={'limit': 10, 'before': response.headers['X-Next-Before']})
+
+    assert following.get_json() == []
+    assert 'X-Next-Before' not in following.headers
+
+
+def _fill_minutes(db, count):
+    # one row a minute from 10:00 local time
+    db._insert_rows([('2024-01-01 10:00:00', 0.0, 0.0, 1, f'row {i}', datetime(2024, 1, 1, 10, i).timestamp())
+                     for i in range(count)])
+
+
+@pytest.mark.parametrize('before', ['2024-01-01T10:30', '2024-01-01T10:30:00', '2024-01-01 10:30:00.000'])
+def test_logs_accepts_iso_before(app_module, client, before):
+    _fill_minutes(app_module.db, 60)
+
+    response = client.get('/logs', query_string={'limit': 100, 'before': before})
+
+    assert response.status_code == 200
+    assert [row[5] for row in response.get_json()] == [f'row {i}' for i in range(29, -1, -1)]
+
+
+def test_logs_time_range_at_the_ends_of_the_calendar(app_module, client):
+    _fill_minutes(app_module.db, 5)
+
+    response = client.get('/logs', query_string={'since': '0001-01-01', 'until': '9999-12-31'})
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == 5
+
+
+@pytest.mark.parametrize('query', [
+    'before=nan', 'before=inf:3', 'before=-inf', 'before=nan:1',
+    'since=nan', 'until=inf', 'before=abc:1', 'limit=x',
+])
+def test_logs_rejects_bad_parameters(client, query):
+    response = client.get(f'/logs?{query}')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.fixture
+def ml_stack(monkeypatch):
+    # _initialize_detector() imports these before loading the model
+    for name in ('torch', 'ultralytics'):
+        monkeypatch.setitem(sys.modules, name, sys.modules.get(name) or types.ModuleType(name))
+
+
+def test_readiness_needs_only_the_shared_model(app_module, ml_stack, monkeypatch):
+    warmups = []
+    monkeypatch.setattr(app_module.engine, 'load_model', lambda: object())
+    monkeypatch.setattr(app_module.engine, 'warmup', lambda frame_shape: warmups.append(frame_shape))
+
+    def no_detector(*args, **kwargs):
+        raise AssertionError('readiness must not build a CarDetector')
+
+    monkeypatch.setattr(app_module, 'CarDetector', no_detector)
+    monkeypatch.setitem(app_module.model_status, 'state', 'loading')
+    monkeypatch.setattr(app_module, 'detector_ready', app_module.threading.Event())
+
+    app_module._initialize_detector()
+
+    assert app_module.model_status['state'] == 'ready'
+    assert app_module.wait_for_model(timeout=0)
+    assert warmups == [(480, 640, 3)]
+    assert app_module.app.test_client().get('/ready').status_code == 200
+
+
+def test_failed_model_load_is_reported(app_module, ml_stack, monkeypatch):
+    monkeypatch.setattr(app_module.engine, 'load_model', lambda: None)
+    monkeypatch.setattr(app_module.engine, 'get_loading_error', lambda: 'no weights')
+    monkeypatch.setitem(app_module.model_status, 'state', 'loading')
+    monkeypatch.setitem(app_module.model_status, 'error', None)
+    monkeypatch.setattr(app_module, 'detector_ready', app_module.threading.Event())
+
+    app_module._initialize_detector()
+
+    assert app_module.model_status['state'] == 'failed'
+    assert 'no weights' in app_module.model_status['error']
+    assert not app_module.wait_for_model(timeout=0)
+    assert app_module.app.test_client().get('/ready').status_code == 503
+
+
+class _SilentAlerts:
+    connections_opened = 0
+
+    def play_siren(self):
+        pass
+
+    def send_sms(self, body):
+        return None
+
+
+def test_every_confirmed_incident_is_logged_despite_the_alert_cooldown(app_module, client, monkeypatch):
+    from dispatcher import AlertDispatcher
+    from incidents import IncidentManager
+
+    dispatcher = AlertDispatcher(_SilentAlerts(), workers=1, cooldown=60)
+    monkeypatch.setattr(app_module, 'dispatcher', dispatcher)
+    monkeypatch.setattr(app_module, 'incidents',
+                        IncidentManager(on_transition=app_module._on_incident_transition))
+    try:
+        # two separate incidents on one camera, well inside the cooldown
+        for now in (100.0, 100.5, 200.0, 200.5):
+            app_module.incidents.update('cam', True, 2, now=now)
+        app_module.incidents.update('cam', True, 2, now=300.0)
+        dispatcher.flush()
+        app_module.db.flush()
+
+        assert app_module.db.get_accident_count() == 2
+        stats = dispatcher.stats()
+        assert stats['delivered'] == 1
+        assert stats['deduplicated'] == 1
+    finally:
+        dispatcher.close()
+        app_module.accident_event.clear()
@@ -0,0 +1,60 @@
+import io
+
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('httpx')
+
+from starlette.testclient import TestClient  # noqa: E402
+
+
+@pytest.fixture
+def client(app_module):
+    import asgi_app
+    with TestClient(asgi_app.app) as client:
+        yield client
+
+
+def test_native_status_route(client, app_module):
+    response = client.get('/accident_status')
+
+    assert response.status_code == 200
+    assert response.json() == app_module.accident_status_snapshot()
+
+
+def test_native_poll_returns_published_events(client, app_module):
+    after = app_module.event_bus.last_id
+    app_module.event_bus.publish('accident', severity=3, source='cam', incident_id=99)
+
+    body = client.get('/events/poll', params={'after': after, 'timeout': 0}).json()
+
+    assert [event['incident_id'] for event in body['events']] == [99]
+    assert body['last_id'] == app_module.event_bus.last_id
+    assert client.get('/events/poll', params={'timeout': 'soon'}).status_code == 400
+
+
+def test_native_video_feed_reports_a_failed_model(client, app_module, monkeypatch):
+    monkeypatch.setitem(app_module.model_status, 'state', 'failed')
+
+    response = client.get('/video_feed', params={'fps': 'nan', 'width': '1'})
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('multipart/x-mixed-replace')
+    assert response.content.startswith(b'--frame\r\nContent-Type: image/jpeg')
+
+
+def test_other_routes_fall_through_to_flask(client):
+    assert client.get('/health').json() == {'status': 'ok'}
+    assert client.get('/logs', params={'limit': 5}).status_code == 200
+    assert client.get('/logs', params={'before': 'nan'}).status_code == 400
+    assert client.get('/stats').json()['accident_count'] >= 0
+    assert client.get('/no-such-route').status_code == 404
+
+
+def test_upload_goes_through_the_flask_view(client, app_module, tmp_path, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path))
+
+    response = client.post('/upload_video', files={'video': ('clip 1.mp4', io.BytesIO(b'not really a video'))})
+
+    assert response.json() == {'filename': 'clip_1.mp4'}
+    assert (tmp_path / 'clip_1.mp4').read_bytes() == b'not really a video'
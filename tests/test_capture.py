@@ -0,0 +1,100 @@
+import threading
+import time
+
+import numpy as np
+
+import capture
+from capture import FrameGrabber
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in yielding numbered frames, optionally one at a time."""
+
+    def __init__(self, frames, fps=0.0, gate=None):
+        self.frames = [np.full((4, 4, 3), i, dtype=np.uint8) for i in range(frames)]
+        self.fps = fps
+        self.gate = gate
+        self.released = False
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        return self.fps
+
+    def read(self):
+        if self.gate is not None:
+            self.gate.acquire()
+        if not self.frames:
+            return False, None
+        return True, self.frames.pop(0)
+
+    def release(self):
+        self.released = True
+
+
+def _grabber(monkeypatch, source, cap, **kwargs):
+    monkeypatch.setattr(capture, 'open_capture', lambda s: cap)
+    grabber = FrameGrabber(source, **kwargs)
+    assert grabber.start()
+    return grabber
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+
+def test_live_source_keeps_only_the_freshest_frames(monkeypatch):
+    cap = FakeCapture(5)
+    grabber = _grabber(monkeypatch, 'webcam', cap, queue_size=2)
+    _wait_until(lambda: cap.released)
+
+    ret, frame = grabber.read(timeout=1)
+
+    assert ret and frame[0, 0, 0] == 4
+    stats = grabber.stats()
+    assert stats['live'] and stats['drop_oldest']
+    assert stats['frames_read'] == 5
+    # 3 pushed out of the 2-frame queue, 1 skipped by read() taking the newest
+    assert stats['frames_dropped'] == 4
+    assert grabber.read(timeout=1) == (False, None)
+    assert not grabber.isOpened()
+
+
+def test_file_source_delivers_every_frame_in_order(monkeypatch):
+    cap = FakeCapture(40, fps=30.0)
+    grabber = _grabber(monkeypatch, 'clip.mp4', cap, queue_size=4)
+
+    frames = []
+    while True:
+        ret, frame = grabber.read(timeout=1)
+        if not ret:
+            break
+        frames.append(int(frame[0, 0, 0]))
+
+    assert frames == list(range(40))
+    assert grabber.stats()['frames_dropped'] == 0
+    assert grabber.fps == 30.0
+
+
+def test_missing_fps_falls_back_to_the_default(monkeypatch):
+    grabber = _grabber(monkeypatch, 'clip.mp4', FakeCapture(1))
+
+    assert grabber.fps == capture.DEFAULT_FPS
+    grabber.stop()
+
+
+def test_stop_unblocks_a_waiting_reader(monkeypatch):
+    gate = threading.Semaphore(0)
+    grabber = _grabber(monkeypatch, 'rtsp://cam', FakeCapture(3, gate=gate))
+
+    assert grabber.read(timeout=0.05) == (False, None)
+    # the capture answers shortly after stop() was requested
+    threading.Timer(0.05, gate.release).start()
+    grabber.stop()
+
+    assert grabber.read(timeout=1) == (False, None)
+    assert not grabber.isOpened()
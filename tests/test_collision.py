@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from collision import (BROAD_PHASE_MIN_BOXES, _loop_collisions, _random_scene, collision_severity,
+                       find_collisions, pairwise_overlap, sweep_and_prune)
+
+
+def _pairs(collisions):
+    return [(i, j) for i, j, _, _ in collisions]
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 10, BROAD_PHASE_MIN_BOXES, 300])
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_dense_and_sweep_match_the_nested_loop(n, seed):
+    scene = _random_scene(max(n, 2), np.random.default_rng(seed))[:n]
+    expected = _loop_collisions(scene)
+
+    dense = find_collisions(scene, broad_phase='dense')
+    sweep = find_collisions(scene, broad_phase='sweep')
+
+    assert _pairs(dense) == expected
+    assert _pairs(sweep) == expected
+    assert _pairs(find_collisions(scene)) == expected
+    assert np.allclose([c[2:] for c in dense], [c[2:] for c in sweep])
+
+
+@pytest.mark.parametrize('threshold, min_area', [(0.0, 0), (0.3, 100), (0.9, 8000)])
+def test_equivalence_holds_for_other_thresholds(threshold, min_area):
+    scene = _random_scene(200, np.random.default_rng(7))
+    expected = _loop_collisions(scene, threshold, min_area)
+
+    for broad_phase in ('dense', 'sweep'):
+        assert _pairs(find_collisions(scene, threshold, min_area, broad_phase=broad_phase)) == expected
+
+
+def test_sweep_emits_exactly_the_intersecting_pairs():
+    scene = _random_scene(150, np.random.default_rng(3))
+    inter_area, _ = pairwise_overlap(scene)
+    expected = [(i, j) for i, j in zip(*np.nonzero(np.triu(inter_area > 0, k=1)))]
+
+    first, second = sweep_and_prune(scene)
+
+    assert list(zip(first.tolist(), second.tolist())) == expected
+
+
+def test_touching_and_degenerate_boxes():
+    boxes = [
+        (0, 0, 100, 100, 2),
+        (100, 0, 200, 100, 2),    # shares an edge only
+        (0, 0, 100, 100, 2),      # identical to the first
+        (50, 50, 50, 150, 2),     # zero width
+        (0, 0, 100, 100, 0),      # not a vehicle
+    ]
+    for broad_phase in ('dense', 'sweep'):
+        assert _pairs(find_collisions(boxes, 0.8, 5000, broad_phase=broad_phase)) == [(0, 2)]
+        assert _pairs(find_collisions(boxes, 0.0, 0, broad_phase=broad_phase)) == [(0, 2)]
+
+
+def test_reported_overlap_values():
+    (i, j, iou, inter_area), = find_collisions([(0, 0, 100, 100, 2), (0, 5, 100, 105, 7)])
+
+    assert (i, j) == (0, 1)
+    assert inter_area == 9500
+    assert iou == pytest.approx(9500 / 10500)
+    assert collision_severity(iou) == 5
@@ -0,0 +1,247 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytest
+
+import database
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'accidents.db'))
+    yield db
+    db.close()
+
+
+def _record_batches(db, monkeypatch, hold=None):
+    batches = []
+    insert = db._insert_rows
+
+    def recording_insert(rows):
+        batches.append(len(rows))
+        if hold is not None and len(batches) == 1:
+            hold.wait(5)
+        insert(rows)
+
+    monkeypatch.setattr(db, '_insert_rows', recording_insert)
+    return batches
+
+
+def test_writer_batches_rows_queued_during_a_commit(db, monkeypatch):
+    db.batch_size = 3
+    hold = threading.Event()
+    batches = _record_batches(db, monkeypatch, hold)
+
+    db.log_accident(severity=1)
+    while not batches:
+        pass
+    for _ in range(5):
+        db.log_accident(severity=2)
+    hold.set()
+    db.flush()
+
+    assert batches == [1, 3, 2]
+    assert db.get_accident_count() == 6
+    assert dict(db.get_severity_counts()) == {1: 1, 2: 5}
+
+
+def test_close_commits_queued_rows(tmp_path):
+    path = str(tmp_path / 'accidents.db')
+    db = Database(path)
+    for severity in (1, 2, 3):
+        db.log_accident(severity=severity, description=f'sev {severity}')
+    db.close()
+    db.close()
+
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT COUNT(*) FROM accidents').fetchone()[0] == 3
+    conn.close()
+
+
+def test_log_after_close_writes_directly(tmp_path):
+    path = str(tmp_path / 'accidents.db')
+    db = Database(path)
+    db.close()
+    db.log_accident(severity=2)
+
+    reopened = Database(path)
+    try:
+        assert reopened.get_accident_count() == 1
+    finally:
+        reopened.close()
+
+
+def _fail_first(db, monkeypatch, failures):
+    calls = []
+    insert = db._insert_rows
+
+    def flaky_insert(rows):
+        calls.append(len(rows))
+        if len(calls) <= failures:
+            raise sqlite3.OperationalError('disk I/O error')
+        insert(rows)
+
+    monkeypatch.setattr(database.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(db, '_insert_rows', flaky_insert)
+    return calls
+
+
+def test_rows_that_keep_failing_are_retried_later(db, monkeypatch):
+    monkeypatch.setattr(database, 'PENDING_RETRY_INTERVAL', 0.01)
+    calls = _fail_first(db, monkeypatch, database.WRITE_RETRIES)
+
+    db.log_accident(severity=3)
+    db.flush()
+    db.close()
+
+    assert len(calls) == database.WRITE_RETRIES + 1
+    reopened = Database(db.db_name)
+    try:
+        assert reopened.get_accident_count() == 1
+    finally:
+        reopened.close()
+
+
+def test_rows_unwritten_at_close_are_replayed_on_reopen(db, monkeypatch):
+    monkeypatch.setattr(database, 'PENDING_RETRY_INTERVAL', 60)
+    _fail_first(db, monkeypatch, 2 * database.WRITE_RETRIES)
+
+    db.log_accident(severity=2, description='kept')
+    db.close()
+
+    reopened = Database(db.db_name)
+    try:
+        reopened.flush()
+        assert [row[5] for row in reopened.get_logs()] == ['kept']
+    finally:
+        reopened.close()
+
+
+def test_writer_survives_unexpected_errors(db, monkeypatch):
+    insert = db._insert_rows
+    failed = []
+
+    def broken_once(rows):
+        if not failed:
+            failed.append(rows)
+            raise RuntimeError('unexpected')
+        insert(rows)
+
+    monkeypatch.setattr(db, '_insert_rows', broken_once)
+    db.log_accident(severity=1)
+    db.flush()
+    db.log_accident(severity=1)
+    db.flush()
+
+    assert db._writer.is_alive()
+    assert db.get_accident_count() == 2
+
+
+def _insert(db, *rows):
+    """rows: (ts, severity) pairs, written synchronously."""
+    db._insert_rows([('2024-01-01 00:00:00', 0.0, 0.0, severity, f'at {ts}', ts) for ts, severity in rows])
+
+
+def test_keyset_pages_cover_every_row_once(db):
+    # repeated timestamps: the id breaks ties
+    _insert(db, *[(1000.0 + i // 3, 1 + i % 3) for i in range(20)])
+
+    seen, before = [], None
+    while True:
+        page = db.get_logs(before=before, limit=6)
+        seen.extend(page)
+        if len(page) < 6:
+            break
+        before = (page[-1][-1], page[-1][0])
+
+    assert [row[0] for row in seen] == [row[0] for row in db.get_logs()]
+    assert len({row[0] for row in seen}) == 20
+    keys = [(row[-1], row[0]) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_get_logs_filters(db):
+    _insert(db, (100.0, 1), (200.0, 2), (300.0, 3), (400.0, 2))
+
+    assert [row[-1] for row in db.get_logs(since=200.0, until=400.0)] == [300.0, 200.0]
+    assert [row[-1] for row in db.get_logs(severity=2)] == [400.0, 200.0]
+    assert [row[-1] for row in db.get_logs(min_severity=2, before=400.0)] == [300.0, 200.0]
+
+
+def test_rows_without_ts_are_backfilled_in_id_order(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE accidents (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT, '
+                 'latitude REAL, longitude REAL, severity INTEGER, description TEXT)')
+    conn.executemany('INSERT INTO accidents (timestamp, severity, description) VALUES (?, 1, ?)',
+                     [('2024-01-01 10:00:00', 'a'), ('garbage', 'b'), ('2024-01-01 11:00:00', 'c')])
+    conn.commit()
+    conn.close()
+
+    db = Database(path)
+    try:
+        rows = db.get_logs()
+        assert all(row[-1] is not None for row in rows)
+        assert [row[5] for row in rows] == ['c', 'b', 'a']
+        assert [row[5] for row in db.get_logs(before=(rows[1][-1], rows[1][0]))] == ['a']
+    finally:
+        db.close()
+
+
+def _raw_counts(path):
+    """Rollup-shaped counts computed straight from the accidents rows."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute('SELECT COALESCE(severity, 0), ts FROM accidents').fetchall()
+    conn.close()
+    by_severity, hourly = {}, {}
+    for severity, ts in rows:
+        by_severity[severity] = by_severity.get(severity, 0) + 1
+        bucket = datetime.fromtimestamp(ts).strftime(database.ROLLUP_BUCKETS['hour'])
+        hourly[bucket] = hourly.get(bucket, 0) + 1
+    return by_severity, hourly
+
+
+def _rollup_counts(db):
+    return dict(db.get_severity_counts()), dict(db.get_bucket_counts('hour', limit=1000))
+
+
+def test_rollups_match_the_rows_after_inserts(db):
+    _insert(db, *[(1_700_000_000.0 + 1234.5 * i, i % 4) for i in range(50)])
+    _insert(db, (1_700_000_000.0, 5), (1_700_003_600.0, 5))
+
+    assert _rollup_counts(db) == _raw_counts(db.db_name)
+    assert db.get_accident_count() == 52
+
+
+def test_rollups_are_backfilled_once_from_existing_rows(tmp_path):
+    path = str(tmp_path / 'history.db')
+    db = Database(path)
+    _insert(db, *[(1_700_000_000.0 + 977.0 * i, 1 + i % 3) for i in range(40)])
+    db.close()
+
+    # a database from before the rollups table
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE accident_rollups')
+    conn.commit()
+    conn.close()
+
+    for _ in range(2):
+        db = Database(path)
+        try:
+            assert _rollup_counts(db) == _raw_counts(path)
+            assert db.get_accident_count() == 40
+        finally:
+            db.close()
+
+
+def test_close_unregisters_the_exit_hook(tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(database.atexit, 'register', hooks.append)
+    monkeypatch.setattr(database.atexit, 'unregister', hooks.remove)
+
+    db = Database(str(tmp_path / 'accidents.db'))
+    assert hooks == [db.close]
+    db.close()
+    assert hooks == []
@@ -0,0 +1,191 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from alerts import Alerts
+from dispatcher import AlertDispatcher
+
+
+class TwilioStub(ThreadingHTTPServer):
+    """Answers SMS posts with the queued status codes, then 201."""
+
+    def __init__(self, statuses=()):
+        super().__init__(('127.0.0.1', 0), _StubHandler)
+        self.statuses = list(statuses)
+        self.requests = []   # (monotonic time, status, message body, client port)
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_port}/stub'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive, as the real API
+
+    def do_POST(self):
+        fields = parse_qs(self.rfile.read(int(self.headers['Content-Length'])).decode())
+        with self.server.lock:
+            status = self.server.statuses.pop(0) if self.server.statuses else 201
+            self.server.requests.append((time.monotonic(), status, fields['Body'][0], self.client_address[1]))
+        body = b'{"sid": "SM0"}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def twilio_env(monkeypatch):
+    for name, value in (('TWILIO_SID', 'AC0'), ('TWILIO_TOKEN', 'token'),
+                        ('TWILIO_FROM', '+10000000000'), ('TWILIO_TO', '+10000000001')):
+        monkeypatch.setenv(name, value)
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(statuses=()):
+        server = TwilioStub(statuses)
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_dispatcher(twilio_env):
+    dispatchers = []
+
+    def make(server, **options):
+        options.setdefault('workers', 1)
+        options.setdefault('siren', False)
+        dispatcher = AlertDispatcher(Alerts(api_base=server.url), **options)
+        dispatchers.append(dispatcher)
+        return dispatcher
+
+    yield make
+    for dispatcher in dispatchers:
+        dispatcher.close()
+
+
+def test_retries_with_backoff_on_one_keep_alive_connection(stub, make_dispatcher):
+    server = stub([503, 503])
+    dispatcher = make_dispatcher(server, backoff=0.05)
+
+    for source in ('cam1', 'cam2', 'cam3'):
+        assert dispatcher.submit(source, 2)
+    dispatcher.flush()
+
+    stats = dispatcher.stats()
+    assert [status for _, status, _, _ in server.requests] == [503, 503, 201, 201, 201]
+    assert stats['sms_retries'] == 2
+    assert stats['sms_sent'] == 3
+    assert stats['sms_failed'] == 0
+    assert stats['delivered'] == 3
+    assert 'HTTP 503' in stats['last_error']
+    # backoff doubles: 0.05 s before the first retry, 0.1 s before the second
+    times = [t for t, _, _, _ in server.requests]
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 0.1
+    # one connection for every message and retry
+    assert stats['connections_opened'] == 1
+    assert len({port for _, _, _, port in server.requests}) == 1
+
+
+def test_permanent_rejection_is_not_retried(stub, make_dispatcher):
+    server = stub([400])
+    dispatcher = make_dispatcher(server, backoff=0.05)
+
+    dispatcher.submit('cam1', 3)
+    dispatcher.flush()
+
+    stats = dispatcher.stats()
+    assert len(server.requests) == 1
+    assert stats['sms_retries'] == 0
+    assert stats['sms_failed'] == 1
+
+
+def test_exhausted_retries_count_as_failed(stub, make_dispatcher):
+    server = stub([503] * 10)
+    dispatcher = make_dispatcher(server, retries=2, backoff=0.01)
+
+    dispatcher.submit('cam1', 3)
+    dispatcher.flush()
+
+    stats = dispatcher.stats()
+    assert len(server.requests) == 3
+    assert stats['sms_retries'] == 2
+    assert stats['sms_failed'] == 1
+    assert stats['sms_sent'] == 0
+
+
+def test_cooldown_drops_repeats_but_lets_escalations_through(stub, make_dispatcher):
+    server = stub()
+    dispatcher = make_dispatcher(server, cooldown=60)
+
+    results = [dispatcher.submit('cam1', 2) for _ in range(5)]
+    results.append(dispatcher.submit('cam1', 4))   # escalation
+    results.append(dispatcher.submit('cam1', 3))   # below the escalated severity
+    results.append(dispatcher.submit('cam2', 1))   # other cameras are independent
+    dispatcher.flush()
+
+    assert results == [True, False, False, False, False, True, False, True]
+    stats = dispatcher.stats()
+    assert stats['submitted'] == 8
+    assert stats['deduplicated'] == 5
+    assert [body for _, _, body, _ in server.requests] == [
+        'Accident detected by Rakshak AI! Severity 2 at cam1',
+        'Accident detected by Rakshak AI! Severity 4 at cam1',
+        'Accident detected by Rakshak AI! Severity 1 at cam2',
+    ]
+
+
+def test_cooldown_expires(stub, make_dispatcher):
+    server = stub()
+    dispatcher = make_dispatcher(server, cooldown=0.1)
+
+    assert dispatcher.submit('cam1', 2)
+    assert not dispatcher.submit('cam1', 2)
+    time.sleep(0.15)
+    assert dispatcher.submit('cam1', 2)
+    dispatcher.flush()
+
+    assert len(server.requests) == 2
+
+
+def test_alert_dropped_on_a_full_queue_does_not_start_a_cooldown(stub, make_dispatcher):
+    server = stub()
+    dispatcher = make_dispatcher(server, queue_size=1, cooldown=60, siren=True)
+    release = threading.Event()
+    playing = threading.Event()
+
+    def siren():
+        playing.set()
+        release.wait(5)
+
+    dispatcher.alerts.play_siren = siren
+    assert dispatcher.submit('cam1', 2)
+    assert playing.wait(2)              # the worker is busy with cam1
+    assert dispatcher.submit('cam2', 2)  # fills the queue
+    assert not dispatcher.submit('cam3', 2)
+    assert dispatcher.stats()['dropped'] == 1
+
+    release.set()
+    dispatcher.flush()
+    # cam3 was never sent, so it is not muted
+    assert dispatcher.submit('cam3', 2)
+    dispatcher.flush()
+    assert dispatcher.stats()['delivered'] == 3
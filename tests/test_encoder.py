@@ -0,0 +1,29 @@
+import pytest
+
+from encoder import MAX_TARGET_FPS, MIN_TARGET_FPS, TARGET_FPS, EncodePool, viewer_options
+
+
+@pytest.mark.parametrize('width, fps, expected', [
+    (None, None, (None, TARGET_FPS)),
+    ('', '', (None, TARGET_FPS)),
+    ('640', '10', (640, 10.0)),
+    ('10', '0.2', (64, MIN_TARGET_FPS)),
+    ('wide', 'fast', (None, TARGET_FPS)),
+    (None, '0', (None, TARGET_FPS)),
+    (None, '-5', (None, TARGET_FPS)),
+    (None, 'nan', (None, TARGET_FPS)),
+    (None, 'inf', (None, TARGET_FPS)),
+    (None, '-inf', (None, TARGET_FPS)),
+    (None, '1e9', (None, MAX_TARGET_FPS)),
+])
+def test_viewer_options(width, fps, expected):
+    assert viewer_options(width, fps) == expected
+
+
+def test_shutdown_refuses_new_encodes_and_can_repeat():
+    pool = EncodePool(workers=1)
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError):
+        pool.submit(None, None, 80)
+    pool.shutdown()
@@ -0,0 +1,67 @@
+import threading
+
+from events import EventBus, format_sse
+
+
+def _publish(bus, count):
+    return [bus.publish('accident', severity=1 + i % 5, source=f'cam{i}')['id'] for i in range(count)]
+
+
+def test_buffer_keeps_the_newest_events_when_it_wraps():
+    bus = EventBus(capacity=3)
+    _publish(bus, 5)
+
+    events, missed = bus.since(2)
+    assert [event['id'] for event in events] == [3, 4, 5]
+    assert not missed
+
+    # ids 2 and earlier were overwritten
+    events, missed = bus.since(1)
+    assert [event['id'] for event in events] == [3, 4, 5]
+    assert missed
+
+    assert [event['id'] for event in bus.since(4)[0]] == [5]
+    assert bus.since(5) == ([], False)
+
+
+def test_id_from_before_a_restart_replays_the_buffer():
+    bus = EventBus(capacity=3)
+    _publish(bus, 2)
+
+    events, missed = bus.since(40)
+    assert [event['id'] for event in events] == [1, 2]
+    assert missed
+
+
+def test_wait_wakes_on_publish():
+    bus = EventBus()
+    threading.Timer(0.05, bus.publish, args=('clear',)).start()
+
+    events, missed = bus.wait(bus.last_id, timeout=5)
+
+    assert [event['type'] for event in events] == ['clear']
+    assert not missed
+    assert bus.wait(bus.last_id, timeout=0) == ([], False)
+
+
+def test_last_event_id_replays_missed_events(app_module):
+    client = app_module.app.test_client()
+    bus = app_module.event_bus
+    seen = bus.last_id
+    ids = _publish(bus, 3)
+
+    response = client.get('/events', headers={'Last-Event-ID': str(seen + 1)})
+    try:
+        body = ''
+        for chunk in response.iter_encoded():
+            body += chunk.decode()
+            if f'id: {ids[-1]}\n' in body:
+                break
+    finally:
+        response.close()
+
+    assert body.startswith('retry: 3000\n\n')
+    assert 'event: status\n' in body
+    replayed = [line for line in body.split('\n') if line.startswith('id: ')]
+    assert replayed == [f'id: {ids[1]}', f'id: {ids[2]}']
+    assert format_sse(bus.since(ids[1])[0][0]) in body
@@ -0,0 +1,145 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from encoder import EncodePool, FrameTicket
+from hub import BroadcastHub, StreamEnd
+
+
+class FakeDetector:
+    """Stands in for CarDetector: yields blank frames, optionally a fixed number."""
+
+    def __init__(self, frames=None, interval=0.005):
+        self.frames = frames
+        self.interval = interval
+        self.closed = threading.Event()
+
+    def process_video(self, source, annotate=True):
+        try:
+            i = 0
+            while self.frames is None or i < self.frames:
+                time.sleep(self.interval)
+                yield np.full((48, 64, 3), i % 256, dtype=np.uint8), 1, False, 0
+                i += 1
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def encode_pool():
+    pool = EncodePool(workers=2)
+    yield pool
+    pool.shutdown()
+
+
+def _hub(encode_pool, frames=None, **kwargs):
+    detectors, results = [], []
+
+    def factory():
+        detectors.append(FakeDetector(frames))
+        return detectors[-1]
+
+    hub = BroadcastHub(factory, encode_pool, on_result=lambda *result: results.append(result), **kwargs)
+    return hub, detectors, results
+
+
+def _next_ticket(subscription):
+    item = subscription.get(timeout=2.0)
+    assert isinstance(item, FrameTicket)
+    return item
+
+
+def _wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_viewers_of_one_source_share_a_pipeline(encode_pool):
+    hub, detectors, _ = _hub(encode_pool)
+    viewers = [hub.subscribe('cam') for _ in range(3)]
+    other = hub.subscribe('other')
+
+    tickets = [_next_ticket(viewer) for viewer in viewers]
+    _next_ticket(other)
+
+    assert len(detectors) == 2
+    assert set(hub.stats()) == {'cam', 'other'}
+    assert hub.stats()['cam']['subscribers'] == 3
+    # the same encode is handed to every viewer on the same level
+    jpeg = tickets[0].jpeg(viewers[0].level)
+    assert jpeg[:2] == b'\xff\xd8'
+    for viewer in viewers + [other]:
+        viewer.close()
+
+
+def test_each_frame_reaches_on_result_once_and_every_viewer(encode_pool):
+    hub, detectors, results = _hub(encode_pool, frames=20)
+    viewers = [hub.subscribe('cam', queue_size=100) for _ in range(4)]
+
+    for viewer in viewers:
+        items = []
+        while not items or not isinstance(items[-1], StreamEnd):
+            items.append(viewer.get(timeout=2.0))
+        assert sum(isinstance(item, FrameTicket) for item in items) == 20
+    assert [source for source, *_ in results] == ['cam'] * 20
+    assert len(detectors) == 1
+
+
+def test_idle_pipeline_is_retired_and_restarted_on_demand(encode_pool):
+    hub, detectors, _ = _hub(encode_pool, idle_timeout=0.05)
+    viewer = hub.subscribe('cam')
+    _next_ticket(viewer)
+    viewer.close()
+
+    assert detectors[0].closed.wait(2.0)
+    _wait_until(lambda: hub.stats() == {})
+
+    viewer = hub.subscribe('cam')
+    _next_ticket(viewer)
+    assert len(detectors) == 2
+    viewer.close()
+
+
+def test_viewer_returning_within_idle_timeout_keeps_the_pipeline(encode_pool):
+    hub, detectors, _ = _hub(encode_pool, idle_timeout=5.0)
+    viewer = hub.subscribe('cam')
+    _next_ticket(viewer)
+    viewer.close()
+
+    viewer = hub.subscribe('cam')
+    _next_ticket(viewer)
+
+    assert len(detectors) == 1
+    assert not detectors[0].closed.is_set()
+    viewer.close()
+
+
+def test_slow_viewer_drops_frames_without_holding_back_others(encode_pool):
+    hub, _, _ = _hub(encode_pool, frames=30)
+    slow = hub.subscribe('cam', queue_size=2)
+    fast = hub.subscribe('cam', queue_size=100)
+
+    delivered = 0
+    while not isinstance(fast.get(timeout=2.0), StreamEnd):
+        delivered += 1
+
+    assert delivered == 30
+    assert slow.frames_dropped > 0
+    slow.close()
+
+
+def test_failing_pipeline_ends_every_viewer_with_an_error(encode_pool):
+    def broken_factory():
+        raise RuntimeError('camera unplugged')
+
+    hub = BroadcastHub(broken_factory, encode_pool)
+    viewer = hub.subscribe('cam')
+
+    item = viewer.get(timeout=2.0)
+    assert isinstance(item, StreamEnd)
+    assert item.error == 'camera unplugged'
+    _wait_until(lambda: hub.stats() == {})
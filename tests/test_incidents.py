@@ -0,0 +1,97 @@
+import pytest
+
+from incidents import CANDIDATE, CONFIRMED, ONGOING, RESOLVED, IncidentManager
+
+
+@pytest.fixture
+def manager():
+    transitions = []
+    manager = IncidentManager(
+        on_transition=lambda incident, old, new, escalated: transitions.append((incident.source, old, new, escalated)),
+        confirm_frames=2, candidate_window=2.0, resolve_after=5.0)
+    manager.transitions = transitions
+    return manager
+
+
+def test_candidate_needs_a_second_flagged_frame(manager):
+    manager.update('cam', True, 2, now=100.0)
+    assert manager.status()['cam']['state'] == CANDIDATE
+    assert manager.transitions == []
+
+    manager.update('cam', True, 2, now=101.0)
+    assert manager.transitions == [('cam', CANDIDATE, CONFIRMED, False)]
+
+
+def test_unconfirmed_candidate_expires_silently(manager):
+    manager.update('cam', True, 2, now=100.0)
+    manager.update('cam', False, 0, now=102.5)
+
+    assert manager.status() == {}
+    # a flag after the window starts a new candidate instead of confirming
+    manager.update('cam', True, 2, now=103.0)
+    assert manager.status()['cam']['state'] == CANDIDATE
+    assert manager.transitions == []
+
+
+def test_full_lifecycle_reports_each_transition_once(manager):
+    for t in range(10):
+        manager.update('cam', True, 2, now=100.0 + t)
+    manager.update('cam', False, 0, now=112.0)
+
+    assert manager.transitions == [
+        ('cam', CANDIDATE, CONFIRMED, False),
+        ('cam', CONFIRMED, ONGOING, False),
+    ]
+    manager.sweep(now=114.0)
+    assert manager.transitions[-1] == ('cam', ONGOING, RESOLVED, False)
+    assert manager.status() == {}
+
+
+def test_severity_rise_is_an_escalation(manager):
+    manager.update('cam', True, 2, now=100.0)
+    manager.update('cam', True, 2, now=100.5)
+    manager.update('cam', True, 4, now=101.0)
+    manager.update('cam', True, 3, now=101.5)
+
+    assert manager.transitions == [
+        ('cam', CANDIDATE, CONFIRMED, False),
+        ('cam', CONFIRMED, ONGOING, False),
+        ('cam', ONGOING, ONGOING, True),
+    ]
+    assert manager.status()['cam']['severity'] == 4
+
+
+def test_sources_are_independent(manager):
+    manager.update('a', True, 1, now=100.0)
+    manager.update('b', True, 3, now=100.0)
+    manager.update('a', True, 1, now=101.0)
+
+    status = manager.status()
+    assert status['a']['state'] == CONFIRMED
+    assert status['b']['state'] == CANDIDATE
+    assert status['a']['incident_id'] != status['b']['incident_id']
+
+
+def test_new_incident_after_resolution(manager):
+    for now in (100.0, 101.0):
+        manager.update('cam', True, 2, now=now)
+    first = manager.status()['cam']['incident_id']
+    manager.sweep(now=106.0)
+    for now in (107.0, 108.0):
+        manager.update('cam', True, 2, now=now)
+
+    assert [t[1:3] for t in manager.transitions] == [
+        (CANDIDATE, CONFIRMED), (CONFIRMED, RESOLVED), (CANDIDATE, CONFIRMED)]
+    assert manager.status()['cam']['incident_id'] != first
+
+
+def test_failing_handler_does_not_break_tracking():
+    def handler(incident, old, new, escalated):
+        raise RuntimeError('handler bug')
+
+    manager = IncidentManager(on_transition=handler)
+    manager.update('cam', True, 2, now=100.0)
+    transitions = manager.update('cam', True, 2, now=100.5)
+
+    assert [t[2] for t in transitions] == [CONFIRMED]
+    assert manager.status()['cam']['state'] == CONFIRMED
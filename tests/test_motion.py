@@ -0,0 +1,65 @@
+import numpy as np
+
+from motion import MotionGate
+
+
+def _scene(shift=0, noise=None):
+    frame = np.full((240, 320, 3), 90, dtype=np.uint8)
+    frame[100:160, 40 + shift:120 + shift] = 230   # a vehicle
+    if noise is not None:
+        frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_first_frame_opens_the_gate():
+    gate = MotionGate()
+
+    assert gate.should_infer(_scene())
+    assert gate.last_changed_ratio == 1.0
+
+
+def test_static_scene_is_skipped_until_stale():
+    gate = MotionGate(max_stale_frames=4)
+    gate.should_infer(_scene())
+
+    decisions = [gate.should_infer(_scene()) for _ in range(10)]
+
+    assert decisions == [False] * 4 + [True] + [False] * 4 + [True]
+    assert gate.stats()['frames_skipped'] == 8
+
+
+def test_sensor_noise_does_not_open_the_gate():
+    gate = MotionGate()
+    gate.should_infer(_scene())
+    rng = np.random.default_rng(0)
+
+    assert not gate.should_infer(_scene(noise=rng.integers(-6, 7, (240, 320, 3))))
+
+
+def test_moving_vehicle_opens_the_gate():
+    gate = MotionGate()
+    gate.should_infer(_scene())
+
+    assert gate.should_infer(_scene(shift=30))
+    assert gate.last_changed_ratio >= gate.min_changed_ratio
+
+
+def test_slow_motion_accumulates_against_the_last_inferred_frame():
+    gate = MotionGate(min_changed_ratio=0.02, max_stale_frames=100)
+    gate.should_infer(_scene())
+
+    decisions = [gate.should_infer(_scene(shift=s)) for s in range(1, 15)]
+
+    # 1 px steps are too small on their own, but drift past the threshold
+    assert decisions[0] is False
+    assert True in decisions
+
+
+def test_resolution_change_and_reset_open_the_gate():
+    gate = MotionGate()
+    gate.should_infer(_scene())
+
+    assert gate.should_infer(np.full((480, 640, 3), 90, dtype=np.uint8))
+    gate.reset()
+    assert gate.should_infer(np.full((480, 640, 3), 90, dtype=np.uint8))
+    assert gate.stats()['frames_seen'] == 1
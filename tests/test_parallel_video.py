@@ -0,0 +1,136 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import model_logic
+import parallel_video
+from parallel_video import _seek, analyze_video_parallel, split_frame_ranges
+
+FRAMES = 40
+# the frame index is painted into every frame as a grey level
+LEVEL_STEP = 5
+
+# frames on which the two cars overlap; both runs straddle a segment boundary
+OVERLAP_FRAMES = set(range(8, 13)) | set(range(19, 22))
+
+
+def _frame_index(frame):
+    return int(round(frame[:, :, 0].mean() / LEVEL_STEP))
+
+
+@pytest.fixture
+def clip(tmp_path):
+    path = str(tmp_path / 'clip.avi')
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (160, 120))
+    for index in range(FRAMES):
+        out.write(np.full((120, 160, 3), index * LEVEL_STEP, dtype=np.uint8))
+    out.release()
+    return path
+
+
+@pytest.fixture
+def fake_detector(monkeypatch):
+    """Scripted detections keyed on the frame index painted into each frame."""
+    def detect_vehicles_batch(frames, batch_size=8, annotate=True, preprocessor=None, roi=None, imgsz=None,
+                              tiler=None):
+        outputs = []
+        for frame in frames:
+            index = _frame_index(frame)
+            second = (110, 100, 310, 200, 2) if index in OVERLAP_FRAMES else (110, 400, 310, 500, 2)
+            boxes = [(100, 100, 300, 200, 2), second]
+            outputs.append((frame if annotate else None, len(boxes), boxes))
+        return outputs
+
+    monkeypatch.setattr(model_logic, 'detect_vehicles_batch', detect_vehicles_batch)
+
+
+class _InlinePool:
+    """Runs the pool's tasks in this process, completing them in reverse order."""
+
+    def __init__(self, processes, initializer=None, initargs=()):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def imap_unordered(self, func, tasks):
+        return [func(task) for task in reversed(list(tasks))]
+
+
+class _InlineContext:
+    Pool = _InlinePool
+
+
+def test_split_frame_ranges_covers_every_frame():
+    ranges = split_frame_ranges(10, 3)
+    assert ranges == [(0, 4), (4, 8), (8, None)]
+
+
+def test_split_frame_ranges_never_exceeds_the_frame_count():
+    assert split_frame_ranges(2, 8) == [(0, 1), (1, None)]
+    # an unknown frame count still gives one range that reads to the end
+    assert split_frame_ranges(0, 4) == [(0, None)]
+
+
+def test_seek_lands_on_the_requested_frame(clip):
+    cap = cv2.VideoCapture(clip)
+    try:
+        for index in (17, 3, 0, 39):
+            assert _seek(cap, index)
+            ret, frame = cap.read()
+            assert ret and _frame_index(frame) == index
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    finally:
+        cap.release()
+
+
+def test_seek_completes_an_inexact_seek_by_decoding_forward():
+    class KeyframeCapture:
+        """Seeks land on the keyframe before the target (every 10th frame)."""
+
+        def __init__(self):
+            self.position = 0
+
+        def set(self, prop, value):
+            self.position = int(value) // 10 * 10
+
+        def get(self, prop):
+            return self.position
+
+        def grab(self):
+            self.position += 1
+            return self.position <= FRAMES
+
+    cap = KeyframeCapture()
+    assert _seek(cap, 27)
+    assert cap.position == 27
+    assert not _seek(cap, FRAMES + 5)
+
+
+def test_parallel_analysis_matches_the_serial_pass(clip, fake_detector, monkeypatch):
+    cap = cv2.VideoCapture(clip)
+    serial = list(model_logic.analyze_video_batches(cap, batch_size=4))
+    cap.release()
+    serial_accidents = [index + 1 for index, (_, _, flag, _) in enumerate(serial) if flag]
+    # each overlap is confirmed on its third frame, one of them after a boundary
+    assert serial_accidents == [11, 22]
+
+    monkeypatch.setattr(parallel_video.multiprocessing, 'get_context', lambda method: _InlineContext)
+    result = analyze_video_parallel(clip, workers=2, segments=4)
+    try:
+        assert result['total_frames'] == FRAMES
+        assert [a['frame'] for a in result['accident_frames']] == serial_accidents
+        assert result['max_vehicle_count'] == 2
+        assert result['fps'] == 10
+
+        merged = cv2.VideoCapture(result['output_video'])
+        merged_frames = int(merged.get(cv2.CAP_PROP_FRAME_COUNT))
+        merged.release()
+        assert merged_frames == FRAMES
+    finally:
+        os.unlink(result['output_video'])
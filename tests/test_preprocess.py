@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from preprocess import PAD_VALUE, Preprocessor
+
+
+def _to_letterbox(preprocessor, boxes):
+    left, top = preprocessor.offset
+    scale = preprocessor.scale
+    return [(x1 * scale + left, y1 * scale + top, x2 * scale + left, y2 * scale + top, cls)
+            for x1, y1, x2, y2, cls in boxes]
+
+
+@pytest.mark.parametrize('frame_shape', [(720, 1280, 3), (1280, 720, 3), (481, 643, 3), (640, 640, 3)])
+def test_restore_boxes_round_trips_non_square_frames(frame_shape):
+    preprocessor = Preprocessor(640)
+    preprocessor._allocate(frame_shape, 1)
+    h, w = frame_shape[:2]
+    boxes = [(0.0, 0.0, w / 4, h / 3, 2), (w / 2, h / 2, float(w), float(h), 7)]
+
+    restored = preprocessor.restore_boxes(_to_letterbox(preprocessor, boxes))
+
+    assert np.allclose([b[:4] for b in restored], [b[:4] for b in boxes])
+    assert [b[4] for b in restored] == [2, 7]
+
+
+def test_letterbox_pads_only_to_the_stride():
+    preprocessor = Preprocessor(640)
+    preprocessor._allocate((720, 1280, 3), 1)
+
+    assert preprocessor.resized_size == (640, 360)
+    assert preprocessor._canvas.shape == (384, 640, 3)
+    assert preprocessor.offset == (0, 12)
+
+
+def test_restore_boxes_clips_to_the_frame():
+    preprocessor = Preprocessor(640)
+    preprocessor._allocate((720, 1280, 3), 1)
+
+    # boxes reaching into the letterbox padding
+    (x1, y1, x2, y2, _), = preprocessor.restore_boxes([(-5.0, 0.0, 650.0, 384.0, 2)])
+
+    assert (x1, y1, x2, y2) == (0.0, 0.0, 1280, 720)
+
+
+def test_imgsz_is_rounded_up_to_the_stride():
+    assert Preprocessor(600).imgsz == 608
+    assert Preprocessor(640).imgsz == 640
+
+
+def test_buffers_are_reused_and_reallocated_on_a_new_frame_size():
+    pytest.importorskip('torch')
+    preprocessor = Preprocessor(320)
+    wide = np.full((240, 320, 3), 200, dtype=np.uint8)
+
+    first = preprocessor.prepare([wide])
+    second = preprocessor.prepare([wide])
+    assert preprocessor.reallocations == 1
+    assert first.data_ptr() == second.data_ptr()
+    assert tuple(second.shape) == (1, 3, 256, 320)
+    # padding rows keep the letterbox colour
+    assert np.isclose(float(second[0, 0, 0, 0]), PAD_VALUE / 255.0)
+
+    tall = np.zeros((320, 160, 3), dtype=np.uint8)
+    third = preprocessor.prepare([tall])
+    assert preprocessor.reallocations == 2
+    assert tuple(third.shape) == (1, 3, 320, 160)
+    # restore_boxes follows the new geometry
+    (box,) = preprocessor.restore_boxes([(0.0, 0.0, 160.0, 320.0, 2)])
+    assert np.allclose(box[:4], (0, 0, 160, 320))
+
+    # back to the first size: a fresh allocation, not the tall buffers
+    fourth = preprocessor.prepare([wide, wide])
+    assert preprocessor.reallocations == 3
+    assert tuple(fourth.shape) == (2, 3, 256, 320)
+    (box,) = preprocessor.restore_boxes(_to_letterbox(preprocessor, [(10.0, 20.0, 300.0, 200.0, 2)]))
+    assert np.allclose(box[:4], (10, 20, 300, 200))
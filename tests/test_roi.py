@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from roi import RegionOfInterest, points_in_polygon
+
+CAR = 2
+
+
+def test_crop_is_a_view_of_the_bounding_rectangle():
+    frame = np.arange(480 * 640 * 3, dtype=np.uint32).reshape(480, 640, 3)
+    roi = RegionOfInterest([(100, 200), (500, 200), (600, 400), (50, 400)])
+
+    crop, offset = roi.crop(frame)
+
+    assert offset == (50, 200)
+    assert crop.shape == (200, 550, 3)
+    assert np.shares_memory(crop, frame)
+    assert (crop[0, 0] == frame[200, 50]).all()
+
+
+def test_to_frame_restores_coordinates_and_drops_boxes_outside_the_polygon():
+    roi = RegionOfInterest([(100, 200), (500, 200), (600, 400), (50, 400)])
+    frame_shape = (480, 640, 3)
+    roi.crop(np.zeros(frame_shape, dtype=np.uint8))
+
+    boxes = roi.to_frame([
+        (100, 50, 200, 150, CAR),  # centre (200, 300): inside
+        (0, 0, 20, 20, CAR),       # centre (60, 210): left of the slanted edge
+    ], frame_shape)
+
+    assert boxes == [(150, 250, 250, 350, CAR)]
+
+
+def test_normalized_polygon_scales_with_the_frame():
+    roi = RegionOfInterest([(0.25, 0.5), (0.75, 0.5), (0.75, 1.0), (0.25, 1.0)])
+
+    _, offset = roi.crop(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert offset == (160, 240)
+    crop, offset = roi.crop(np.zeros((720, 1280, 3), dtype=np.uint8))
+    assert offset == (320, 360)
+    assert crop.shape[:2] == (360, 640)
+
+
+def test_polygon_is_clipped_at_the_frame_edges():
+    roi = RegionOfInterest([(-50, -20), (700, -20), (700, 300), (-50, 300)])
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+
+    crop, offset = roi.crop(frame)
+
+    assert offset == (0, 0)
+    assert crop.shape == frame.shape
+    # a box in the frame corner is still inside the (larger) polygon
+    assert roi.to_frame([(0, 0, 10, 10, CAR)], frame.shape) == [(0, 0, 10, 10, CAR)]
+
+
+def test_polygon_entirely_outside_still_gives_a_non_empty_crop():
+    roi = RegionOfInterest([(400, 300), (500, 300), (500, 400)])
+    crop, offset = roi.crop(np.zeros((240, 320, 3), dtype=np.uint8))
+
+    assert offset == (319, 239)
+    assert crop.shape[:2] == (1, 1)
+
+
+def test_points_in_polygon():
+    square = [(0, 0), (10, 0), (10, 10), (0, 10)]
+    inside = points_in_polygon([(5, 5), (15, 5), (-1, -1), (9.9, 0.1)], square)
+    assert inside.tolist() == [True, False, False, True]
+
+
+def test_polygon_needs_three_points():
+    with pytest.raises(ValueError):
+        RegionOfInterest([(0, 0), (1, 1)])
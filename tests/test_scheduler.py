@@ -0,0 +1,51 @@
+from scheduler import StrideScheduler
+
+
+def _sampled(scheduler, frames):
+    return [i for i in range(frames) if scheduler.tick()]
+
+
+def test_first_frame_is_always_sampled():
+    assert StrideScheduler(idle_stride=6).tick()
+
+
+def test_stride_follows_vehicle_presence():
+    scheduler = StrideScheduler(idle_stride=6, active_stride=2, alert_hold=0)
+    scheduler.tick()
+
+    scheduler.observe(vehicle_count=0, overlap_candidate=False)
+    assert _sampled(scheduler, 12) == [5, 11]
+
+    scheduler.observe(vehicle_count=3, overlap_candidate=False)
+    assert _sampled(scheduler, 6) == [1, 3, 5]
+
+    scheduler.observe(vehicle_count=0, overlap_candidate=False)
+    assert scheduler.stats()['stride'] == 6
+
+
+def test_overlap_candidate_holds_stride_one():
+    scheduler = StrideScheduler(idle_stride=6, active_stride=2, alert_hold=5)
+    scheduler.tick()
+    scheduler.observe(vehicle_count=2, overlap_candidate=True)
+
+    # every frame while the hold lasts, even if the vehicles vanish
+    for _ in range(4):
+        assert scheduler.tick()
+        scheduler.observe(vehicle_count=0, overlap_candidate=False)
+        assert scheduler.stride == 1
+
+    assert scheduler.tick()
+    scheduler.observe(vehicle_count=0, overlap_candidate=False)
+    assert scheduler.stride == 6
+
+
+def test_counters_and_reset():
+    scheduler = StrideScheduler(idle_stride=3)
+    scheduler.tick()
+    scheduler.observe(0, False)
+    _sampled(scheduler, 9)
+
+    assert scheduler.stats() == {'stride': 3, 'frames_seen': 10, 'frames_sampled': 4}
+    scheduler.reset()
+    assert scheduler.stats() == {'stride': 1, 'frames_seen': 0, 'frames_sampled': 0}
+    assert scheduler.tick()
@@ -0,0 +1,69 @@
+import numpy as np
+
+from tiling import Tiler, nms, tile_rects
+
+CAR, TRUCK = 2, 7
+UHD = (2160, 3840, 3)
+
+
+def test_tiles_are_equal_and_edge_tiles_end_on_the_frame_border():
+    rects = tile_rects(UHD, grid=(2, 2), overlap=0.2)
+
+    assert rects == [(0, 0, 2134, 1200), (1706, 0, 3840, 1200),
+                     (0, 960, 2134, 2160), (1706, 960, 3840, 2160)]
+    assert len({(x2 - x1, y2 - y1) for x1, y1, x2, y2 in rects}) == 1
+
+
+def test_neighbouring_tiles_overlap_by_the_requested_fraction():
+    rects = tile_rects((1000, 1000, 3), grid=(3, 1), overlap=0.25)
+
+    assert rects == [(0, 0, 400, 1000), (300, 0, 700, 1000), (600, 0, 1000, 1000)]
+    for (_, _, left_end, _), (right_start, _, _, _) in zip(rects, rects[1:]):
+        assert left_end - right_start == 100
+
+
+def test_single_tile_covers_the_frame():
+    assert tile_rects((480, 640, 3), grid=(1, 1)) == [(0, 0, 640, 480)]
+
+
+def test_split_returns_views_at_the_tile_offsets():
+    frame = np.arange(2160 * 3840, dtype=np.uint32).reshape(2160, 3840)
+    tiler = Tiler(grid=(2, 2), overlap=0.2)
+
+    tiles = tiler.split(frame)
+
+    assert len(tiles) == 4
+    for tile, (x1, y1, x2, y2) in zip(tiles, tiler.rects(frame.shape)):
+        assert tile.shape == (y2 - y1, x2 - x1)
+        assert np.shares_memory(tile, frame)
+        assert tile[0, 0] == frame[y1, x1]
+
+
+def test_merge_shifts_boxes_into_frame_coordinates():
+    tiler = Tiler(grid=(2, 2), overlap=0.2)
+    detections = [([], []), ([], []), ([], []), ([(100, 50, 300, 150, CAR)], [0.9])]
+
+    assert tiler.merge(detections, UHD) == [(1806, 1010, 2006, 1110, CAR)]
+
+
+def test_merge_suppresses_duplicates_from_overlapping_tiles():
+    tiler = Tiler(grid=(2, 2), overlap=0.2)
+    # one car inside the overlap of the two top tiles, seen by both
+    detections = [
+        ([(1800, 500, 1950, 600, CAR)], [0.8]),
+        ([(96, 502, 246, 601, CAR), (1000, 100, 1100, 200, CAR)], [0.9, 0.7]),
+        ([], []),
+        ([], []),
+    ]
+
+    merged = tiler.merge(detections, UHD)
+
+    # the higher-confidence copy survives, the separate car is kept
+    assert merged == [(1802, 502, 1952, 601, CAR), (2706, 100, 2806, 200, CAR)]
+
+
+def test_nms_keeps_overlapping_boxes_of_different_classes():
+    boxes = [(0, 0, 100, 100, CAR), (2, 2, 102, 102, TRUCK), (1, 1, 101, 101, CAR)]
+
+    assert nms(boxes, [0.9, 0.8, 0.7]) == [0, 1]
+    assert nms([], []) == []
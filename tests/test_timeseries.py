@@ -0,0 +1,119 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from timeseries import FRAME_DTYPE, TimeSeriesStore
+
+DAY = 86400
+# a recent hour boundary: rotation applies retention against the real clock,
+# and aligned buckets are easy to predict
+T0 = float(time.time() // 3600 * 3600 - 6 * 3600)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(str(tmp_path / 'ts'), flush_frames=4)
+    yield store
+    store.close()
+
+
+def _fill(series, count, start=T0, step=1.0):
+    for i in range(count):
+        boxes = [(10 + i, 20, 110 + i, 120, 2)] * (i % 3)
+        series.append(start + i * step, i, len(boxes), boxes, accident=i == 5, severity=3 if i == 5 else 0,
+                      inferred=i % 2 == 0)
+
+
+def test_frames_and_boxes_round_trip(store):
+    series = store.open('cam one')
+    _fill(series, 10)
+    series.release()
+
+    frames = store.read_frames('cam one')
+    assert frames.dtype == FRAME_DTYPE
+    assert frames['frame'].tolist() == list(range(10))
+    assert frames['ts'].tolist() == [T0 + i for i in range(10)]
+    assert frames['vehicle_count'].tolist() == [i % 3 for i in range(10)]
+
+    replayed = list(store.replay('cam one', since=T0 + 2, until=T0 + 7))
+    assert [int(record['frame']) for record, _ in replayed] == [2, 3, 4, 5, 6]
+    # boxes are stored for inferred (even) frames only
+    assert [boxes for _, boxes in replayed] == [
+        [(12, 20, 112, 120, 2)] * 2, [], [(14, 20, 114, 120, 2)], [], [],
+    ]
+    assert store.cameras() == ['cam one']
+
+
+def test_rollups_summarise_each_bucket(store):
+    series = store.open('webcam')
+    _fill(series, 90)
+    series.release()
+
+    minutes = store.read_rollups('webcam', 60)
+    assert minutes['bucket'].tolist() == [T0, T0 + 60]
+    assert minutes['frames'].tolist() == [60, 30]
+    assert minutes['inferred'].tolist() == [30, 15]
+    assert minutes['count_sum'].tolist() == [60, 30]
+    assert minutes['count_max'].tolist() == [2, 2]
+    assert minutes['accidents'].tolist() == [1, 0]
+    assert store.read_rollups('webcam', 60, since=T0 + 60)['frames'].tolist() == [30]
+
+
+def test_open_bucket_stays_open_until_the_last_writer_releases(store):
+    first, second = store.open('webcam'), store.open('webcam')
+    assert first is second
+    _fill(first, 10)
+    first.release()
+
+    # still written to by the other stream: only closed buckets are on disk
+    assert len(store.read_rollups('webcam', 60)) == 0
+    _fill(second, 10, start=T0 + 10)
+    second.release()
+
+    assert store.read_rollups('webcam', 60)['frames'].tolist() == [20]
+
+
+def test_restarted_stream_merges_a_bucket_written_twice(store):
+    for start in (T0, T0 + 30):
+        series = store.open('webcam')
+        _fill(series, 10, start=start)
+        series.release()
+
+    minutes = store.read_rollups('webcam', 60)
+    assert minutes['frames'].tolist() == [20]
+    assert minutes['accidents'].tolist() == [2]
+
+
+def test_enforce_retention_deletes_expired_files_only(store):
+    series = store.open('webcam')
+    # three hourly segments: two are older than a week by now
+    for hour in range(3):
+        _fill(series, 4, start=T0 + hour * 3600)
+    series.release()
+    store.close()
+    path = series.path
+
+    store.enforce_retention(now=T0 + 2 * 3600 + 7 * DAY + 60)
+
+    frames = store.read_frames('webcam')
+    assert frames['ts'].min() == T0 + 2 * 3600
+    assert len(store.read_rollups('webcam', 3600)) == 3
+
+    store.enforce_retention(now=T0 + 91 * DAY)
+    assert not [n for n in os.listdir(path) if n.startswith('rollup_')]
+
+
+def test_enforce_retention_creates_no_writers(store, tmp_path):
+    other = TimeSeriesStore(store.root, flush_frames=1)
+    series = other.open('parked')
+    _fill(series, 2)
+    series.release()
+    os.remove(os.path.join(series.path, 'camera.json'))
+
+    store.enforce_retention()
+
+    assert store._series == {}
+    assert not os.path.exists(os.path.join(series.path, 'camera.json'))
+    assert len(np.fromfile(os.path.join(series.path, f"{int(T0 * 1000)}.frames.bin"), FRAME_DTYPE)) == 2
@@ -0,0 +1,110 @@
+import numpy as np
+
+from tracker import CollisionMonitor, VehicleTracker
+
+CAR, TRUCK, PERSON = 2, 7, 0
+
+
+def _box(x, y, w=100, h=60, cls=CAR):
+    return (x, y, x + w, y + h, cls)
+
+
+def test_ids_follow_moving_vehicles():
+    tracker = VehicleTracker()
+    history = []
+    for frame in range(20):
+        boxes = [_box(10 + 8 * frame, 100), _box(900 - 12 * frame, 400, cls=TRUCK), _box(500, 50, cls=PERSON)]
+        history.append(tracker.update(boxes, frame))
+
+    assert history[0] == [1, 2, None]
+    assert all(ids == history[0] for ids in history)
+
+
+def test_ids_are_independent_of_detection_order():
+    tracker = VehicleTracker()
+    a, b = _box(0, 0), _box(600, 300)
+    first = tracker.update([a, b], 0)
+    swapped = tracker.update([_box(6, 0), _box(606, 300)][::-1], 1)
+
+    assert swapped == first[::-1]
+
+
+def test_fast_vehicle_matched_by_centroid_fallback():
+    tracker = VehicleTracker()
+    tracker.update([_box(0, 0)], 0)
+    # moved 70% of its width: IoU is below the threshold, centroid is close
+    assert tracker.update([_box(40, 0)], 1) == [1]
+    # constant velocity then keeps the prediction on top of the vehicle
+    assert tracker.update([_box(80, 0)], 2) == [1]
+
+
+def test_track_survives_missed_detections_then_expires():
+    tracker = VehicleTracker(max_misses=3)
+    tracker.update([_box(0, 0)], 0)
+    for frame in range(1, 4):
+        tracker.update([], frame)
+    assert tracker.update([_box(0, 0)], 4) == [1]
+
+    for frame in range(5, 9):
+        tracker.update([], frame)
+    assert tracker.tracks == {}
+    assert tracker.update([_box(0, 0)], 9) == [2]
+
+
+def test_prediction_fills_skipped_frames():
+    tracker = VehicleTracker()
+    tracker.update([_box(0, 0)], 0)
+    tracker.update([_box(10, 0)], 2)   # 5 px per frame, smoothed to 2.5 from rest
+
+    (x1, y1, x2, y2, cls), = tracker.predicted_boxes(6)
+    assert np.allclose((x1, y1, x2, y2), (20, 0, 120, 60))
+    assert cls == CAR
+
+
+def test_collision_needs_the_same_pair_on_consecutive_frames():
+    monitor = CollisionMonitor(min_consecutive=3)
+    boxes = [_box(0, 0), _box(2, 1), _box(600, 300), _box(603, 301)]
+    pair_ab = [(0, 1, 0.9, 5800.0)]
+    pair_cd = [(2, 3, 0.9, 5700.0)]
+
+    # alternating pairs are reset before either reaches three
+    for frame, collisions in enumerate([pair_ab, pair_cd, pair_ab, pair_cd]):
+        assert monitor.check(boxes, collisions, frame) == (False, 0)
+    assert monitor.check(boxes, pair_ab, 4) == (False, 0)
+    assert monitor.check(boxes, pair_ab, 5) == (False, 0)
+    assert monitor.check(boxes, pair_ab, 6) == (True, 5)
+
+
+def test_a_missed_frame_resets_the_pair():
+    monitor = CollisionMonitor(min_consecutive=3)
+    boxes = [_box(0, 0), _box(2, 1)]
+    pair = [(0, 1, 0.9, 5800.0)]
+
+    for frame, collisions in enumerate([pair, pair, [], pair, pair]):
+        assert monitor.check(boxes, collisions, frame) == (False, 0)
+    assert monitor.check(boxes, pair, 5) == (True, 5)
+
+
+def test_max_gap_tolerates_dropped_detections():
+    monitor = CollisionMonitor(min_consecutive=3, max_gap=1)
+    boxes = [_box(0, 0), _box(2, 1)]
+    pair = [(0, 1, 0.9, 5800.0)]
+
+    # one missed frame keeps the count but does not add to it
+    for frame, collisions in enumerate([pair, [], pair]):
+        assert monitor.check(boxes, collisions, frame) == (False, 0)
+    assert monitor.check(boxes, pair, 3) == (True, 5)
+
+    # two missed frames in a row exceed the gap
+    for frame, collisions in enumerate([pair, [], [], pair, pair], start=4):
+        assert monitor.check(boxes, collisions, frame) == (False, 0)
+
+
+def test_pair_history_is_dropped_with_its_tracks():
+    monitor = CollisionMonitor(min_consecutive=2, tracker=VehicleTracker(max_misses=0))
+    boxes = [_box(0, 0), _box(2, 1)]
+    monitor.update(boxes, [(0, 1, 0.9, 5800.0)], 0)
+    assert monitor.pair_counts == {(1, 2): 1}
+
+    monitor.update([], [], 1)
+    assert monitor.pair_counts == {}